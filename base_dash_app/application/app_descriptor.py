@@ -3,10 +3,13 @@ from typing import List, Type, Hashable, Any, Dict
 from base_dash_app.apis.api import API
 from base_dash_app.components.base_component import ComponentWithInternalCallback
 from base_dash_app.components.callback_utils.mappers import InputToState
+from base_dash_app.enums.rejection_policies import RejectionPoliciesEnum
 from base_dash_app.models.job_definition import JobDefinition
 from base_dash_app.services.base_service import BaseService
 from base_dash_app.utils.db_utils import DbDescriptor
 from base_dash_app.utils.env_vars.env_var_def import EnvVarDefinition
+from base_dash_app.utils.health_utils import DEFAULT_PROBE_INTERVAL_SECONDS
+from base_dash_app.utils.metrics_utils import DEFAULT_FLUSH_INTERVAL_SECONDS
 from base_dash_app.views.base_view import BaseView
 
 
@@ -38,13 +41,21 @@ class AppDescriptor:
             valid_user_pairs: Dict[str, str] = None,
             silence_routes_logging: bool = True,
             alerts_refresh_timeout: int = 1000,
+            alerts_max_refresh_timeout: int = 30000,
             assets_folder_path: str = None,
             components_with_internal_callbacks: List[Type['ComponentWithInternalCallback']] = None,
             use_scoped_session: bool = False,
             max_num_threads: int = 5,
+            max_async_queue_size: int = 100,
+            async_rejection_policy: RejectionPoliciesEnum = RejectionPoliciesEnum.CALLER_RUNS,
+            max_num_processes: int = None,
             std_out_formatter=None,
             disable_memory_capture: bool = True,
             health_endpoint_path: str = "/healthz",
+            readiness_endpoint_path: str = "/readyz",
+            health_probe_interval_seconds: float = DEFAULT_PROBE_INTERVAL_SECONDS,
+            metrics_endpoint_path: str = "/metrics",
+            metrics_flush_interval_seconds: float = DEFAULT_FLUSH_INTERVAL_SECONDS,
             redis_host: str = None,
             redis_port: int = None,
             redis_db_number: int = None,
@@ -53,6 +64,8 @@ class AppDescriptor:
             redis_password: str = None,
             show_navbar_cpu_usage: bool = False,
             show_navbar_memory_usage: bool = False,
+            startup_budget_seconds: float = None,
+            lazy_services: bool = False,
     ):
         """
         :param global_inputs: 
@@ -77,13 +90,23 @@ class AppDescriptor:
         :param valid_user_pairs: If use_auth is True, this is a dict of valid username:password pairs
         :param silence_routes_logging: If True, silences the logging of every call to routes
         :param alerts_refresh_timeout: How often the alerts refresh in milliseconds
+        :param alerts_max_refresh_timeout: While nothing changes, the alerts refresh interval doubles up to this
         :param assets_folder_path: Path to the assets folder
         :param components_with_internal_callbacks: List of components that have internal callbacks
         :param use_scoped_session: If True, uses a scoped session for the db
         :param max_num_threads: Max number of threads to use for the app
+        :param max_async_queue_size: How much work may wait for one of those threads, None for no limit
+        :param async_rejection_policy: What happens to async work submitted while that queue is full
+        :param max_num_processes: Size of the process pool for cpu bound async work, defaults to the number of cpus
         :param std_out_formatter: Optional - Formatter to use for stdout
         :param disable_memory_capture: If True, disables memory capture
-        :param health_endpoint_path: Path to the health endpoint
+        :param health_endpoint_path: Path to the liveness endpoint, which skips auth and db hooks
+        :param readiness_endpoint_path: Path to the readiness endpoint, which reports the cached redis, db and celery
+            broker probes and returns 503 when any of them is failing
+        :param health_probe_interval_seconds: How often the readiness probes are refreshed in the background
+        :param metrics_endpoint_path: Path of the prometheus metrics endpoint, None to disable it. With redis
+            configured, it reports the totals of all workers
+        :param metrics_flush_interval_seconds: How often each process pushes its metrics to redis
         :param redis_host: Host of the redis server
         :param redis_port: Port of the redis server
         :param redis_db_number: DB number of the redis server
@@ -92,6 +115,8 @@ class AppDescriptor:
         :param redis_password: Password for the redis server. Required if redis_use_ssl is True. Default value is "password"
         :param show_navbar_cpu_usage: If True, shows the CPU usage in the navbar
         :param show_navbar_memory_usage: If True, shows the memory usage in the navbar
+        :param startup_budget_seconds: Optional - logs a warning when start-up takes longer than this
+        :param lazy_services: If True, apis and services in service_classes are only constructed when first requested
         """
 
         self.db_descriptor: DbDescriptor = db_descriptor
@@ -115,13 +140,21 @@ class AppDescriptor:
         self.valid_user_pairs: Dict[str, str] = valid_user_pairs or {}
         self.silence_routes_logging: bool = silence_routes_logging
         self.alerts_refresh_timeout: int = alerts_refresh_timeout
+        self.alerts_max_refresh_timeout: int = alerts_max_refresh_timeout
         self.assets_folder_path: str = assets_folder_path
         self.components_with_internal_callbacks = components_with_internal_callbacks or []
         self.use_scoped_session: bool = use_scoped_session
         self.max_num_threads: int = max_num_threads
+        self.max_async_queue_size: int = max_async_queue_size
+        self.async_rejection_policy: RejectionPoliciesEnum = async_rejection_policy
+        self.max_num_processes: int = max_num_processes
         self.std_out_formatter = std_out_formatter
         self.disable_memory_capture = disable_memory_capture
         self.health_endpoint_path = health_endpoint_path
+        self.readiness_endpoint_path = readiness_endpoint_path
+        self.health_probe_interval_seconds = health_probe_interval_seconds
+        self.metrics_endpoint_path = metrics_endpoint_path
+        self.metrics_flush_interval_seconds = metrics_flush_interval_seconds
         self.redis_host = redis_host
         self.redis_port = redis_port
         self.redis_db_number = redis_db_number
@@ -130,3 +163,5 @@ class AppDescriptor:
         self.redis_password = redis_password
         self.show_navbar_cpu_usage = show_navbar_cpu_usage
         self.show_navbar_memory_usage = show_navbar_memory_usage
+        self.startup_budget_seconds = startup_budget_seconds
+        self.lazy_services: bool = lazy_services
@@ -1,11 +1,47 @@
+import logging
 import os
 import ssl
+import time
 
+import flask
 from celery import Celery, Task, shared_task
 from celery.schedules import crontab
+from celery.signals import worker_process_init
 from flask import Flask
 from kombu.utils.url import as_url
 
+from base_dash_app.application.worker_resources import WorkerResources
+from base_dash_app.utils import fork_utils, metrics_utils
+
+logger = logging.getLogger("celery-worker")
+
+
+class ContextTask(Task):
+    @property
+    def resources(self) -> WorkerResources:
+        """
+        The per-process resource bundle. Bound tasks can use self.resources instead of
+        RuntimeApplication.get_instance().
+        """
+        return WorkerResources.get_instance()
+
+    def __call__(self, *args, **kwargs):
+        start = time.perf_counter()
+        outcome = "failure"
+        try:
+            if flask.has_app_context():
+                result = self.run(*args, **kwargs)
+            else:
+                logger.debug(f"Running task {self.name} in app context.")
+                with WorkerResources.get_instance().server.app_context():
+                    result = self.run(*args, **kwargs)
+
+            outcome = "success"
+            return result
+        finally:
+            metrics_utils.CELERY_TASK_DURATION.observe(time.perf_counter() - start, task=self.name, outcome=outcome)
+            metrics_utils.metrics_registry.ensure_flushing()
+
 
 class CelerySingleton:
     _instance = None
@@ -71,13 +107,6 @@ class CelerySingleton:
             if self.celery_broker_url is None:
                 raise ValueError("Celery broker url is None.")
 
-            class ContextTask(Task):
-                def __call__(self, *args, **kwargs):
-                    print(f"-- IN CONTEXT TASK: Running task {self.name}.")
-                    from base_dash_app.application.runtime_application import RuntimeApplication
-                    with RuntimeApplication.get_instance().server.app_context():
-                        return self.run(*args, **kwargs)
-
             self.celery = Celery(
                 "Main Celery Instance",
                 broker=self.celery_broker_url,
@@ -86,6 +115,14 @@ class CelerySingleton:
 
             )
 
+            self.celery.conf.broker_transport_options = {
+                **getattr(self, "broker_transport_options", {}),
+                # lets jobs be sent with priorities 0 (highest) to 9 on the redis broker
+                "priority_steps": list(range(10)),
+                "sep": ":",
+                "queue_order_strategy": "priority",
+            }
+
             self.celery.backend.ensure_chords_allowed()
 
     def get_celery(self):
@@ -100,6 +137,17 @@ class CelerySingleton:
 celery = CelerySingleton.get_instance().get_celery()
 
 
+@worker_process_init.connect
+def init_worker_resources(**kwargs):
+    # a no-op when os.register_at_fork already ran them in this child
+    fork_utils.run_after_fork_callbacks()
+    try:
+        WorkerResources.initialize()
+    except Exception as e:
+        # the bundle will be built on first use instead
+        logger.warning(f"Could not initialize worker resources at process start: {e}")
+
+
 @celery.on_after_configure.connect
 def setup_periodic_tasks(sender, **kwargs):
     print("============ Setting up periodic tasks.")
@@ -1,33 +1,28 @@
 import base64
 import datetime
+import functools
 import logging
 import os
 import pprint
-import ssl
-import threading
 import traceback
-from operator import itemgetter
-from typing import List, Callable, Dict, Type, Union, TypeVar, Any, Optional
+import uuid
+from typing import List, Callable, Dict, Type, Union, TypeVar, Any, Optional, Set, TYPE_CHECKING
 from urllib.parse import unquote
 
 import dash
 import dash_auth
 import flask
-import psutil
 import redis
 import sqlalchemy.exc
-from apscheduler.schedulers.background import BackgroundScheduler
-from celery import Celery
-from celery.schedules import crontab
 from dash import dcc, html
+from dash import no_update
 from dash.dependencies import Output, Input, State, ALL
 from dash.exceptions import PreventUpdate
-from kombu.utils.url import as_url
-from pympler import tracker
 from redis import Redis
 from sqlalchemy.orm import Session
 
 from base_dash_app.apis.api import API
+from base_dash_app.application import worker_resources
 from base_dash_app.application.app_descriptor import AppDescriptor
 from base_dash_app.application.db_declaration import db
 from base_dash_app.components import alerts
@@ -47,10 +42,17 @@ from base_dash_app.services.async_handler_service import AsyncHandlerService
 from base_dash_app.services.base_service import BaseService
 from base_dash_app.services.global_state_service import GlobalStateService
 from base_dash_app.services.job_definition_service import JobDefinitionService, JobAlreadyRunningException
-from base_dash_app.utils.db_utils import DbManager
+from base_dash_app.utils import fork_utils, metrics_utils, redis_utils
+from base_dash_app.utils.memory_utils import MemoryHistory, sample_process
+from base_dash_app.utils.alert_bus import AlertBus, get_backoff_interval
+from base_dash_app.utils.db_utils import DbManager, exempt_from_request_hooks
 from base_dash_app.utils.env_vars.env_var_def import EnvVarDefinition
+from base_dash_app.utils.health_utils import HealthMonitor
+from base_dash_app.utils.lazy_registry import LazyRegistry
+from base_dash_app.utils.startup_profiler import StartupProfiler
+from base_dash_app.utils.url_router import UrlRouter
 from base_dash_app.views.admin_statistics_dash import AdminStatisticsDash
-from base_dash_app.views.base_view import BaseView
+from base_dash_app.views.base_view import BaseView, set_current_path_params, reset_current_path_params
 from base_dash_app.virtual_objects.interfaces.selectable import Selectable
 from base_dash_app.virtual_objects.interfaces.startable import Startable, ExternalTriggerEvent
 from base_dash_app.models.job_definition import JobDefinition
@@ -58,14 +60,20 @@ from base_dash_app.virtual_objects.timeseries.time_series import TimeSeries
 from base_dash_app.virtual_objects.timeseries.time_series_data_point import TimeSeriesDataPoint
 from base_dash_app.virtual_objects.virtual_framework_obj import VirtualFrameworkObject
 import base64
+
+if TYPE_CHECKING:
+    from apscheduler.schedulers.background import BackgroundScheduler
+    from celery import Celery
+
 ALERTS_WRAPPER_INTERVAL_ID = "alerts-wrapper-interval-id"
 
 ALERTS_WRAPPER_DIV_ID = "alerts-wrapper-div-id"
 
+ALERTS_SESSION_STORE_ID = "alerts-session-store-id"
+
 
 class RuntimeApplication:
     _instance = None
-    _pid_to_dbm_map: Dict[int, DbManager] = {}
 
     @classmethod
     def get_instance(cls) -> "RuntimeApplication":
@@ -74,19 +82,21 @@ class RuntimeApplication:
         return cls._instance
 
     def get_dbm_by_pid(self) -> DbManager:
-        pid = os.getpid()
-        if pid not in RuntimeApplication._pid_to_dbm_map:
-            RuntimeApplication._pid_to_dbm_map[pid] = DbManager(self.app_descriptor.db_descriptor, self.server)
-
-        return RuntimeApplication._pid_to_dbm_map[pid]
+        """
+        The db manager is shared by every process. Forked children dispose the pool they inherited before
+        first use, so each process still gets its own connections.
+        """
+        fork_utils.run_after_fork_callbacks()
+        return self.dbm
 
     def __init__(self, app_descriptor: AppDescriptor):
         # will not be used if running in gunicorn or celery
-        self.bg_scheduler: Optional[BackgroundScheduler] = None
+        self.bg_scheduler: Optional["BackgroundScheduler"] = None
         if RuntimeApplication._instance is not None:
             return
 
         RuntimeApplication._instance = self
+        self.startup_profiler: StartupProfiler = StartupProfiler(budget_seconds=app_descriptor.startup_budget_seconds)
 
         self.last_job_check = None
         self.app_descriptor: AppDescriptor = app_descriptor
@@ -114,8 +124,43 @@ class RuntimeApplication:
         def health():
             return "OK", 200
 
+        self.health_monitor: HealthMonitor = HealthMonitor(
+            interval_seconds=app_descriptor.health_probe_interval_seconds
+        )
+
+        @self.app.server.route(self.app_descriptor.readiness_endpoint_path, methods=['GET'])
+        def readiness():
+            # probes run in the background, this only reads their last results
+            self.health_monitor.ensure_started()
+            readiness_report = self.health_monitor.get_readiness()
+            readiness_report["metrics"] = self.health_monitor.get_metrics()
+            return flask.jsonify(readiness_report), 200 if readiness_report["ready"] else 503
+
+        # load balancers probe these often, they shouldn't push an app context or open a session
+        exempt_from_request_hooks(
+            self.app.server, app_descriptor.health_endpoint_path, app_descriptor.readiness_endpoint_path
+        )
+
+        if app_descriptor.metrics_endpoint_path is not None:
+            @self.app.server.route(app_descriptor.metrics_endpoint_path, methods=['GET'])
+            def metrics():
+                return flask.Response(
+                    metrics_utils.metrics_registry.render(), mimetype="text/plain; version=0.0.4"
+                )
+
+            exempt_from_request_hooks(self.app.server, app_descriptor.metrics_endpoint_path)
+
+        @self.app.server.after_request
+        def record_callback_payload_size(response: flask.Response):
+            callback = flask.g.get("metrics_callback")
+            if callback is not None and not response.direct_passthrough:
+                metrics_utils.CALLBACK_PAYLOAD_BYTES.observe(len(response.get_data()), callback=callback)
+
+            return response
+
         self.app.logger.handlers.clear()
         self.app.logger.setLevel(app_descriptor.log_level or logging.INFO)
+        self.startup_profiler.mark("dash app")
 
         if app_descriptor.use_auth:
             secret_key = base64.b64encode(os.urandom(30)).decode('utf-8')
@@ -123,7 +168,7 @@ class RuntimeApplication:
                 self.app,
                 app_descriptor.valid_user_pairs,
                 None,
-                None,
+                [app_descriptor.health_endpoint_path, app_descriptor.readiness_endpoint_path],
                 None,
                 secret_key
             )
@@ -140,29 +185,30 @@ class RuntimeApplication:
             if app_descriptor.redis_password is not None:
                 redis_args["password"] = app_descriptor.redis_password
 
+            redis_args["host"] = app_descriptor.redis_host
+            redis_args["port"] = app_descriptor.redis_port
+            redis_args["db"] = app_descriptor.redis_db_number
+            redis_args["decode_responses"] = True
+            redis_args["socket_timeout"] = 5
+
             if app_descriptor.redis_use_ssl:
                 self.app.logger.debug("Connecting to Redis with SSL.")
-                self.app.logger.debug(pprint.pformat(redis_args))
-                self.redis_client: redis.StrictRedis = redis.StrictRedis(
-                    host=app_descriptor.redis_host,
-                    port=app_descriptor.redis_port,
-                    db=app_descriptor.redis_db_number,
-                    decode_responses=True,
-                    ssl=True,
-                    socket_timeout=5,
-                    **redis_args
-                )
+                redis_args["ssl"] = True
             else:
                 self.app.logger.debug("Connecting to Redis without SSL.")
-                self.app.logger.debug(pprint.pformat(redis_args))
-                self.redis_client: redis.StrictRedis = redis.StrictRedis(
-                    host=app_descriptor.redis_host,
-                    port=app_descriptor.redis_port,
-                    db=app_descriptor.redis_db_number,
-                    decode_responses=True,
-                    socket_timeout=5,
-                    **redis_args
-                )
+
+            self.app.logger.debug(pprint.pformat(redis_args))
+            # kept so forked children can open their own connection pool
+            self.__redis_args = redis_args
+            self.redis_client: redis.StrictRedis = redis_utils.InstrumentedRedis(**redis_args)
+
+        if self.redis_client is not None:
+            fork_utils.register_after_fork(self.reinitialize_redis_client)
+            metrics_utils.metrics_registry.set_redis_client(
+                self.redis_client, flush_interval_seconds=app_descriptor.metrics_flush_interval_seconds
+            )
+            # saved job definitions invalidate the definitions cached by workers
+            worker_resources.watch_job_definition_changes(self.redis_client)
 
         try:
             if self.redis_client.ping():
@@ -176,14 +222,16 @@ class RuntimeApplication:
             self.app.logger.error("Could not connect to Redis.")
             exit(1)
 
+        self.startup_profiler.mark("redis")
+
         # need to set celery instance from outside, so it can be referenced when decorating tasks
-        self.celery: Optional[Celery] = None
+        self.celery: Optional["Celery"] = None
 
         self.dbm = None
 
-        self.active_alerts: List[Alert] = []
-        self.services: Dict[Type, BaseService] = {}
-        self.apis: Dict[Type, API] = {}
+        self.alert_bus: AlertBus = AlertBus(self.redis_client)
+        self.services: Dict[Type, BaseService] = LazyRegistry()
+        self.apis: Dict[Type, API] = LazyRegistry()
         self.views: Dict[Type, BaseView] = {}
         self.env_vars: Dict[str, EnvVarDefinition] = {}
         self.jobs: Dict[Type, JobDefinition] = {}
@@ -197,11 +245,11 @@ class RuntimeApplication:
         def push_new_alert(alert: Alert):
             if type(alert) != Alert:
                 raise Exception(f"Trying to push alert of incorrect type: {type(alert)}.")
-            self.active_alerts.append(alert)
+            self.alert_bus.publish(alert)
 
         def remove_alert(alert: Alert):
-            if alert is not None and alert in self.active_alerts:
-                self.active_alerts.remove(alert)
+            if alert is not None:
+                self.alert_bus.remove(alert.id)
 
         Service = TypeVar("Service", bound=BaseService)
 
@@ -231,6 +279,8 @@ class RuntimeApplication:
             if self.dbm is not None and app_descriptor.upgrade_db:
                 self.dbm.upgrade_db(drop_first=app_descriptor.drop_tables)
 
+            self.startup_profiler.mark("db")
+
             self.last_mem_check = datetime.datetime(1970, 1, 1)
             self.memory_history_timeseries: TimeSeries = TimeSeries(
                 title="Memory History",
@@ -241,6 +291,7 @@ class RuntimeApplication:
                 title="CPU History",
                 unique_id="cpu_history",
             )
+            self.memory_history: MemoryHistory = MemoryHistory(redis_client=self.redis_client)
 
             self.base_service_args = base_service_args = {
                 "dbm": self.dbm,
@@ -257,41 +308,56 @@ class RuntimeApplication:
             }
 
             for api_type in app_descriptor.apis:
-                self.apis[api_type] = api_type(**base_service_args)  # parent constructor vars will come from child
+                if app_descriptor.lazy_services:
+                    self.apis.register_factory(api_type, lambda api_type=api_type: api_type(**base_service_args))
+                else:
+                    self.apis[api_type] = api_type(**base_service_args)  # parent constructor vars will come from child
+
+            self.startup_profiler.mark("apis")
 
             session: Session = self.dbm.get_session()
             job_def_service: JobDefinitionService = JobDefinitionService(**base_service_args)
-            all_jobs_from_db: List[JobDefinition] = job_def_service.get_all(session)
-            all_job_classes = set([type(jd) for jd in all_jobs_from_db])
+            saved_job_classes: Set[str] = job_def_service.get_saved_job_classes(session)
 
             required_job_to_class_map = {job_type.__name__: job_type for job_type in app_descriptor.jobs}
 
             for class_name, job_class in required_job_to_class_map.items():
                 if issubclass(job_class, JobDefinition) and job_class.autoinitialize():
-                    if job_class not in all_job_classes:
+                    if job_class.__mapper__.polymorphic_identity not in saved_job_classes:
                         # job was never saved to DB and it should be autoinitialized
                         job = job_class.construct_instance(**base_service_args)
                         job_def_service.save(job, session=session)
 
-                        all_jobs_from_db.append(job)
-                        all_job_classes.add(job_class)
+                        saved_job_classes.add(job_class.__mapper__.polymorphic_identity)
                     elif job_class.force_update():
                         #issue: (issue: 176): properly handle JobDefinitions when force update is True - or remove functionality
                         pass
 
+                if issubclass(job_class, JobDefinition):
+                    job_class.warm_selectables_cache(session)
+
+            self.startup_profiler.mark("job definitions")
+
             for s in app_descriptor.service_classes:
-                self.services[s] = s(**base_service_args)
+                if app_descriptor.lazy_services:
+                    self.services.register_factory(s, lambda s=s: s(**base_service_args))
+                else:
+                    self.services[s] = s(**base_service_args)
 
             self.services[GlobalStateService] = GlobalStateService(initial_state=app_descriptor.initial_global_state)
             self.services[JobDefinitionService] = job_def_service
             self.services[AsyncHandlerService] = AsyncHandlerService(
                 **base_service_args,
-                max_workers=app_descriptor.max_num_threads
+                max_workers=app_descriptor.max_num_threads,
+                max_queue_size=app_descriptor.max_async_queue_size,
+                rejection_policy=app_descriptor.async_rejection_policy,
+                max_process_workers=app_descriptor.max_num_processes,
             )
 
             from base_dash_app.services.celery_handler_service import CeleryHandlerService
             self.services[CeleryHandlerService] = CeleryHandlerService(**base_service_args)
 
+            self.startup_profiler.mark("services")
             base_view_args = base_service_args
 
             for view in app_descriptor.views:
@@ -300,9 +366,13 @@ class RuntimeApplication:
             self.views[AdminStatisticsDash] = AdminStatisticsDash(
                 memory_timeseries=self.memory_history_timeseries,
                 cpu_timeseries=self.cpu_history_timeseries,
+                memory_history=self.memory_history,
                 **base_view_args
             )
 
+            self.router: UrlRouter[BaseView] = UrlRouter([(view.url_regex, view) for view in self.views.values()])
+            self.services[GlobalStateService].add_listener(self.handle_global_state_change)
+            self.startup_profiler.mark("views")
             wrapped_get_handler = self.bind_to_self(self.handle_get_call)
 
             self.__global_inputs = app_descriptor.global_inputs
@@ -328,13 +398,17 @@ class RuntimeApplication:
                     Output("nav-bar-memory-consumption-label", "children"),
                     Output("nav-bar-cpu-usage-bar", "value"),
                     Output("nav-bar-cpu-usage-label", "children"),
+                    Output(ALERTS_WRAPPER_INTERVAL_ID, "interval"),
                 ],
                 inputs=[
                     Input({"type": alerts.DISMISS_ALERT_BTN_ID, "index": ALL}, "n_clicks"),
                     Input(ALERTS_WRAPPER_INTERVAL_ID, "n_intervals"),
                     Input(alerts.CLEAR_ALL_ALERTS_BTN_ID, "n_clicks"),
                 ],
-                state=[],
+                state=[
+                    State(ALERTS_SESSION_STORE_ID, "data"),
+                    State(ALERTS_WRAPPER_INTERVAL_ID, "interval"),
+                ],
                 function=self.bind_to_self(self.handle_alerts)
             )
 
@@ -353,69 +427,76 @@ class RuntimeApplication:
             )
 
             self.app.layout = self.get_layout
+            self.startup_profiler.mark("callbacks and layout")
 
-    def handle_alerts(self, n_clicks, n_interval, clear_all_nclicks, *args, **kwargs):
+        self.register_health_probes()
+        self.startup_profiler.finish()
+
+    def handle_alerts(
+            self, n_clicks, n_interval, clear_all_nclicks, session_data, current_interval, *args, **kwargs
+    ):
         if invalid_n_clicks(n_clicks) and invalid_n_clicks(n_interval) \
                 and invalid_n_clicks(clear_all_nclicks):
             raise PreventUpdate()
 
+        session_id = (session_data or {}).get("session_id")
+        if session_id is None:
+            raise PreventUpdate()
+
         trigerring_id, index = get_triggering_id_from_callback_context(dash.callback_context)
         if trigerring_id.startswith(alerts.DISMISS_ALERT_BTN_ID):
-            alert_to_dismiss = None
-            for alert in self.active_alerts:
-                if alert.id == index:
-                    alert_to_dismiss = alert
-                    break
-
-            if alert_to_dismiss is None:
-                raise PreventUpdate("Couldn't find alert with id %i" % index)
-
-            self.active_alerts.remove(alert_to_dismiss)
+            self.alert_bus.dismiss(session_id, [index])
         elif trigerring_id.startswith(alerts.CLEAR_ALL_ALERTS_BTN_ID):
-            self.active_alerts.clear()
-
-        for alert in self.active_alerts:
-            if alert.duration is not None and alert.created_at is not None \
-                    and alert.created_at + datetime.timedelta(seconds=alert.duration) <= datetime.datetime.now():
-                self.active_alerts.remove(alert)
+            self.alert_bus.dismiss(session_id, [alert.id for alert in self.alert_bus.read(session_id)])
 
+        memory_sampled = False
         if self.last_mem_check < datetime.datetime.now() - datetime.timedelta(seconds=60):
-            if self.app_descriptor.disable_memory_capture:
-                pass
-            else:
+            if not self.app_descriptor.disable_memory_capture:
                 self.track_memory_usage()
+                memory_sampled = True
+
+        alerts_changed = self.alert_bus.has_changed(session_id)
+        interval, interval_changed = get_backoff_interval(
+            current_interval,
+            base_interval=self.app_descriptor.alerts_refresh_timeout or 1000,
+            max_interval=self.app_descriptor.alerts_max_refresh_timeout,
+            changed=alerts_changed or not trigerring_id.startswith(ALERTS_WRAPPER_INTERVAL_ID),
+        )
 
-        # issue: (issue: 187): Store memory and CPU usage timeseries in redis with PIDs as keys
-        latest_memory = self.memory_history_timeseries[-1].value if len(self.memory_history_timeseries) > 0 else 0
-        latest_cpu = self.cpu_history_timeseries[-1].value if len(self.cpu_history_timeseries) > 0 else 0
+        if alerts_changed or memory_sampled:
+            latest_memory = self.memory_history_timeseries[-1].value if len(self.memory_history_timeseries) > 0 else 0
+            latest_cpu = self.cpu_history_timeseries[-1].value if len(self.cpu_history_timeseries) > 0 else 0
+            usage_outputs = [latest_memory, f"{latest_memory:.1f} MB", latest_cpu, f"{latest_cpu:.1f}%"]
+        else:
+            usage_outputs = [no_update] * 4
 
         return [
-            alerts.render_alerts_div(self.active_alerts),
-            latest_memory,
-            f"{latest_memory:.1f} MB",
-            latest_cpu,
-            f"{latest_cpu:.1f}%"
+            alerts.render_alerts_div(self.alert_bus.read(session_id)) if alerts_changed else no_update,
+            *usage_outputs,
+            interval if interval_changed else no_update,
         ]
 
     def track_memory_usage(self):
-        self.app.logger.info("Capturing memory usage")
+        """
+        Samples this process' RSS/USS and the cpu usage. The full object census is an explicit action on the
+        admin statistics view, since walking the heap can stall a large process for seconds.
+        """
+        self.app.logger.debug("Capturing memory usage")
         self.last_mem_check = datetime.datetime.now()
 
-        mem = tracker.SummaryTracker()
-        memory_usages = list(sorted(mem.create_summary(), reverse=True, key=itemgetter(2)))
-        self.memory_history_timeseries.add_tsdp(
-            TimeSeriesDataPoint(
-                date=datetime.datetime.now(),
-                value=sum([mu[2] for mu in memory_usages]) / (1024 ** 2)
-            )
-        )
-
-        self.cpu_history_timeseries.add_tsdp(
-            TimeSeriesDataPoint(
-                date=datetime.datetime.now(),
-                value=psutil.cpu_percent()
-            )
-        )
+        sample = sample_process()
+        try:
+            self.memory_history.add(sample)
+        except redis.exceptions.RedisError as e:
+            self.app.logger.warning(f"Could not store memory sample in redis: {e}")
+
+        for timeseries, value in [
+            (self.memory_history_timeseries, sample.rss_mb), (self.cpu_history_timeseries, sample.cpu_percent)
+        ]:
+            timeseries.add_tsdp(TimeSeriesDataPoint(date=sample.sampled_at, value=value))
+            # same bound as the redis ring buffer
+            if len(timeseries.data) > self.memory_history.max_samples:
+                timeseries.set_tsdps(timeseries.data[-self.memory_history.max_samples:])
 
     def check_for_scheduled_jobs(self):
         self.app.logger.debug("Checking for scheduled jobs")
@@ -426,16 +507,15 @@ class RuntimeApplication:
             session: Session = dbm.get_session()
             job_def_service: JobDefinitionService = self.base_service_args["service_provider"](JobDefinitionService)
             try:
-                jobs: List[JobDefinition] = job_def_service.get_all(session=session)
-                self.app.logger.debug(f"Checking {len(jobs)} jobs for scheduled runs.")
-                for job in jobs:
+                # only repeating jobs can be due, and they are streamed rather than all loaded at once
+                for job in job_def_service.iter_all(session=session, repeats=True):
                     self.app.logger.debug(f"Checking job {job.name}")
 
                     job: JobDefinition
                     job_class = type(job)
                     job.set_vars_from_kwargs(**self.base_service_args)
                     selectable_param_name = job.single_selectable_param_name
-                    selectables: List[Selectable] = job_class.get_selectables_by_param_name(
+                    selectables: List[Selectable] = job_class.get_cached_selectables(
                         job_class.single_selectable_param_name(),
                         session=session
                     )
@@ -478,7 +558,8 @@ class RuntimeApplication:
                                 job_def_service.run_job(
                                     job_def=job,
                                     selectable=selectable,
-                                    parameters={selectable_param_name: selectable.get_value()}
+                                    parameters={selectable_param_name: selectable.get_value()},
+                                    scheduled=True
                                 )
 
                                 self.base_service_args["push_alert"](
@@ -549,14 +630,18 @@ class RuntimeApplication:
         )
 
     def get_layout(self):
+        # every page load is its own alerts session, with its own read cursor and dismissed alerts
+        session_id = uuid.uuid4().hex
+        current_alerts = self.alert_bus.read(session_id)
         return html.Div(
             children=[
                 dcc.Location(id="url", refresh=False),
                 self.navbar.render(),
+                dcc.Store(id=ALERTS_SESSION_STORE_ID, data={"session_id": session_id}),
                 html.Div(
                     children=alerts.render_alerts_div(
-                        self.active_alerts,
-                        wrapper_style={} if len(self.active_alerts) > 0 else {"display": "none"}
+                        current_alerts,
+                        wrapper_style={} if len(current_alerts) > 0 else {"display": "none"}
                     ),
                     id=ALERTS_WRAPPER_DIV_ID,
                     style={
@@ -588,12 +673,60 @@ class RuntimeApplication:
             self, output: Union[Output, List[Output]], inputs: List[Input], state: List[State],
             function: Callable, prevent_initial_call: bool = True
     ):
+        callback_name = RuntimeApplication.get_callback_name(function)
+
+        @functools.wraps(function)
+        def instrumented_callback(*args, **kwargs):
+            if flask.has_request_context():
+                flask.g.metrics_callback = callback_name
+
+            with metrics_utils.callback_scope(callback_name):
+                return function(*args, **kwargs)
+
         self.app.callback(
             output=output,
             inputs=inputs,
             state=state,
             prevent_initial_call=prevent_initial_call
-        )(function)
+        )(instrumented_callback)
+
+    @staticmethod
+    def get_callback_name(function: Callable) -> str:
+        """
+        The metrics label of a callback: the class of the view or component it is bound to.
+        """
+        bound_to = getattr(function, "__self__", None)
+        if bound_to is None:
+            return function.__qualname__
+
+        return bound_to.__name__ if isinstance(bound_to, type) else type(bound_to).__name__
+
+    def register_health_probes(self):
+        if self.redis_client is not None:
+            self.health_monitor.add_probe("redis", self.redis_client.ping)
+
+        if self.dbm is not None:
+            self.health_monitor.add_probe("db", self.dbm.ping)
+
+        self.health_monitor.add_probe("celery_broker", self.ping_celery_broker)
+
+    def ping_celery_broker(self):
+        # celery is set from outside after start-up, until then there is no broker to check
+        if self.celery is None:
+            return True
+
+        with self.celery.connection_for_write() as connection:
+            connection.ensure_connection(max_retries=1, timeout=5)
+
+        return True
+
+    def reinitialize_redis_client(self):
+        """
+        Called in forked children. The client object is kept, since services and views hold on to it,
+        but its connection pool is replaced with a new one. The inherited pool is left alone since its
+        locks may have been held at fork time.
+        """
+        self.redis_client.connection_pool = redis.StrictRedis(**self.__redis_args).connection_pool
 
     def bind_to_self(self, func):
         bound_method = func.__get__(self, self.__class__)
@@ -618,19 +751,56 @@ class RuntimeApplication:
 
         decoded_url = unquote(url)
         decoded_params = unquote(query_params)
-        for page in self.views.values():
-            if page.matches(decoded_url):
-                try:
-                    return page.render(decoded_params, states_for_input)
-                except sqlalchemy.exc.SQLAlchemyError:
-                    #issue: (issue: 177): Try reproducing this error and remove if not possible
-                    exception_trace = traceback.format_exc()
-                    self.app.logger.error(exception_trace)
-                    self.dbm.get_session().rollback()
-                    return self.handle_get_call(url, query_params, *args)
-                except Exception:
-                    exception_trace = traceback.format_exc()
-                    self.app.logger.error(exception_trace)
-                    return html.Pre(exception_trace, style={"whiteSpace": "pre-wrap", "wordBreak": "break-all"})
-
-        return html.Div("404 Not Found.")
+        route_match = self.router.resolve(decoded_url)
+        if route_match is None:
+            return html.Div("404 Not Found.")
+
+        page: BaseView = route_match.target
+        path_params_token = set_current_path_params(route_match.path_params)
+        try:
+            return page.render_page(decoded_url, decoded_params, states_for_input)
+        except sqlalchemy.exc.SQLAlchemyError:
+            #issue: (issue: 177): Try reproducing this error and remove if not possible
+            exception_trace = traceback.format_exc()
+            self.app.logger.error(exception_trace)
+            self.dbm.get_session().rollback()
+            return self.handle_get_call(url, query_params, *args)
+        except Exception:
+            exception_trace = traceback.format_exc()
+            self.app.logger.error(exception_trace)
+            return html.Pre(exception_trace, style={"whiteSpace": "pre-wrap", "wordBreak": "break-all"})
+        finally:
+            reset_current_path_params(path_params_token)
+
+    def handle_global_state_change(self, new_state):
+        for view in self.views.values():
+            try:
+                view.handle_global_state_change(new_state)
+            except Exception as e:
+                self.app.logger.error(f"Error handling global state change in {view.title}: {e}")
+
+        self.services[AsyncHandlerService].do_work(
+            self.prefetch_recent_views, dedupe_key="prefetch_recent_views"
+        )
+
+    def prefetch_recent_views(self, limit: int = 10, **kwargs):
+        """
+        Calls BaseView.prefetch for the most recently visited urls, e.g. after a global state change, so the
+        pages users are on render from warm data. Runs in the background from handle_global_state_change.
+        """
+        if self.dbm is not None:
+            with self.dbm:
+                self.__prefetch_urls(self.router.get_recent_urls(limit))
+        else:
+            self.__prefetch_urls(self.router.get_recent_urls(limit))
+
+    def __prefetch_urls(self, urls: List[str]):
+        for url in urls:
+            route_match = self.router.resolve(url)
+            if route_match is None:
+                continue
+
+            try:
+                route_match.target.prefetch(route_match.path_params)
+            except Exception as e:
+                self.app.logger.warning(f"Prefetching {url} failed: {e}")
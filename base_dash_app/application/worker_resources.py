@@ -0,0 +1,199 @@
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional, Type, Tuple, Any, TYPE_CHECKING
+
+from flask import Flask
+from redis import StrictRedis
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from base_dash_app.apis.api import API
+from base_dash_app.utils.db_utils import DbManager
+
+if TYPE_CHECKING:
+    from base_dash_app.application.runtime_application import RuntimeApplication
+    from base_dash_app.models.job_definition import JobDefinition
+
+DEFAULT_JOB_DEFINITION_CACHE_TTL = 300
+# hash of job definition id -> version, bumped whenever a definition or its parameters are saved
+JOB_DEFINITION_VERSIONS_KEY = "job_definition_versions"
+
+logger = logging.getLogger(__name__)
+
+# versions of definitions saved by this process, used when there is no redis to share them through
+_local_job_definition_versions: Dict[int, int] = {}
+_versions_redis_client: Optional[StrictRedis] = None
+_watching_job_definitions: bool = False
+_watch_lock = threading.Lock()
+
+
+def bump_job_definition_version(job_def_id: int):
+    _local_job_definition_versions[job_def_id] = _local_job_definition_versions.get(job_def_id, 0) + 1
+    if _versions_redis_client is not None:
+        try:
+            _versions_redis_client.hincrby(JOB_DEFINITION_VERSIONS_KEY, str(job_def_id), 1)
+        except Exception as e:
+            logger.warning(f"Could not publish the new version of job definition {job_def_id}: {e}")
+
+
+def get_job_definition_version(job_def_id: int) -> Tuple[int, int]:
+    shared_version = 0
+    if _versions_redis_client is not None:
+        try:
+            shared_version = int(_versions_redis_client.hget(JOB_DEFINITION_VERSIONS_KEY, str(job_def_id)) or 0)
+        except Exception as e:
+            logger.warning(f"Could not read the version of job definition {job_def_id}: {e}")
+
+    return shared_version, _local_job_definition_versions.get(job_def_id, 0)
+
+
+def watch_job_definition_changes(redis_client: Optional[StrictRedis]):
+    """
+    Bumps a definition's version whenever it or one of its parameters is inserted, updated or deleted through the
+    ORM, in any process sharing redis_client. Worker caches reload definitions whose version changed.
+    """
+    global _versions_redis_client, _watching_job_definitions
+    from base_dash_app.models.job_definition import JobDefinition
+    from base_dash_app.models.job_definition_parameter import JobDefinitionParameter
+
+    with _watch_lock:
+        if redis_client is not None:
+            _versions_redis_client = redis_client
+
+        if _watching_job_definitions:
+            return
+        _watching_job_definitions = True
+
+    def definition_changed(mapper, connection, target):
+        if target.id is not None:
+            bump_job_definition_version(target.id)
+
+    def parameter_changed(mapper, connection, target):
+        if target.job_definition_id is not None:
+            bump_job_definition_version(target.job_definition_id)
+
+    for event_name in ["after_insert", "after_update", "after_delete"]:
+        event.listen(JobDefinition, event_name, definition_changed, propagate=True)
+        event.listen(JobDefinitionParameter, event_name, parameter_changed)
+
+
+class WorkerResources:
+    """
+    Per-process bundle of everything celery tasks need: the redis client, the db manager, the flask server,
+    the apis and a cache of job definitions. It is built once per worker process, from worker_process_init
+    for prefork pools or on first use otherwise, so tasks don't have to resolve and rebuild these on every call.
+    """
+    _pid_to_instance: Dict[int, "WorkerResources"] = {}
+    _lock = threading.Lock()
+
+    def __init__(
+            self,
+            redis_client: Optional[StrictRedis],
+            server: Flask,
+            dbm: Optional[DbManager] = None,
+            base_service_args: Dict[str, Any] = None,
+            apis: Dict[Type, API] = None,
+            job_definition_cache_ttl: int = DEFAULT_JOB_DEFINITION_CACHE_TTL,
+    ):
+        self.pid: int = os.getpid()
+        self.redis_client: Optional[StrictRedis] = redis_client
+        self.server: Flask = server
+        self.dbm: Optional[DbManager] = dbm
+        self.base_service_args: Dict[str, Any] = base_service_args or {}
+        self.apis: Dict[Type, API] = apis or {}
+        self.job_definition_cache_ttl: int = job_definition_cache_ttl
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+        # cached definitions are only merged from, never handed out, but sessions are per thread so caches are too
+        self.__thread_local_data = threading.local()
+        watch_job_definition_changes(redis_client)
+
+    @staticmethod
+    def from_runtime_application(rta: "RuntimeApplication") -> "WorkerResources":
+        return WorkerResources(
+            redis_client=rta.redis_client,
+            server=rta.server,
+            dbm=rta.get_dbm_by_pid() if rta.app_descriptor.db_descriptor is not None else None,
+            base_service_args=rta.base_service_args,
+            apis=rta.apis,
+        )
+
+    @classmethod
+    def initialize(cls) -> "WorkerResources":
+        """
+        Builds the bundle for the current process from the RuntimeApplication, replacing any existing one.
+        Connected to celery's worker_process_init signal.
+        """
+        from base_dash_app.application.runtime_application import RuntimeApplication
+        resources = WorkerResources.from_runtime_application(RuntimeApplication.get_instance())
+        cls.set_instance(resources)
+        return resources
+
+    @classmethod
+    def set_instance(cls, resources: "WorkerResources"):
+        with cls._lock:
+            cls._pid_to_instance[resources.pid] = resources
+
+    @classmethod
+    def get_instance(cls) -> "WorkerResources":
+        resources = cls._pid_to_instance.get(os.getpid())
+        if resources is not None:
+            return resources
+
+        # worker_process_init is not sent by the threads and solo pools, build the bundle on first use
+        from base_dash_app.application.runtime_application import RuntimeApplication
+        with cls._lock:
+            resources = cls._pid_to_instance.get(os.getpid())
+            if resources is None:
+                resources = WorkerResources.from_runtime_application(RuntimeApplication.get_instance())
+                cls._pid_to_instance[resources.pid] = resources
+
+        return resources
+
+    def get_api(self, api_class: Type) -> Optional[API]:
+        return self.apis.get(api_class)
+
+    def __get_job_definition_cache(self) -> Dict[int, Tuple[float, Tuple[int, int], "JobDefinition"]]:
+        if not hasattr(self.__thread_local_data, "job_definitions"):
+            self.__thread_local_data.job_definitions = {}
+
+        return self.__thread_local_data.job_definitions
+
+    def get_job_definition(self, job_def_id: int, session: Session) -> Optional["JobDefinition"]:
+        """
+        Returns the job definition with the given id, bound to session. The first lookup loads it and keeps a
+        detached copy, later lookups from the same thread merge that copy into their session without querying,
+        until the ttl expires or the definition is saved. Changes a job makes to its definition are persisted
+        with the session.
+        """
+        from base_dash_app.models.job_definition import JobDefinition
+
+        cache = self.__get_job_definition_cache()
+        version = get_job_definition_version(job_def_id)
+        cached = cache.get(job_def_id)
+        if cached is None or cached[0] + self.job_definition_cache_ttl <= time.monotonic() or cached[1] != version:
+            job_def: Optional[JobDefinition] = session.query(JobDefinition).filter_by(id=job_def_id).first()
+            if job_def is None:
+                cache.pop(job_def_id, None)
+                return None
+
+            # load relationships now, merging without loading only copies what is loaded. History is not loaded
+            # here, jobs that need it call ensure_events_hydrated
+            _ = job_def.parameters
+            session.expunge(job_def)
+            cached = (time.monotonic(), version, job_def)
+            cache[job_def_id] = cached
+
+        # the cached copy stays clean and detached, so it can be merged without a query
+        job_def = session.merge(cached[2], load=False)
+        job_def.set_vars_from_kwargs(**self.base_service_args)
+        return job_def
+
+    def invalidate_job_definition(self, job_def_id: int = None):
+        cache = self.__get_job_definition_cache()
+        if job_def_id is None:
+            cache.clear()
+        else:
+            cache.pop(job_def_id, None)
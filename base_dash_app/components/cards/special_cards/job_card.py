@@ -1,7 +1,8 @@
+import collections
 import datetime
 import pprint
 import time
-from typing import List, Dict, Optional, Tuple, Union, Type
+from typing import List, Dict, Optional, Tuple, Union, Type, Deque
 
 import dash
 import dash_bootstrap_components as dbc
@@ -21,8 +22,10 @@ from base_dash_app.enums.status_colors import StatusesEnum
 from base_dash_app.models.base_model import BaseModel
 from base_dash_app.models.job_definition import JobDefinition
 from base_dash_app.models.job_definition_parameter import JobDefinitionParameter
+from base_dash_app.models.job_instance import JobInstance
+from base_dash_app.models.job_log_chunk import JobLogChunk
 from base_dash_app.services.job_definition_service import JobDefinitionService, JobDefinitionImpl
-from base_dash_app.utils import date_utils
+from base_dash_app.utils import date_utils, job_log_utils
 from base_dash_app.virtual_objects.interfaces.selectable import Selectable, CachedSelectable
 from base_dash_app.virtual_objects.job_progress_container import VirtualJobProgressContainer
 
@@ -76,13 +79,17 @@ class JobCard(ComponentWithInternalCallback):
         self.selectable_param = None
         self.selectable_to_prog_containers: Dict[Selectable, Optional[VirtualJobProgressContainer]] = {}
         self.selectable_id_to_selectable: Dict[int, Selectable] = {}
+        # job instance id -> (stream cursor, latest lines) of the logs being tailed
+        self.log_tails: Dict[int, Tuple[Optional[str], Deque[str]]] = {}
+        # (job instance id, latest lines) of the last finished instance's archived log
+        self.archived_log_tail: Tuple[Optional[int], List[str]] = (None, [])
 
     def refresh_selectables_info(self):
         """
         Refreshes the selectable_to_prog_containers dict and the selectable_id_to_selectable dict
         :return:
         """
-        session: Session = self.dbm.get_session()
+        session: Session = self.dbm.get_read_session()
         in_progress_instances = self.job_definition.get_in_progress_instances_by_selectable(
             session=session,
         )
@@ -94,7 +101,7 @@ class JobCard(ComponentWithInternalCallback):
 
         self.selectable_to_prog_containers = {
             selectable: None
-            for selectable in job_class.get_selectables_by_param_name(self.selectable_param, session=session)
+            for selectable in job_class.get_cached_selectables(self.selectable_param, session=session)
         }
 
         for ji in in_progress_instances:
@@ -176,6 +183,7 @@ class JobCard(ComponentWithInternalCallback):
             instance.job_definition.clear_all()
             for job_instance in job_instances:
                 instance.job_definition.process_result(job_instance.get_result(), job_instance)
+            instance.job_definition.events_hydrated = True
 
         elif triggering_id.startswith(JOB_RUNNER_BTN_ID):
             """
@@ -356,24 +364,60 @@ class JobCard(ComponentWithInternalCallback):
             self.custom_prog_container is not None and self.custom_prog_container.is_in_progress()
         )
 
+    def get_log_tail(self, container: VirtualJobProgressContainer) -> List[str]:
+        """
+        The latest lines of container's log. Each call only reads the lines added since the previous one.
+        """
+        log_stream = container.get_log_stream()
+        if log_stream is None:
+            return container.log_archive.get_tail(job_log_utils.DEFAULT_TAIL_SIZE)
+
+        cursor, tail = self.log_tails.get(container.job_instance_id, (None, None))
+        if tail is None:
+            tail = collections.deque(maxlen=job_log_utils.DEFAULT_TAIL_SIZE)
+
+        tailing = cursor is not None
+        lines, cursor = log_stream.read_after(cursor, count=job_log_utils.DEFAULT_TAIL_SIZE)
+        if tailing and len(lines) == job_log_utils.DEFAULT_TAIL_SIZE:
+            # more lines than fit in the tail were added since the last read, skip to the latest ones
+            lines, cursor = log_stream.read_after(None, count=job_log_utils.DEFAULT_TAIL_SIZE)
+            tail.clear()
+
+        tail.extend(lines)
+
+        self.log_tails[container.job_instance_id] = (cursor, tail)
+        return list(tail)
+
     def render_log_div(self, container: VirtualJobProgressContainer, wrapper_div_style=None):
         if self.hide_log_div:
             return None
 
-        if wrapper_div_style is None:
-            wrapper_div_style = {}
-
         if not (container is not None and container.is_in_progress()):
             # if container doesn't exist or if it does and is not in progress, return None
+            if container is not None:
+                self.log_tails.pop(container.job_instance_id, None)
             return None
 
-        if container.logs is None:
-            logs = []
-        else:
-            logs = container.logs
+        return self.render_log_lines(self.get_log_tail(container), wrapper_div_style)
+
+    def get_archived_log_tail(self, job_instance: JobInstance, session: Session) -> List[str]:
+        """
+        The latest lines of a finished instance's archived log. They don't change once archived, so they are only
+        read again when a newer instance finishes.
+        """
+        job_instance_id, tail = self.archived_log_tail
+        if job_instance_id != job_instance.id:
+            tail = JobLogChunk.get_logs_for_instance(session, job_instance)[-job_log_utils.DEFAULT_TAIL_SIZE:]
+            self.archived_log_tail = (job_instance.id, tail)
+
+        return tail
+
+    def render_log_lines(self, lines: List[str], wrapper_div_style=None):
+        if wrapper_div_style is None:
+            wrapper_div_style = {}
 
         children = []
-        for log in logs:
+        for log in lines:
             style = {
                 "lineHeight": "18px", "margin": 0,
                 "flex": "none", "color": "black", "fontWeight": "normal",
@@ -398,7 +442,7 @@ class JobCard(ComponentWithInternalCallback):
             )
 
         return html.Div(
-            children=children[:100],
+            children=children[:job_log_utils.DEFAULT_TAIL_SIZE],
             style={
                 "width": "100%",
                 "height": "100%",
@@ -429,6 +473,7 @@ class JobCard(ComponentWithInternalCallback):
         job = self.job_definition
         session: Session = dbm.get_session()
         session.add(job)
+        job.ensure_events_hydrated()
         selectable_in_progress, custom_in_progress = self.__any_in_progress()
 
         last_run_error_message = None
@@ -443,7 +488,11 @@ class JobCard(ComponentWithInternalCallback):
                         dbc.Alert(
                             job_instance.end_reason,
                             color=job_instance.result.status.value.hex_color
-                        )
+                        ),
+                        self.render_log_lines(
+                            self.get_archived_log_tail(job_instance, session),
+                            wrapper_div_style={"maxHeight": "300px"}
+                        ) if not self.hide_log_div else None,
                     ],
                     style={"marginTop": "20px", "width": "100%", "float": "left"}
                 )
@@ -668,12 +717,12 @@ class JobCard(ComponentWithInternalCallback):
 
         try:
             last_exec_for_selectable = type(self.job_definition).get_latest_exec_for_selectable(
-                selectable, dbm.get_session()
+                selectable, dbm.get_read_session()
             )
         except InvalidRequestError as ire:
             self.logger.error(f"InvalidRequestError: {ire}")
             last_exec_for_selectable = type(self.job_definition).get_latest_exec_for_selectable(
-                selectable, dbm.get_session()
+                selectable, dbm.get_read_session()
             )
 
         last_run_time = last_exec_for_selectable.start_time if last_exec_for_selectable is not None else None
@@ -758,7 +807,7 @@ class JobCard(ComponentWithInternalCallback):
                 )
             elif param.param_type in [bool, Selectable]:
                 if param.param_type == Selectable:
-                    selectables = job.get_selectables_by_param_name(
+                    selectables = job.get_cached_selectables(
                         param.variable_name,
                         session=session
                     )
@@ -96,10 +96,18 @@ class SimpleTimeSeriesDashboard(ComponentWithInternalCallback):
             if instance.get_service is not None:
                 async_service: AsyncHandlerService = instance.get_service(AsyncHandlerService)
 
-                def done_callback(*args, **kwargs):
-                    instance.current_async_container = None
+                # repeated reload clicks join the reload in flight instead of queueing another
+                async_container = async_service.do_work(reload_tsdps, dedupe_key=("reload", instance.id))
 
-                instance.current_async_container = async_service.do_work(reload_tsdps, done_callback=done_callback)
+                def done_callback(*args, **kwargs):
+                    # a later reload may have replaced this one already
+                    if instance.current_async_container is async_container:
+                        instance.current_async_container = None
+
+                # assigned before the callback is added: a saturated executor can return work that is already done,
+                # whose callback runs straight away
+                instance.current_async_container = async_container
+                async_container.future.add_done_callback(done_callback)
             else:
                 reload_tsdps()
 
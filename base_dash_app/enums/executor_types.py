@@ -0,0 +1,10 @@
+from enum import Enum
+
+
+class ExecutorTypesEnum(Enum):
+    """
+    Where async work runs: threads share memory but hold the GIL while running python, processes don't share the
+    GIL, but their work and its arguments have to be picklable.
+    """
+    THREAD = "thread"
+    PROCESS = "process"
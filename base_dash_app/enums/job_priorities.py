@@ -0,0 +1,11 @@
+from enum import Enum
+
+
+class JobPrioritiesEnum(Enum):
+    """
+    Celery message priorities for job runs. With the redis broker, 0 is the highest priority.
+    """
+    INTERACTIVE = 0
+    DEFAULT = 3
+    SCHEDULED = 6
+    BULK = 9
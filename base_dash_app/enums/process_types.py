@@ -0,0 +1,12 @@
+from enum import Enum
+
+
+class ProcessTypesEnum(Enum):
+    """
+    The kind of process the framework is running in, used to pick per-process defaults such as db pool sizes.
+    """
+    GUNICORN = "gunicorn"
+    CELERY_PREFORK = "celery_prefork"
+    CELERY_THREADS = "celery_threads"
+    CELERY_SOLO = "celery_solo"
+    OTHER = "other"
@@ -0,0 +1,13 @@
+from enum import Enum
+
+
+class RejectionPoliciesEnum(Enum):
+    """
+    What a ManagedExecutor does with work submitted while its queue is full.
+    """
+    # raise ExecutorSaturatedError
+    ABORT = "abort"
+    # run the work on the submitting thread, which slows submitters down to the executor's pace
+    CALLER_RUNS = "caller_runs"
+    # drop the work, the returned future is already cancelled
+    DISCARD = "discard"
@@ -36,3 +36,17 @@ class BaseModel(db.Model, metaclass=CombinedMeta):
     def to_dict(self):
         return vars(self)
 
+
+class DimensionModel(BaseModel):
+    """
+    A row a Dimension (e.g. a player or an army) is built from.
+    """
+    __abstract__ = True
+
+    @abstractmethod
+    def get_name(self):
+        pass
+
+    @abstractmethod
+    def get_color(self):
+        pass
@@ -8,10 +8,11 @@ from operator import or_
 from timeit import timeit
 from typing import Optional, List, Dict, Any, Tuple, FrozenSet, TypeVar, Type
 
-from sqlalchemy import Column, Integer, Sequence, String, orm, Boolean, select, func
+from sqlalchemy import Column, Integer, Sequence, String, orm, Boolean, select, func, inspect
 from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import relationship, Session
 
+from base_dash_app.enums.job_priorities import JobPrioritiesEnum
 from base_dash_app.enums.log_levels import LogLevelsEnum
 from base_dash_app.enums.status_colors import StatusesEnum
 from base_dash_app.models.base_model import BaseModel
@@ -24,6 +25,7 @@ from base_dash_app.virtual_objects.interfaces.selectable import Selectable, Cach
 from base_dash_app.virtual_objects.interfaces.startable import Startable
 from base_dash_app.virtual_objects.interfaces.stoppable import Stoppable
 from base_dash_app.virtual_objects.job_progress_container import VirtualJobProgressContainer
+from base_dash_app.virtual_objects.selectable_cache import selectable_cache, DEFAULT_SELECTABLES_CACHE_TTL
 from base_dash_app.virtual_objects.virtual_framework_obj import VirtualFrameworkObject
 
 
@@ -92,13 +94,71 @@ class JobDefinition(CachedResultableEventSeries, Startable, Stoppable, BaseModel
 
         if issubclass(selectable_type, BaseModel):
             return session.query(selectable_type).get(value)
-        else:
-            cached_selectables = cls.get_selectables_by_param_name(param_name, session)
-            for cached_selectable in cached_selectables:
-                if cached_selectable.get_value() == value:
-                    return cached_selectable
 
-        return None
+        return cls.get_selectables_cache_entry(param_name, session).get_by_value(value)
+
+    @classmethod
+    def selectables_cache_ttl(cls) -> Optional[float]:
+        """
+        Seconds that the results of get_selectables_by_param_name are reused for. Override to change it,
+        return None to keep them until invalidate_selectables_cache is called.
+        """
+        return DEFAULT_SELECTABLES_CACHE_TTL
+
+    @classmethod
+    def get_selectables_cache_entry(cls, param_name: str, session: Session):
+        entry = selectable_cache.get(cls, param_name, cls.selectables_cache_ttl())
+        if entry is None:
+            selectable_type = cls.get_selectable_type()
+            entry = selectable_cache.put(
+                cls, param_name, cls.get_selectables_by_param_name(param_name, session),
+                holds_models=selectable_type is not None and issubclass(selectable_type, BaseModel)
+            )
+
+        return entry
+
+    @classmethod
+    def get_cached_selectables(cls, param_name: str, session: Session) -> List[Selectable]:
+        """
+        Cached version of get_selectables_by_param_name. Model selectables are loaded by primary key into session,
+        in one query, in the order get_selectables_by_param_name returned them. Other selectables are
+        CachedSelectables, so they can be shared across sessions and threads.
+        """
+        entry = cls.get_selectables_cache_entry(param_name, session)
+        if not entry.holds_models:
+            return entry.selectables
+
+        if len(entry.values) == 0:
+            return []
+
+        selectable_type = cls.get_selectable_type()
+        primary_key = inspect(selectable_type).primary_key[0]
+        rows_by_value = {
+            row.get_value(): row
+            for row in session.query(selectable_type).filter(primary_key.in_(entry.values)).all()
+        }
+        # rows deleted since the cache was loaded are left out
+        return [rows_by_value[value] for value in entry.values if value in rows_by_value]
+
+    @classmethod
+    def invalidate_selectables_cache(cls, param_name: str = None):
+        selectable_cache.invalidate(job_class=cls, param_name=param_name)
+
+    @classmethod
+    def warm_selectables_cache(cls, session: Session):
+        """
+        Loads the selectables of the single selectable param into the cache. When the selectable type is a model,
+        the cache is also invalidated whenever a row of it is inserted, updated or deleted in this process.
+        """
+        param_name = cls.single_selectable_param_name()
+        selectable_type = cls.get_selectable_type()
+        if param_name is None or selectable_type is None:
+            return
+
+        if issubclass(selectable_type, BaseModel):
+            selectable_cache.invalidate_on_change(selectable_type, cls)
+
+        cls.get_selectables_cache_entry(param_name, session)
 
     @classmethod
     def get_selectable_type(cls) -> Optional[Type[Selectable]]:
@@ -204,6 +264,59 @@ class JobDefinition(CachedResultableEventSeries, Startable, Stoppable, BaseModel
         """
         return False
 
+    @classmethod
+    def queue_name(cls) -> Optional[str]:
+        """
+        Celery queue runs of this job are sent to. None sends them to the default queue.
+        Workers have to be started with -Q for any queue used here.
+        """
+        return None
+
+    @classmethod
+    def priority(cls) -> int:
+        """
+        Priority of runs started by a user. With the redis broker, 0 is the highest priority.
+        """
+        return JobPrioritiesEnum.INTERACTIVE.value
+
+    @classmethod
+    def scheduled_priority(cls) -> int:
+        """
+        Priority of runs started by the scheduler. Lower than interactive runs by default, so a burst of
+        scheduled runs doesn't starve runs started from the UI.
+        """
+        return JobPrioritiesEnum.SCHEDULED.value
+
+    @classmethod
+    def soft_time_limit(cls) -> Optional[int]:
+        """
+        Seconds after which SoftTimeLimitExceeded is raised inside the job. None means no limit.
+        """
+        return None
+
+    @classmethod
+    def time_limit(cls) -> Optional[int]:
+        """
+        Seconds after which the worker running the job is killed. None means no limit.
+        """
+        return None
+
+    @classmethod
+    def max_concurrency(cls) -> Optional[int]:
+        """
+        Maximum number of runs of this job class that can execute at the same time across all workers.
+        Runs over the limit wait in the queue. None means no limit.
+        """
+        return None
+
+    @classmethod
+    def max_progress_writes_per_second(cls) -> Optional[float]:
+        """
+        How often a run's progress is written to redis at most. Progress set more often than this is coalesced,
+        only the latest value is written. None writes every update.
+        """
+        return 5.0
+
     @classmethod
     def get_general_params(cls):
         return []
@@ -235,7 +348,7 @@ class JobDefinition(CachedResultableEventSeries, Startable, Stoppable, BaseModel
 
     def sync_single_selectable_data(self, session: Session):
         if self.single_selectable_param_name is not None:
-            self.cached_selectables = type(self).get_selectables_by_param_name(
+            self.cached_selectables = type(self).get_cached_selectables(
                 self.single_selectable_param_name,
                 session=session
             )
@@ -247,7 +360,8 @@ class JobDefinition(CachedResultableEventSeries, Startable, Stoppable, BaseModel
         Startable.__init__(self)
         Stoppable.__init__(self)
         self.logger = logging.getLogger(self.name)
-        self.rehydrate_events_from_db()
+        # history is loaded on first use (see ensure_events_hydrated), so loading definitions stays cheap
+        self.events_hydrated: bool = False
 
     def rehydrate_events_from_db(self):
         self.clear_all()
@@ -256,6 +370,16 @@ class JobDefinition(CachedResultableEventSeries, Startable, Stoppable, BaseModel
             ji: JobInstance
             self.process_result(ji.get_result(), ji)
 
+        self.events_hydrated = True
+
+    def ensure_events_hydrated(self):
+        """
+        Replays the definition's run history into its events and statistics, once. Definitions are loaded without
+        it, code that reads events, streaks or success ratios (e.g. a job's hooks) calls this first.
+        """
+        if not getattr(self, "events_hydrated", False):
+            self.rehydrate_events_from_db()
+
     def is_in_progress(self) -> bool:
         raise Exception("Deprecated")
 
@@ -0,0 +1,78 @@
+import json
+import threading
+from typing import List, Dict
+
+from sqlalchemy import Column, Integer, Sequence, ForeignKey, LargeBinary, inspect
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from base_dash_app.models.base_model import BaseModel
+from base_dash_app.utils import job_log_utils
+
+
+_table_exists_by_engine: Dict[Engine, bool] = {}
+_table_exists_lock = threading.Lock()
+
+
+class JobLogChunk(BaseModel):
+    """
+    Part of a finished job instance's log, compressed. Written once when the instance completes.
+    The job_log_chunks table is created by upgrade_db (or db.create_all). Until it exists, finished instances keep
+    their logs as json in job_instances.logs, as before. Whether it exists is checked once per engine, so a process
+    started before the table was created keeps using job_instances.logs until it is restarted.
+    """
+    __tablename__ = "job_log_chunks"
+
+    id = Column(Integer, Sequence("job_log_chunks_id_seq"), primary_key=True)
+    job_instance_id = Column(Integer, ForeignKey("job_instances.id"), index=True)
+    chunk_index = Column(Integer)
+    num_lines = Column(Integer)
+    data = Column(LargeBinary)
+
+    def get_lines(self) -> List[str]:
+        return job_log_utils.decompress_lines(self.data)
+
+    @staticmethod
+    def table_exists(session: Session) -> bool:
+        engine: Engine = session.get_bind().engine
+        with _table_exists_lock:
+            if engine not in _table_exists_by_engine:
+                _table_exists_by_engine[engine] = inspect(engine).has_table(JobLogChunk.__tablename__)
+
+            return _table_exists_by_engine[engine]
+
+    @staticmethod
+    def get_logs_for_instance(session: Session, job_instance) -> List[str]:
+        """
+        :return: the archived log lines of job_instance. Instances archived before logs were chunked, or while the
+            table didn't exist, keep their logs as json on the instance.
+        """
+        if not JobLogChunk.table_exists(session):
+            return json.loads(job_instance.logs) if job_instance.logs else []
+
+        chunks: List[JobLogChunk] = (
+            session.query(JobLogChunk)
+            .filter_by(job_instance_id=job_instance.id)
+            .order_by(JobLogChunk.chunk_index)
+            .all()
+        )
+
+        if len(chunks) == 0:
+            return json.loads(job_instance.logs) if job_instance.logs else []
+
+        return [line for chunk in chunks for line in chunk.get_lines()]
+
+    def __lt__(self, other):
+        return (self.job_instance_id, self.chunk_index) < (other.job_instance_id, other.chunk_index)
+
+    def __eq__(self, other):
+        return isinstance(other, JobLogChunk) and self.id == other.id
+
+    def __hash__(self):
+        return hash(f"job-log-chunk-{self.id}")
+
+    def __repr__(self):
+        return f"JobLogChunk(job_instance_id={self.job_instance_id}, chunk_index={self.chunk_index})"
+
+    def __str__(self):
+        return self.__repr__()
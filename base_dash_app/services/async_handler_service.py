@@ -1,12 +1,20 @@
 import concurrent
+import math
+import multiprocessing
+import os
+import threading
 import traceback
-from concurrent.futures import ThreadPoolExecutor, Future
-from typing import Optional, List, Callable, Any, Dict
+from concurrent.futures import Future
+from typing import Optional, List, Callable, Any, Dict, Hashable, Sequence
 
 from celery import Task
 
+from base_dash_app.enums.executor_types import ExecutorTypesEnum
+from base_dash_app.enums.rejection_policies import RejectionPoliciesEnum
 from base_dash_app.enums.status_colors import StatusesEnum
 from base_dash_app.services.base_service import BaseService
+from base_dash_app.utils.managed_executor import ManagedExecutor
+from base_dash_app.virtual_objects.async_vos import process_work
 from base_dash_app.virtual_objects.async_vos.work_containers import WorkContainer, WorkContainerGroup
 from base_dash_app.virtual_objects.interfaces.startable import BaseWorkContainer
 
@@ -37,12 +45,19 @@ class AsyncTask(AsyncWorkProgressContainer):
     def __init__(
             self,
             work_func: Callable[[AsyncWorkProgressContainer, Any, Optional[Dict]], Any] = None,
-            func_kwargs: Dict[str, Any] = None, task_name: str = None, is_hidden: bool = False
+            func_kwargs: Dict[str, Any] = None, task_name: str = None, is_hidden: bool = False,
+            executor_type: ExecutorTypesEnum = ExecutorTypesEnum.THREAD,
     ):
+        """
+        :param executor_type: PROCESS runs work_func in AsyncHandlerService's process pool when the task is
+            submitted. work_func, its input and kwargs must then be picklable (e.g. a module level function), and
+            it gets a ProcessWorkContainer, which reports progress back to this task, instead of the task itself.
+        """
         super().__init__(is_hidden=is_hidden)
         self.work_func = work_func
         self.func_kwargs = func_kwargs or {}
         self.name = task_name
+        self.executor_type: ExecutorTypesEnum = executor_type
         # todo: think about done callbacks
 
     def __repr__(self):
@@ -164,6 +179,22 @@ class AsyncOrderedTaskGroup(AsyncGroupProgressContainer, AsyncTask):
         return self.result
 
 
+def map_chunk(func: Callable[[Any], Any], chunk: Sequence, reducer: Callable[[Any, Any], Any] = None) -> Any:
+    """
+    Maps func over chunk and, with a reducer, folds the results into one partial result.
+    Module level, so process pools can pickle it.
+    """
+    if reducer is None:
+        return [func(item) for item in chunk]
+
+    results = (func(item) for item in chunk)
+    accumulated = next(results)
+    for result in results:
+        accumulated = reducer(accumulated, result)
+
+    return accumulated
+
+
 class AsyncUnorderedTaskGroup(WorkContainerGroup, AsyncTask):
     def __init__(
             self, async_service: 'AsyncHandlerService',
@@ -171,7 +202,12 @@ class AsyncUnorderedTaskGroup(WorkContainerGroup, AsyncTask):
             task_group_title: str = None,
             reducer_func: Callable[[List[Any]], Any] = None,
             clear_intermediate_results: bool = True,
+            executor_type: ExecutorTypesEnum = None,
     ):
+        """
+        :param executor_type: where to run the tasks, None to leave it to each task. With PROCESS, a large
+            task_input is put in shared memory once for all tasks instead of being pickled for each of them.
+        """
         super().__init__(async_tasks)
         AsyncTask.__init__(self, work_func=self.start, task_name=task_group_title)
         self.work_containers: List[AsyncTask] = async_tasks or []
@@ -183,6 +219,7 @@ class AsyncUnorderedTaskGroup(WorkContainerGroup, AsyncTask):
             self.reducer_func = reducer_func
 
         self.clear_intermediate_results = clear_intermediate_results
+        self.group_executor_type: Optional[ExecutorTypesEnum] = executor_type
 
     def __repr__(self):
         return f"[{self.__class__.__name__}]-{self.name}-{self.id}"
@@ -199,8 +236,26 @@ class AsyncUnorderedTaskGroup(WorkContainerGroup, AsyncTask):
     def start(self, task_input=None):
         self.reset()
 
+        shared_input = None
+        if any(self.get_executor_type(task) == ExecutorTypesEnum.PROCESS for task in self.work_containers):
+            task_input = shared_input = process_work.share_input(task_input)
+            if not isinstance(shared_input, process_work.SharedInput):
+                shared_input = None
+
+        try:
+            self.__run_tasks(task_input)
+        finally:
+            if shared_input is not None:
+                shared_input.unlink()
+
+    def get_executor_type(self, task: AsyncTask) -> ExecutorTypesEnum:
+        return self.group_executor_type or task.executor_type
+
+    def __run_tasks(self, task_input):
         for async_task in self.work_containers:
-            self.async_service.submit_async_task(async_task, task_input=task_input)
+            self.async_service.submit_async_task(
+                async_task, task_input=task_input, executor_type=self.get_executor_type(async_task)
+            )
 
         task_to_futures_map: Dict[AsyncTask, Future] = {task: task.future for task in self.work_containers}
         try:
@@ -230,6 +285,94 @@ class AsyncUnorderedTaskGroup(WorkContainerGroup, AsyncTask):
                 stacktrace=traceback.format_exc()
             )
 
+    def map_reduce(
+            self, func: Callable[[Any], Any], items: Sequence,
+            chunk_size: int = None,
+            reducer: Callable[[Any, Any], Any] = None,
+            executor_type: ExecutorTypesEnum = None,
+            timeout_seconds: float = None,
+    ) -> Any:
+        """
+        Runs func over items in chunks on the async service's pool, without an AsyncTask per item. Progress is
+        reported in this group's single container, and chunk results are reduced as they come in, so only the
+        chunks in flight hold results. Replaces the group's tasks.
+        :param chunk_size: items per chunk, by default enough for each worker to get about 4 chunks
+        :param reducer: associative function taking (accumulated, result) and returning the new accumulated
+            value. Chunks are reduced where they run and their partial results are then reduced here, in
+            completion order. Without one, the result is the list of func's results, in items' order.
+        :param executor_type: defaults to the group's executor_type, or threads. In processes, func and reducer
+            must be picklable and items are pickled chunk by chunk.
+        :return: the reduced result, also this group's result. Raises the first chunk failure.
+        """
+        executor = self.async_service.get_executor(
+            executor_type or self.group_executor_type or ExecutorTypesEnum.THREAD
+        )
+        num_items = len(items)
+        chunk_size = chunk_size or max(1, math.ceil(num_items / (executor.max_workers * 4)))
+        chunk_starts = list(range(0, num_items, chunk_size))
+
+        progress_container = AsyncTask(task_name=self.task_group_title or "map reduce")
+        self.work_containers = [progress_container]
+        self.reset()
+        WorkContainer.start(progress_container)
+
+        accumulated = None
+        has_accumulated = False
+        results_by_chunk: Dict[int, List[Any]] = {}
+        num_done = 0
+        # a couple of chunks per worker in flight keeps the pool busy without queueing every chunk at once
+        max_in_flight = executor.max_workers * 2
+        next_chunk = 0
+        futures_to_chunks: Dict[Future, int] = {}
+        try:
+            while next_chunk < len(chunk_starts) or len(futures_to_chunks) > 0:
+                while next_chunk < len(chunk_starts) and len(futures_to_chunks) < max_in_flight:
+                    start = chunk_starts[next_chunk]
+                    future = executor.submit(
+                        map_chunk, func, items[start:start + chunk_size], reducer, timeout_seconds=timeout_seconds
+                    )
+                    futures_to_chunks[future] = next_chunk
+                    next_chunk += 1
+
+                done, _ = concurrent.futures.wait(
+                    list(futures_to_chunks.keys()), return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    chunk_index = futures_to_chunks.pop(future)
+                    partial_result = future.result()
+                    if reducer is None:
+                        results_by_chunk[chunk_index] = partial_result
+                    elif not has_accumulated:
+                        accumulated = partial_result
+                        has_accumulated = True
+                    else:
+                        accumulated = reducer(accumulated, partial_result)
+
+                    num_done += min(chunk_size, num_items - chunk_starts[chunk_index])
+
+                progress_container.set_progress(num_done / max(num_items, 1) * 100)
+                progress_container.set_status_message(f"{num_done} / {num_items} items")
+        except Exception as e:
+            for future in futures_to_chunks.keys():
+                future.cancel()
+
+            self.complete(
+                status=StatusesEnum.FAILURE,
+                status_message=f"{num_done} / {num_items} items - {str(e)}",
+                stacktrace=traceback.format_exc()
+            )
+            raise e
+
+        if reducer is None:
+            accumulated = [result for i in range(len(chunk_starts)) for result in results_by_chunk[i]]
+
+        self.complete(
+            status=StatusesEnum.SUCCESS,
+            status_message=f"{num_items} items - {progress_container.get_time_taken_message()}",
+            result=accumulated,
+        )
+        return accumulated
+
     def get_result(self, clear_result=False) -> Any:
         return self.result
 
@@ -249,28 +392,179 @@ class AsyncUnorderedTaskGroup(WorkContainerGroup, AsyncTask):
 
 
 class AsyncHandlerService(BaseService):
-    def __init__(self, max_workers=5, **kwargs):
+    def __init__(
+            self, max_workers=5,
+            max_queue_size: int = None,
+            rejection_policy: RejectionPoliciesEnum = RejectionPoliciesEnum.CALLER_RUNS,
+            max_process_workers: int = None,
+            **kwargs
+    ):
+        """
+        :param max_queue_size: how much work may wait for a free thread, None for no limit
+        :param rejection_policy: what happens to work submitted while the queue is full
+        :param max_process_workers: size of the process pool used for ExecutorTypesEnum.PROCESS work, defaults to
+            the number of cpus. The pool is only started when first used.
+        """
         super().__init__(**kwargs)
 
-        self.threadpool_executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.executor: ManagedExecutor = ManagedExecutor(
+            name="async_threads",
+            max_workers=max_workers,
+            max_queue_size=max_queue_size,
+            rejection_policy=rejection_policy,
+        )
+        self.max_process_workers: int = max_process_workers or os.cpu_count() or 1
+        self.rejection_policy: RejectionPoliciesEnum = rejection_policy
+        self.max_queue_size: Optional[int] = max_queue_size
+        self.__process_executor: Optional[ManagedExecutor] = None
+        self.__process_executor_pid: Optional[int] = None
+        self.__process_executor_lock = threading.Lock()
+        self.mp_context = multiprocessing.get_context("spawn")
+        self.__progress_channel: Optional[process_work.ProcessProgressChannel] = None
+        self.__progress_channel_pid: Optional[int] = None
+
+    def get_process_executor(self) -> ManagedExecutor:
+        # a pool inherited through a fork belongs to the parent, forked workers start their own
+        with self.__process_executor_lock:
+            if self.__process_executor is None or self.__process_executor_pid != os.getpid():
+                self.__process_executor = ManagedExecutor(
+                    name="async_processes",
+                    max_workers=self.max_process_workers,
+                    max_queue_size=self.max_queue_size,
+                    rejection_policy=self.rejection_policy,
+                    executor_type=ExecutorTypesEnum.PROCESS,
+                    mp_context=self.mp_context,
+                )
+                self.__process_executor_pid = os.getpid()
+
+            return self.__process_executor
+
+    def get_executor(self, executor_type: ExecutorTypesEnum = ExecutorTypesEnum.THREAD) -> ManagedExecutor:
+        if executor_type == ExecutorTypesEnum.PROCESS:
+            return self.get_process_executor()
 
-    def do_work(self, func, done_callback=None, *args, **kwargs):
+        return self.executor
 
+    def do_work(
+            self, func, done_callback=None, *args,
+            dedupe_key: Hashable = None,
+            timeout_seconds: float = None,
+            executor_type: ExecutorTypesEnum = ExecutorTypesEnum.THREAD,
+            **kwargs
+    ):
+        """
+        Runs func(*args, async_container=..., **kwargs) in the background.
+        :param dedupe_key: while work with the same key is queued or running, its container is returned instead
+            of running func again
+        :param timeout_seconds: fails the container's future if the work hasn't finished by then
+        :param executor_type: PROCESS runs func in the process pool. func and its arguments have to be picklable
+            there, so no async_container is passed to it.
+        :return: the AsyncWorkProgressContainer tracking the work, whose future is the work's future
+        """
         async_container: AsyncWorkProgressContainer = AsyncWorkProgressContainer()
-        kwargs['async_container'] = async_container
+        if executor_type == ExecutorTypesEnum.THREAD:
+            kwargs['async_container'] = async_container
+
+        future = self.get_executor(executor_type).submit(
+            func, *args, dedupe_key=dedupe_key, timeout_seconds=timeout_seconds, **kwargs
+        )
 
-        if done_callback is None:
-            async_container.future = self.threadpool_executor.submit(func, *args, **kwargs)
+        existing_container = getattr(future, "async_container", None)
+        if existing_container is not None:
+            async_container = existing_container
         else:
-            async_container.future = (
-                self.threadpool_executor
-                .submit(func, *args, **kwargs)
-                .add_done_callback(done_callback)
-            )
+            future.async_container = async_container
+            async_container.future = future
+
+        if done_callback is not None:
+            future.add_done_callback(done_callback)
 
         return async_container
 
-    def submit_async_task(self, async_task: AsyncTask, task_input=None):
+    def cancel_work(self, async_container: AsyncWorkProgressContainer) -> bool:
+        """
+        Cancels work started with do_work or submit_async_task. Work that is already running keeps running, but
+        its result is dropped.
+        """
+        if async_container.future is None:
+            return False
+
+        progress_channel = self.__progress_channel
+        if progress_channel is not None and self.__process_executor_pid == os.getpid():
+            # running in a process: ask the work to stop at its next check_for_interrupt
+            progress_channel.interrupt(async_container)
+
+        return async_container.future.cancel()
+
+    def get_progress_channel(self) -> process_work.ProcessProgressChannel:
+        with self.__process_executor_lock:
+            if self.__progress_channel is None or self.__progress_channel_pid != os.getpid():
+                self.__progress_channel = process_work.ProcessProgressChannel(self.mp_context)
+                self.__progress_channel_pid = os.getpid()
+
+            return self.__progress_channel
+
+    def submit_async_task(
+            self, async_task: AsyncTask, task_input=None, timeout_seconds: float = None,
+            executor_type: ExecutorTypesEnum = None
+    ):
+        """
+        :param executor_type: overrides the task's own executor_type. Groups always run on a thread, their tasks
+            are submitted according to their own types.
+        """
         async_task.reset()
-        async_task.future = self.threadpool_executor.submit(async_task.start, task_input=task_input)
+        executor_type = executor_type or async_task.executor_type
+        if executor_type != ExecutorTypesEnum.PROCESS or isinstance(async_task, AsyncGroupProgressContainer):
+            async_task.future = self.executor.submit(
+                async_task.start, task_input=task_input, timeout_seconds=timeout_seconds
+            )
+            return async_task
+
+        shared_input = None
+        if not isinstance(task_input, process_work.SharedInput):
+            task_input = shared_input = process_work.share_input(task_input)
+            if not isinstance(shared_input, process_work.SharedInput):
+                shared_input = None
+
+        progress_channel = self.get_progress_channel()
+        try:
+            pool_future = self.get_process_executor().submit(
+                process_work.run_in_process,
+                async_task.work_func, progress_channel.open(async_task), task_input, async_task.func_kwargs,
+                timeout_seconds=timeout_seconds,
+            )
+        except Exception:
+            if shared_input is not None:
+                shared_input.unlink()
+            raise
+
+        # the task's future only completes once the final state is applied to the task, so whoever waits on it
+        # can read the task's result
+        task_future = Future()
+
+        def close(done_future: Future):
+            try:
+                progress_channel.close(async_task, done_future)
+                if shared_input is not None:
+                    shared_input.unlink()
+            finally:
+                if task_future.done():
+                    pass
+                elif done_future.cancelled():
+                    task_future.cancel()
+                elif done_future.exception() is not None:
+                    task_future.set_exception(done_future.exception())
+                else:
+                    task_future.set_result(done_future.result())
+
+        task_future.add_done_callback(lambda done_future: done_future.cancelled() and pool_future.cancel())
+        async_task.future = task_future
+        pool_future.add_done_callback(close)
         return async_task
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        stats = {self.executor.name: self.executor.get_stats()}
+        if self.__process_executor is not None and self.__process_executor_pid == os.getpid():
+            stats[self.__process_executor.name] = self.__process_executor.get_stats()
+
+        return stats
@@ -1,13 +1,19 @@
 from abc import ABC, ABCMeta
-from typing import TypeVar, Type, List, Generic
+from contextlib import contextmanager
+from typing import TypeVar, Type, List, Generic, Iterator, Iterable, Union
 
-from sqlalchemy.orm import Session
+from sqlalchemy import inspect, func, tuple_
+from sqlalchemy.orm import Session, object_session
 
 from base_dash_app.models.base_model import BaseModel
+from base_dash_app.utils import bulk_utils
 from base_dash_app.virtual_objects.virtual_framework_obj import VirtualFrameworkObject
 
 T = TypeVar("T", bound=BaseModel)  # Declare type variable
 
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_BULK_BATCH_SIZE = 1000
+
 
 class AbstractSingleton(ABCMeta):
     _instances = {}
@@ -26,23 +32,121 @@ class BaseService(ABC, Generic[T], VirtualFrameworkObject, metaclass=AbstractSin
         self.__service_name = service_name if service_name is not None else self.__class__.__name__
         self.object_type = object_type
 
-    def get_by_id(self, id: int, session: Session = None) -> T:
-        if session is None:
-            session: session = self.dbm.get_session()
+    @contextmanager
+    def read_session(self, session: Session = None) -> Iterator[Session]:
+        """
+        The session the read helpers use: the caller's, or the thread's read session for the duration of the call.
+        """
+        if session is not None:
+            yield session
+            return
+
+        with self.dbm.read_session_scope() as read_session:
+            yield read_session
 
+    def get_by_id(self, id: int, session: Session = None) -> T:
         if self.object_type is None:
             raise Exception(f"Service {self.__service_name} is not a model providing service.")
 
-        return session.query(self.object_type).get(id)
+        with self.read_session(session) as session:
+            return session.query(self.object_type).get(id)
 
     def get_all(self, session: Session = None) -> List[T]:
-        if session is None:
-            session: session = self.dbm.get_session()
+        if self.object_type is None:
+            raise Exception(f"Service {self.__service_name} is not a model providing service.")
+
+        with self.read_session(session) as session:
+            return session.query(self.object_type).all()
+
+    def get_primary_key_column(self):
+        return inspect(self.object_type).primary_key[0]
+
+    def iter_all(
+            self, batch_size: int = DEFAULT_BATCH_SIZE, order_by=None, session: Session = None, **criteria
+    ) -> Iterator[T]:
+        """
+        Streams every matching row, batch_size rows per query, so memory stays flat on large tables.
+        Pages are found by keyset (WHERE key > last key) rather than OFFSET, which keeps later pages as cheap
+        as the first one and is not thrown off by rows inserted during the walk. Each batch is fetched before
+        it is yielded, so callers may commit between rows.
+        :param order_by: a non-nullable column to walk the table by. The primary key breaks ties.
+            Defaults to the primary key.
+        :param criteria: filter_by criteria
+        """
+        if self.object_type is None:
+            raise Exception(f"Service {self.__service_name} is not a model providing service.")
+
+        with self.read_session(session) as session:
+            primary_key = self.get_primary_key_column()
+            keyset = [primary_key] if order_by is None or order_by is primary_key else [order_by, primary_key]
+
+            last_key = None
+            while True:
+                query = session.query(self.object_type).filter_by(**criteria)
+                if last_key is not None:
+                    query = query.filter(tuple_(*keyset) > tuple_(*last_key))
+
+                batch = list(query.order_by(*keyset).limit(batch_size).yield_per(batch_size))
+                yield from batch
 
+                if len(batch) < batch_size:
+                    return
+
+                last_key = [getattr(batch[-1], column.key) for column in keyset]
+
+    def get_many(self, ids: Iterable[int], session: Session = None, batch_size: int = DEFAULT_BATCH_SIZE) -> List[T]:
+        """
+        Loads the rows with the given ids with one IN query per batch_size ids. Ids that don't exist are skipped.
+        """
+        if self.object_type is None:
+            raise Exception(f"Service {self.__service_name} is not a model providing service.")
+
+        with self.read_session(session) as session:
+            primary_key = self.get_primary_key_column()
+            ids = list(ids)
+            results = []
+            for i in range(0, len(ids), batch_size):
+                results += session.query(self.object_type).filter(primary_key.in_(ids[i:i + batch_size])).all()
+
+            return results
+
+    def count(self, session: Session = None, **criteria) -> int:
+        if self.object_type is None:
+            raise Exception(f"Service {self.__service_name} is not a model providing service.")
+
+        with self.read_session(session) as session:
+            return (
+                session.query(func.count(self.get_primary_key_column()))
+                .select_from(self.object_type)
+                .filter_by(**criteria)
+                .scalar()
+            )
+
+    def find(self, session: Session = None, limit: int = None, **criteria) -> List[T]:
+        """
+        :param criteria: filter_by criteria, e.g. find(repeats=True)
+        :param limit: return at most this many rows
+        """
         if self.object_type is None:
             raise Exception(f"Service {self.__service_name} is not a model providing service.")
 
-        return session.query(self.object_type).all()
+        with self.read_session(session) as session:
+            query = session.query(self.object_type).filter_by(**criteria)
+            if limit is not None:
+                query = query.limit(limit)
+
+            return query.all()
+
+    @staticmethod
+    def attach_to_session(target: T, session: Session) -> T:
+        """
+        Objects loaded by the read helpers may belong to a replica session, those are merged into the
+        session they are being written with.
+        """
+        if object_session(target) is not None and target not in session:
+            return session.merge(target)
+
+        return target
 
     def save(self, target: T, session: Session = None) -> T:
         if session is None:
@@ -52,6 +156,7 @@ class BaseService(ABC, Generic[T], VirtualFrameworkObject, metaclass=AbstractSin
             raise Exception(f"Service {self.__service_name} is not a model providing service.")
 
         try:
+            target = BaseService.attach_to_session(target, session)
             session.add(target)
             session.expire_on_commit = False
             session.commit()
@@ -69,6 +174,7 @@ class BaseService(ABC, Generic[T], VirtualFrameworkObject, metaclass=AbstractSin
             raise Exception(f"Service {self.__service_name} is not a model providing service.")
 
         try:
+            targets = [BaseService.attach_to_session(target, session) for target in targets]
             session.add_all(targets)
             session.expire_on_commit = False
             session.commit()
@@ -77,3 +183,128 @@ class BaseService(ABC, Generic[T], VirtualFrameworkObject, metaclass=AbstractSin
             raise e
 
         return targets
+
+    def bulk_insert(
+            self, targets: List[Union[T, dict]], session: Session = None,
+            batch_size: int = DEFAULT_BULK_BATCH_SIZE, use_copy: bool = True,
+            return_objects: bool = False,
+    ) -> Union[int, List[T]]:
+        """
+        Inserts many rows with multi-row INSERT statements instead of one INSERT per object through the ORM.
+        On postgres, rows are loaded with COPY FROM STDIN instead, unless objects are asked for.
+        The inserted objects are not added to the session.
+        :param targets: model instances or dicts of column values
+        :param batch_size: rows per statement, lowered if needed to stay under the driver's parameter limit
+        :param use_copy: use COPY on postgres
+        :param return_objects: load and return the inserted rows. Without RETURNING support (anything but postgres),
+            every target must carry its primary key.
+        :return: the number of rows inserted, or the inserted rows if return_objects is True
+        """
+        if session is None:
+            session: session = self.dbm.get_session()
+
+        if self.object_type is None:
+            raise Exception(f"Service {self.__service_name} is not a model providing service.")
+
+        table = self.object_type.__table__
+        column_names, rows = bulk_utils.normalize_rows(table, targets)
+        if len(rows) == 0:
+            return [] if return_objects else 0
+
+        dialect_name = session.get_bind().dialect.name
+        primary_key = self.get_primary_key_column()
+        # checked before inserting, so a caller retrying after the error doesn't insert the rows twice
+        if return_objects and dialect_name != "postgresql" \
+                and any(row.get(primary_key.key) is None for row in rows):
+            raise ValueError(
+                f"Can only return inserted objects on {dialect_name} when every target has its primary key."
+            )
+
+        batch_size = bulk_utils.get_max_batch_size(dialect_name, len(column_names), batch_size)
+        ids = []
+        num_inserted = 0
+
+        try:
+            if dialect_name == "postgresql" and use_copy and not return_objects:
+                dbapi_connection = session.connection().connection
+                num_inserted = bulk_utils.copy_rows(dbapi_connection, table, column_names, rows)
+            else:
+                for i in range(0, len(rows), batch_size):
+                    statement = bulk_utils.get_insert(dialect_name, table).values(rows[i:i + batch_size])
+                    if return_objects and dialect_name == "postgresql":
+                        ids += session.execute(statement.returning(primary_key)).scalars().all()
+                    else:
+                        session.execute(statement)
+                    num_inserted += len(rows[i:i + batch_size])
+
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            raise e
+
+        if not return_objects:
+            return num_inserted
+
+        if dialect_name != "postgresql":
+            ids = [row[primary_key.key] for row in rows]
+
+        return self.get_many(ids, session=session)
+
+    def bulk_upsert(
+            self, targets: List[Union[T, dict]], session: Session = None,
+            conflict_columns: List[str] = None, update_columns: List[str] = None,
+            batch_size: int = DEFAULT_BULK_BATCH_SIZE,
+    ) -> int:
+        """
+        Inserts rows, updating the existing row instead when one conflicts (INSERT ... ON CONFLICT DO UPDATE).
+        Supported on postgres and sqlite. Rows missing a column that other rows set get the column's default,
+        which is also what conflicting rows are updated to, so upsert rows should all set the same columns.
+        :param conflict_columns: columns of the unique constraint or index to detect conflicts on. Defaults to
+            the primary key.
+        :param update_columns: columns to overwrite on conflict. Defaults to every provided column outside
+            conflict_columns. With no columns to update, conflicting rows are left as they are.
+        :return: the number of rows inserted or updated
+        """
+        if session is None:
+            session: session = self.dbm.get_session()
+
+        if self.object_type is None:
+            raise Exception(f"Service {self.__service_name} is not a model providing service.")
+
+        dialect_name = session.get_bind().dialect.name
+        if not bulk_utils.supports_upsert(dialect_name):
+            raise NotImplementedError(f"bulk_upsert is not supported on {dialect_name}.")
+
+        table = self.object_type.__table__
+        column_names, rows = bulk_utils.normalize_rows(table, targets)
+        if len(rows) == 0:
+            return 0
+
+        if conflict_columns is None:
+            conflict_columns = [column.key for column in table.primary_key.columns]
+
+        if update_columns is None:
+            update_columns = [column_name for column_name in column_names if column_name not in conflict_columns]
+
+        batch_size = bulk_utils.get_max_batch_size(dialect_name, len(column_names), batch_size)
+        num_affected = 0
+
+        try:
+            for i in range(0, len(rows), batch_size):
+                statement = bulk_utils.get_insert(dialect_name, table).values(rows[i:i + batch_size])
+                if len(update_columns) > 0:
+                    statement = statement.on_conflict_do_update(
+                        index_elements=conflict_columns,
+                        set_={column_name: statement.excluded[column_name] for column_name in update_columns}
+                    )
+                else:
+                    statement = statement.on_conflict_do_nothing(index_elements=conflict_columns)
+
+                num_affected += session.execute(statement).rowcount
+
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            raise e
+
+        return num_affected
@@ -1,4 +1,4 @@
-from typing import Dict, Hashable, Any, Type
+from typing import Dict, Hashable, Any, Type, Callable, List
 
 from base_dash_app.services.base_service import BaseService, T
 
@@ -7,3 +7,15 @@ class GlobalStateService(BaseService):
     def __init__(self, initial_state: Dict[Hashable, Any] = None):
         super().__init__(dbm=None, service_name="GlobalStateService", object_type=Type[T])
         self.state: Dict[Hashable, Any] = initial_state if initial_state is not None else {}
+        self.listeners: List[Callable[[Dict[Hashable, Any]], None]] = []
+
+    def add_listener(self, listener: Callable[[Dict[Hashable, Any]], None]):
+        self.listeners.append(listener)
+
+    def update_state(self, changes: Dict[Hashable, Any]):
+        """
+        Merges changes into the state and calls every listener with the new state.
+        """
+        self.state.update(changes)
+        for listener in self.listeners:
+            listener(self.state)
@@ -7,17 +7,21 @@ import pprint
 import threading
 import traceback
 from concurrent.futures import ThreadPoolExecutor
-from typing import Type, Dict, Any, TypeVar
+from typing import Type, Dict, Any, TypeVar, Optional, Set
 
-from celery import shared_task
+from celery import shared_task, Task
+from redis import StrictRedis
 from sqlalchemy.orm import Session
 
 from base_dash_app.enums.log_levels import LogLevelsEnum, LogLevel
 from base_dash_app.enums.status_colors import StatusesEnum
 from base_dash_app.models.job_definition import JobDefinition
 from base_dash_app.models.job_instance import JobInstance
+from base_dash_app.models.job_log_chunk import JobLogChunk
 from base_dash_app.services.base_service import BaseService
+from base_dash_app.utils import metrics_utils
 from base_dash_app.utils.db_utils import DbManager
+from base_dash_app.utils.redis_semaphore import RedisSemaphore
 from base_dash_app.virtual_objects.interfaces.selectable import Selectable
 from base_dash_app.virtual_objects.job_progress_container import VirtualJobProgressContainer
 from base_dash_app.virtual_objects.result import Result
@@ -25,6 +29,12 @@ from base_dash_app.virtual_objects.result import Result
 passing_statuses = [StatusesEnum.WARNING, StatusesEnum.SUCCESS]
 JobDefinitionImpl = TypeVar("JobDefinitionImpl", bound="JobDefinition")
 
+CONCURRENCY_RETRY_SECONDS = 5
+# about an hour of waiting for a slot before the run is failed
+MAX_CONCURRENCY_RETRIES = 720
+# renewed while the job runs, so this only bounds how long a dead worker keeps its slot
+CONCURRENCY_LEASE_SECONDS = 60 * 2
+
 
 class JobAlreadyRunningException(Exception):
     def __init__(self, job_id: int):
@@ -44,6 +54,32 @@ class JobDefinitionService(BaseService):
 
         self.threadpool_executor = ThreadPoolExecutor(max_workers=1)
 
+    @staticmethod
+    def get_routing_options(
+            job_class: Type[JobDefinitionImpl], priority: int = None, scheduled: bool = False
+    ) -> Dict[str, Any]:
+        if priority is None:
+            priority = job_class.scheduled_priority() if scheduled else job_class.priority()
+
+        options = {
+            "queue": job_class.queue_name(),
+            "priority": priority,
+            "soft_time_limit": job_class.soft_time_limit(),
+            "time_limit": job_class.time_limit(),
+        }
+
+        # leave unset options to celery's defaults
+        return {k: v for k, v in options.items() if v is not None}
+
+    def get_saved_job_classes(self, session: Session = None) -> Set[str]:
+        """
+        The polymorphic identities (job_class column) of every saved job definition, without loading the definitions.
+        """
+        if session is None:
+            session: Session = self.dbm.get_session()
+
+        return {job_class for (job_class,) in session.query(JobDefinition.job_class).distinct()}
+
     def get_by_class(self, clazz):
         session: Session = self.dbm.get_session()
         job_def: JobDefinitionImpl = session.query(clazz).filter_by(job_class=clazz.__name__).first()
@@ -54,8 +90,16 @@ class JobDefinitionService(BaseService):
             parameter_values: Dict[str, Any] = None,
             selectable: Selectable = None,
             log_level: LogLevel = LogLevelsEnum.WARNING.value,
+            priority: int = None,
+            scheduled: bool = False,
             **kwargs
     ):
+        """
+        Creates a JobInstance for job_def and sends it to a celery worker, routed by the job class'
+        queue_name, priority and time limits.
+        :param priority: overrides the priority set by the job class
+        :param scheduled: True for runs started by the scheduler, which use the job class' scheduled_priority
+        """
         if parameter_values is None:
             parameter_values = {}
 
@@ -126,7 +170,10 @@ class JobDefinitionService(BaseService):
                     # todo: do we still need this?
                     session.expunge(current_instance)
 
-                celery_task_id = run_job.delay(**kwargs)
+                celery_task_id = run_job.apply_async(
+                    kwargs=kwargs,
+                    **JobDefinitionService.get_routing_options(job_class, priority=priority, scheduled=scheduled)
+                )
                 self.logger.debug(f"result of celery execution = {celery_task_id}")
 
                 return job_progress_container
@@ -135,8 +182,9 @@ class JobDefinitionService(BaseService):
                 raise e
 
 
-@shared_task
+@shared_task(bind=True)
 def run_job(
+        task: Task,
         *args,
         job_def_id: int,
         prog_container_uuid: str,
@@ -149,10 +197,10 @@ def run_job(
     logger.debug(f"Thread id = {threading.get_ident()}")
     logger.debug(f"Process id = {os.getpid()}")
 
-    from base_dash_app.application.runtime_application import RuntimeApplication
-    dbm: DbManager = RuntimeApplication.get_instance().get_dbm_by_pid()
-    rta: RuntimeApplication = RuntimeApplication.get_instance()
-    redis_client = rta.redis_client
+    from base_dash_app.application.worker_resources import WorkerResources
+    resources: WorkerResources = WorkerResources.get_instance()
+    dbm: DbManager = resources.dbm
+    redis_client = resources.redis_client
     prog_container: VirtualJobProgressContainer = VirtualJobProgressContainer.from_redis(
         redis_client=redis_client,
         uuid=prog_container_uuid,
@@ -162,36 +210,79 @@ def run_job(
         session: Session = dbm.get_session()
         session.expire_on_commit = False
 
-        job_def: JobDefinitionImpl = session.query(JobDefinition).filter_by(id=job_def_id).first()
-        job_def.set_vars_from_kwargs(**rta.base_service_args)
-
-        logger.debug(pprint.pformat(job_def.produce_kwargs()))
-
-        job_instance: JobInstance = session.query(JobInstance).filter_by(id=prog_container.job_instance_id).first()
-        job_instance.set_status(StatusesEnum.IN_PROGRESS)
-        session.commit()
+        # cached per worker thread and merged into this session, so it is not queried on every run
+        job_def: JobDefinitionImpl = resources.get_job_definition(job_def_id, session)
+        prog_container.set_max_writes_per_second(type(job_def).max_progress_writes_per_second())
+
+        semaphore = get_concurrency_semaphore(type(job_def), redis_client)
+        if semaphore is not None and semaphore.acquire(token=prog_container_uuid) is None:
+            if task.request.retries >= MAX_CONCURRENCY_RETRIES:
+                logger.warning(f"Gave up waiting for a concurrency slot for {job_def.name}")
+                prog_container.complete(
+                    status=StatusesEnum.FAILURE,
+                    progress=0,
+                    status_message=f"Concurrency limit of {semaphore.limit} was still reached after "
+                                   f"{MAX_CONCURRENCY_RETRIES} retries",
+                )
+                prog_container.push_to_redis()
+                handle_completion(session=session, job_progress_container=prog_container, job_class=type(job_def))
+                return
+
+            logger.debug(f"Concurrency limit reached for {job_def.name}, retrying in {CONCURRENCY_RETRY_SECONDS}s")
+            raise task.retry(countdown=CONCURRENCY_RETRY_SECONDS, max_retries=MAX_CONCURRENCY_RETRIES)
+
+        lease_renewer = semaphore.keep_alive(prog_container_uuid) if semaphore is not None else None
+        try:
+            logger.debug(pprint.pformat(job_def.produce_kwargs()))
+
+            job_instance: JobInstance = (
+                session.query(JobInstance).filter_by(id=prog_container.job_instance_id).first()
+            )
+            job_instance.set_status(StatusesEnum.IN_PROGRESS)
+            session.commit()
 
-        prog_container.set_in_progress()
-        prog_container.push_to_redis()
+            prog_container.set_in_progress()
+            prog_container.push_to_redis()
 
-        do_execution(
-            *args,
-            job_def=job_def,
-            session=session,
-            prog_container=prog_container,
-            parameter_values=parameter_values,
-            **kwargs
-        )
+            do_execution(
+                *args,
+                job_def=job_def,
+                session=session,
+                prog_container=prog_container,
+                parameter_values=parameter_values,
+                **kwargs
+            )
 
-        handle_completion(
-            session=session,
-            job_progress_container=prog_container
-        )
+            handle_completion(
+                session=session,
+                job_progress_container=prog_container,
+                job_class=type(job_def)
+            )
+        finally:
+            if semaphore is not None:
+                lease_renewer.stop()
+                semaphore.release(prog_container_uuid)
+
+
+def get_concurrency_semaphore(
+        job_class: Type[JobDefinitionImpl], redis_client: StrictRedis
+) -> Optional[RedisSemaphore]:
+    max_concurrency = job_class.max_concurrency()
+    if max_concurrency is None or redis_client is None:
+        return None
+
+    return RedisSemaphore(
+        redis_client,
+        name=f"job_concurrency_{job_class.__name__}",
+        limit=max_concurrency,
+        lease_seconds=CONCURRENCY_LEASE_SECONDS,
+    )
 
 
 def handle_completion(
         session: Session,
-        job_progress_container: VirtualJobProgressContainer
+        job_progress_container: VirtualJobProgressContainer,
+        job_class: Type[JobDefinitionImpl]
 ):
     inner_session: Session = session
     job_instance_id = job_progress_container.job_instance_id
@@ -213,7 +304,18 @@ def handle_completion(
         job_progress_container.result, job_progress_container.completion_criteria_status
     )
     job_instance.extras = json.dumps(job_progress_container.extras)
-    job_instance.logs = json.dumps(job_progress_container.logs)
+    log_archive = job_progress_container.log_archive
+    if JobLogChunk.table_exists(inner_session):
+        for chunk_index, chunk in enumerate(log_archive.get_chunks()):
+            inner_session.add(JobLogChunk(
+                job_instance_id=job_instance_id,
+                chunk_index=chunk_index,
+                num_lines=min(log_archive.chunk_lines, len(log_archive) - chunk_index * log_archive.chunk_lines),
+                data=chunk,
+            ))
+    else:
+        # databases that haven't been upgraded yet
+        job_instance.logs = json.dumps(log_archive.get_lines())
 
     try:
         inner_session.commit()
@@ -221,6 +323,10 @@ def handle_completion(
         inner_session.rollback()
         raise e
 
+    metrics_utils.JOB_RUNS.inc(
+        job_class=job_class.__name__, status=job_progress_container.completion_criteria_status.value.name
+    )
+
     job_progress_container.destroy_in_redis()
 
     gc.collect()
@@ -237,8 +343,6 @@ def do_execution(
     logger = logging.getLogger(job_def.name or f"job_def_{prog_container.job_definition_id}")
 
     try:
-        session.merge(job_def)
-
         logger.debug("checking prerequisites...")
         prerequisites_status: StatusesEnum = job_def.check_prerequisites(
             *args, session=session, prog_container=prog_container,
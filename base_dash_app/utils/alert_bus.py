@@ -0,0 +1,164 @@
+import datetime
+import json
+import time
+from typing import List, Optional, Tuple, Iterable
+
+import plotly.utils
+from redis import StrictRedis
+
+from base_dash_app.components.alerts import Alert
+
+ALERTS_KEY_PREFIX = "alerts"
+DEFAULT_ALERTS_STREAM_MAX_LEN = 1000
+# alerts without a duration are shown until dismissed, or until they are this old
+DEFAULT_ALERT_MAX_AGE_SECONDS = 60 * 60
+DEFAULT_SESSION_TTL_SECONDS = 60 * 60
+
+
+def serialize_alert(alert: Alert) -> str:
+    # bodies may be dash components, which plotly's encoder turns into the json the renderer expects
+    return json.dumps(
+        {
+            "body": alert.body,
+            "icon": alert.icon,
+            "header": alert.header,
+            "dismissable": alert.dismissable,
+            "duration": alert.duration,
+            "style": alert.style,
+            "color": alert.color,
+            "created_at": alert.created_at.isoformat(),
+        },
+        cls=plotly.utils.PlotlyJSONEncoder
+    )
+
+
+def deserialize_alert(alert_id: str, serialized: str) -> Alert:
+    data = json.loads(serialized)
+    created_at = datetime.datetime.fromisoformat(data.pop("created_at"))
+    alert = Alert.from_dict(data)
+    alert.id = alert_id
+    alert.created_at = created_at
+    return alert
+
+
+class AlertBus:
+    """
+    Alerts shared by every process (gunicorn workers, celery workers) on a redis stream. Each browser session
+    has its own read cursor and dismissed set, which expire with the session, so polling can tell whether
+    anything changed for it without reading the stream.
+    """
+    def __init__(
+            self, redis_client: StrictRedis,
+            max_len: int = DEFAULT_ALERTS_STREAM_MAX_LEN,
+            max_age_seconds: int = DEFAULT_ALERT_MAX_AGE_SECONDS,
+            session_ttl_seconds: int = DEFAULT_SESSION_TTL_SECONDS,
+    ):
+        self.redis_client: StrictRedis = redis_client
+        self.max_len: int = max_len
+        self.max_age_seconds: int = max_age_seconds
+        self.session_ttl_seconds: int = session_ttl_seconds
+        self.stream_key: str = f"{ALERTS_KEY_PREFIX}:stream"
+
+    def get_session_key(self, session_id: str) -> str:
+        return f"{ALERTS_KEY_PREFIX}:session:{session_id}"
+
+    def get_dismissed_key(self, session_id: str) -> str:
+        return f"{ALERTS_KEY_PREFIX}:session:{session_id}:dismissed"
+
+    def publish(self, alert: Alert) -> str:
+        """
+        :return: the alert's stream entry id, which also becomes its id
+        """
+        alert_id = self.redis_client.xadd(
+            self.stream_key, {"alert": serialize_alert(alert)}, maxlen=self.max_len, approximate=True
+        )
+        alert.id = alert_id
+        return alert_id
+
+    def remove(self, alert_id: str):
+        self.redis_client.xdel(self.stream_key, alert_id)
+
+    def is_expired(self, alert: Alert, now: datetime.datetime) -> bool:
+        return self.get_expiry(alert) <= now
+
+    def get_expiry(self, alert: Alert) -> datetime.datetime:
+        max_age_expiry = alert.created_at + datetime.timedelta(seconds=self.max_age_seconds)
+        if alert.duration is None:
+            return max_age_expiry
+
+        return min(max_age_expiry, alert.created_at + datetime.timedelta(seconds=alert.duration))
+
+    def has_changed(self, session_id: str) -> bool:
+        """
+        One round trip: whether there are alerts newer than the session's cursor, or a shown alert has expired.
+        """
+        pipeline = self.redis_client.pipeline(transaction=False)
+        pipeline.xrevrange(self.stream_key, count=1)
+        pipeline.hmget(self.get_session_key(session_id), "cursor", "next_expiry")
+        latest_entries, (cursor, next_expiry) = pipeline.execute()
+
+        latest_id = latest_entries[0][0] if len(latest_entries) > 0 else None
+        if cursor is None or latest_id != (cursor or None):
+            return True
+
+        return next_expiry not in [None, ""] and float(next_expiry) <= time.time()
+
+    def read(self, session_id: str) -> List[Alert]:
+        """
+        Returns the alerts this session should show, oldest first, and moves its cursor to the newest entry.
+        """
+        now = datetime.datetime.now()
+        min_id = f"{int((time.time() - self.max_age_seconds) * 1000)}-0"
+
+        pipeline = self.redis_client.pipeline(transaction=False)
+        pipeline.xrange(self.stream_key, min=min_id)
+        pipeline.xrevrange(self.stream_key, count=1)
+        pipeline.smembers(self.get_dismissed_key(session_id))
+        entries, latest_entries, dismissed = pipeline.execute()
+
+        alerts = []
+        for entry_id, fields in entries:
+            if entry_id in dismissed:
+                continue
+
+            alert = deserialize_alert(entry_id, fields["alert"])
+            if not self.is_expired(alert, now):
+                alerts.append(alert)
+
+        next_expiry = min((self.get_expiry(alert) for alert in alerts), default=None)
+
+        session_key = self.get_session_key(session_id)
+        pipeline = self.redis_client.pipeline(transaction=False)
+        pipeline.hset(session_key, mapping={
+            "cursor": latest_entries[0][0] if len(latest_entries) > 0 else "",
+            "next_expiry": next_expiry.timestamp() if next_expiry is not None else "",
+        })
+        pipeline.expire(session_key, self.session_ttl_seconds)
+        pipeline.execute()
+
+        return alerts
+
+    def dismiss(self, session_id: str, alert_ids: Iterable[str]):
+        alert_ids = list(alert_ids)
+        if len(alert_ids) == 0:
+            return
+
+        dismissed_key = self.get_dismissed_key(session_id)
+        pipeline = self.redis_client.pipeline(transaction=False)
+        pipeline.sadd(dismissed_key, *alert_ids)
+        pipeline.expire(dismissed_key, self.session_ttl_seconds)
+        # forces the next poll to re-render
+        pipeline.hdel(self.get_session_key(session_id), "cursor")
+        pipeline.execute()
+
+
+def get_backoff_interval(
+        current_interval: Optional[int], base_interval: int, max_interval: int, changed: bool
+) -> Tuple[int, bool]:
+    """
+    The polling interval doubles every time nothing changed, up to max_interval, and drops back to
+    base_interval as soon as something does.
+    :return: (interval, whether it differs from current_interval)
+    """
+    interval = base_interval if changed or current_interval is None else min(current_interval * 2, max_interval)
+    return interval, interval != current_interval
@@ -0,0 +1,134 @@
+import datetime
+import enum
+import io
+import json
+from typing import List, Dict, Any, Tuple, Iterable
+
+from sqlalchemy import Table, insert
+from sqlalchemy.dialects import postgresql, sqlite
+
+# bind parameter limits per statement
+MAX_PARAMS_BY_DIALECT = {
+    "postgresql": 32767,
+    "sqlite": 999,
+}
+DEFAULT_MAX_PARAMS = 999
+
+
+def get_max_batch_size(dialect_name: str, num_columns: int, batch_size: int) -> int:
+    """
+    Caps batch_size so that a multi-row VALUES statement stays under the dialect's bind parameter limit.
+    """
+    max_params = MAX_PARAMS_BY_DIALECT.get(dialect_name, DEFAULT_MAX_PARAMS)
+    return max(1, min(batch_size, max_params // max(1, num_columns)))
+
+
+def get_insert(dialect_name: str, table: Table):
+    """
+    Returns the dialect's insert construct, which supports ON CONFLICT on postgres and sqlite.
+    """
+    if dialect_name == "postgresql":
+        return postgresql.insert(table)
+    elif dialect_name == "sqlite":
+        return sqlite.insert(table)
+
+    return insert(table)
+
+
+def supports_upsert(dialect_name: str) -> bool:
+    return dialect_name in ["postgresql", "sqlite"]
+
+
+def get_column_default(column) -> Any:
+    default = column.default
+    if default is None:
+        return None
+
+    if default.is_scalar:
+        return default.arg
+    elif default.is_callable:
+        return default.arg(None)
+
+    return None
+
+
+def normalize_rows(table: Table, targets: Iterable[Any]) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """
+    Turns model instances or dicts into rows that all have the same keys, as multi-row inserts require.
+    Keys only some rows have are filled with the column's python default. Primary keys no row sets are left out,
+    so the database generates them.
+    :return: (column names, rows)
+    """
+    rows = []
+    for target in targets:
+        if isinstance(target, dict):
+            rows.append(dict(target))
+        else:
+            rows.append({
+                column.key: getattr(target, column.key)
+                for column in table.columns
+                if getattr(target, column.key, None) is not None
+            })
+
+    column_names = [
+        column.key for column in table.columns
+        if any(column.key in row for row in rows)
+    ]
+
+    for row in rows:
+        for column_name in column_names:
+            if column_name not in row:
+                row[column_name] = get_column_default(table.columns[column_name])
+
+    return column_names, rows
+
+
+def to_csv_field(value: Any) -> str:
+    # unquoted empty fields are NULL in postgres' csv format, quoted empty fields are empty strings
+    if value is None:
+        return ""
+
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value)
+    elif isinstance(value, (datetime.datetime, datetime.date)):
+        value = value.isoformat()
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        # bytea's hex input format
+        value = "\\x" + bytes(value).hex()
+    elif isinstance(value, enum.Enum):
+        # sqlalchemy's Enum type stores names
+        value = value.name
+
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def to_csv(rows: List[Dict[str, Any]], column_names: List[str]) -> str:
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write(",".join(to_csv_field(row[column_name]) for column_name in column_names))
+        buffer.write("\n")
+
+    return buffer.getvalue()
+
+
+def copy_rows(dbapi_connection, table: Table, column_names: List[str], rows: List[Dict[str, Any]]) -> int:
+    """
+    Loads rows into a postgres table with COPY FROM STDIN, supporting psycopg2 and psycopg 3.
+    :return: the number of rows copied
+    """
+    table_name = table.name if table.schema is None else f"{table.schema}.{table.name}"
+    columns = ", ".join(f'"{column_name}"' for column_name in column_names)
+    statement = f"COPY {table_name} ({columns}) FROM STDIN WITH (FORMAT csv)"
+    data = to_csv(rows, column_names)
+
+    cursor = dbapi_connection.cursor()
+    try:
+        if hasattr(cursor, "copy_expert"):
+            cursor.copy_expert(statement, io.StringIO(data))
+        else:
+            with cursor.copy(statement) as copy:
+                copy.write(data)
+    finally:
+        cursor.close()
+
+    return len(rows)
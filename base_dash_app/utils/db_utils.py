@@ -1,20 +1,83 @@
 import logging
+import os
+import threading
+import time
+import weakref
 from enum import Enum
 from threading import local
+from typing import Tuple, Optional, List, Iterator
 
+import flask
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import event
+from sqlalchemy import event, exc, create_engine, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import QueuePool, NullPool
 
 from base_dash_app.application.db_declaration import db
 from contextlib import contextmanager
 
+from base_dash_app.enums.process_types import ProcessTypesEnum
+from base_dash_app.utils import fork_utils, metrics_utils
+from base_dash_app.utils.process_utils import ProcessInfo, detect_process_info
+
+DEFAULT_POOL_RECYCLE_SECONDS = 1800
+DEFAULT_POOL_TIMEOUT_SECONDS = 30
+DEFAULT_REPLICA_LAG_CHECK_SECONDS = 30
+REQUEST_HOOKS_EXTENSION_KEY = "base_dash_app_db_request_hooks"
+HOOK_EXEMPT_PATHS_EXTENSION_KEY = "base_dash_app_db_hook_exempt_paths"
+
+POSTGRES_REPLICA_LAG_QUERY = """
+SELECT CASE WHEN pg_is_in_recovery()
+    THEN EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    ELSE 0 END
+"""
+
 class DbEngineTypes(Enum):
     POSTGRES = 'postgresql://'
     POSTGRES_PSYCO = 'postgresql+psycopg://'
     SQLITE = 'sqlite:///'
 
 
+_engine_labels = weakref.WeakKeyDictionary()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_times", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_times = conn.info.get("query_start_times")
+    if start_times:
+        metrics_utils.DB_QUERY_DURATION.observe(
+            time.perf_counter() - start_times.pop(), engine=_engine_labels.get(conn.engine, "primary")
+        )
+
+
+def instrument_query_timing(engine: Engine, label: str):
+    """
+    Records the execution time of every statement run on engine in the db_query_duration_seconds metric.
+    """
+    _engine_labels[engine] = label
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def exempt_from_request_hooks(app: Flask, *paths: str):
+    """
+    Requests to these paths skip DbManager's app context and session hooks, e.g. health checks that must stay
+    cheap and not depend on the database.
+    """
+    app.extensions.setdefault(HOOK_EXEMPT_PATHS_EXTENSION_KEY, set()).update(paths)
+
+
+def is_exempt_from_request_hooks(app: Flask) -> bool:
+    exempt_paths = app.extensions.get(HOOK_EXEMPT_PATHS_EXTENSION_KEY)
+    return exempt_paths is not None and flask.has_request_context() and flask.request.path in exempt_paths
+
+
 class DbDescriptor:
     def __init__(
             self,
@@ -25,9 +88,29 @@ class DbDescriptor:
             schema: str = None,
             use_wal: bool = False,
             timeout: int = 15,
-            use_pool: bool = False,
-            pool_size: int = 10,
+            use_pool: bool = True,
+            pool_size: int = None,
+            max_overflow: int = None,
+            pool_pre_ping: bool = True,
+            pool_recycle: int = DEFAULT_POOL_RECYCLE_SECONDS,
+            pool_timeout: int = DEFAULT_POOL_TIMEOUT_SECONDS,
+            replica_uris: List[str] = None,
+            max_replica_lag_seconds: float = None,
+            replica_lag_check_seconds: int = DEFAULT_REPLICA_LAG_CHECK_SECONDS,
     ):
+        """
+        :param use_pool: keep connections open between checkouts. When False every checkout opens a new connection.
+        :param pool_size: connections kept open per process. Defaults to a size suited to the process type,
+            see get_default_pool_settings.
+        :param max_overflow: connections allowed on top of pool_size under load. Defaults per process type too.
+        :param pool_pre_ping: test connections on checkout so ones dropped by the server are replaced
+        :param pool_recycle: seconds after which a connection is replaced rather than reused
+        :param pool_timeout: seconds to wait for a connection when the pool and overflow are exhausted
+        :param replica_uris: read replicas, given like db_uri. They share the engine type and credentials of the
+            primary. Reads from DbManager.get_read_session() are spread over them round-robin.
+        :param max_replica_lag_seconds: replicas further behind the primary than this are skipped. None accepts any lag.
+        :param replica_lag_check_seconds: how long a replica's measured lag is trusted before it is measured again
+        """
         self.db_uri: str = db_uri
         self.engine_type: DbEngineTypes = engine_type
         self.username: str = username
@@ -38,7 +121,131 @@ class DbDescriptor:
         self.use_wal: bool = use_wal or self.engine_type == DbEngineTypes.SQLITE
         self.timeout: int = timeout
         self.use_pool: bool = use_pool
-        self.pool_size: int = pool_size
+        self.pool_size: Optional[int] = pool_size
+        self.max_overflow: Optional[int] = max_overflow
+        self.pool_pre_ping: bool = pool_pre_ping
+        self.pool_recycle: int = pool_recycle
+        self.pool_timeout: int = pool_timeout
+        self.replica_uris: List[str] = replica_uris or []
+        self.max_replica_lag_seconds: Optional[float] = max_replica_lag_seconds
+        self.replica_lag_check_seconds: int = replica_lag_check_seconds
+
+
+def get_default_pool_settings(process_info: ProcessInfo) -> Tuple[int, int]:
+    """
+    Pool size and max overflow for a process. Every gunicorn worker and celery child gets its own pool, so
+    sizing each one for the number of threads that can hold a connection keeps the total under the server's
+    connection limit.
+    :return: (pool_size, max_overflow)
+    """
+    if process_info.process_type in [ProcessTypesEnum.CELERY_PREFORK, ProcessTypesEnum.CELERY_SOLO]:
+        return 1, 2
+    elif process_info.process_type == ProcessTypesEnum.CELERY_THREADS:
+        return process_info.num_threads, max(2, process_info.num_threads // 2)
+    elif process_info.process_type == ProcessTypesEnum.GUNICORN:
+        # request threads, plus a couple for the AsyncHandlerService threads that also query the db
+        return process_info.num_threads + 2, process_info.num_threads
+
+    return 5, 10
+
+
+class PoolMetrics:
+    """
+    Checkout statistics for a connection pool: how long callers waited for a connection, how often they
+    timed out, and how far into overflow the pool went.
+    """
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.num_checkouts: int = 0
+        self.num_timeouts: int = 0
+        self.total_wait_seconds: float = 0
+        self.max_wait_seconds: float = 0
+        self.max_overflow_reached: int = 0
+
+    def record_checkout(self, wait_seconds: float, overflow: int):
+        with self.__lock:
+            self.num_checkouts += 1
+            self.total_wait_seconds += wait_seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, wait_seconds)
+            self.max_overflow_reached = max(self.max_overflow_reached, overflow)
+
+    def record_timeout(self, wait_seconds: float):
+        with self.__lock:
+            self.num_timeouts += 1
+            self.total_wait_seconds += wait_seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, wait_seconds)
+
+    def get_avg_wait_seconds(self) -> float:
+        return self.total_wait_seconds / self.num_checkouts if self.num_checkouts > 0 else 0
+
+    def to_dict(self) -> dict:
+        return {
+            "num_checkouts": self.num_checkouts,
+            "num_timeouts": self.num_timeouts,
+            "avg_wait_seconds": self.get_avg_wait_seconds(),
+            "max_wait_seconds": self.max_wait_seconds,
+            "max_overflow_reached": self.max_overflow_reached,
+        }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    QueuePool that records PoolMetrics for every checkout that has to go to the pool.
+    """
+    def get_metrics(self) -> PoolMetrics:
+        # pools are recreated by dispose(), the new pool starts with fresh metrics
+        if not hasattr(self, "_pool_metrics"):
+            self._pool_metrics = PoolMetrics()
+
+        return self._pool_metrics
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.get_metrics().record_timeout(time.perf_counter() - start)
+            raise
+
+        self.get_metrics().record_checkout(time.perf_counter() - start, max(0, self.overflow()))
+        return connection
+
+
+class ReadReplica:
+    """
+    An engine for one read replica, and the last lag measured on it.
+    """
+    def __init__(self, uri: str, engine: Engine):
+        self.uri: str = uri
+        self.engine: Engine = engine
+        self.lag_seconds: Optional[float] = None
+        self.lag_checked_at: Optional[float] = None
+
+    def measure_lag(self) -> float:
+        """
+        Seconds the replica is behind the primary. Only postgres reports this, other engines are taken to be current.
+        An unreachable replica counts as infinitely far behind.
+        """
+        if self.engine.dialect.name != "postgresql":
+            return 0
+
+        try:
+            with self.engine.connect() as connection:
+                lag = connection.execute(text(POSTGRES_REPLICA_LAG_QUERY)).scalar()
+                return float(lag) if lag is not None else 0
+        except exc.SQLAlchemyError:
+            return float("inf")
+
+    def get_lag_seconds(self, max_age_seconds: float) -> float:
+        now = time.monotonic()
+        if self.lag_checked_at is None or now - self.lag_checked_at > max_age_seconds:
+            self.lag_seconds = self.measure_lag()
+            self.lag_checked_at = now
+
+        return self.lag_seconds
+
+    def __repr__(self):
+        return f"ReadReplica({self.uri}, lag={self.lag_seconds})"
 
 
 class DbManager:
@@ -57,9 +264,8 @@ class DbManager:
             auth_str = (self.db_descriptor.username + ':' + self.db_descriptor.password + "@") \
                 if None not in [self.db_descriptor.username, self.db_descriptor.password] else ""
 
-        self.__db_con_string = f"{self.db_descriptor.engine_type.value}" \
-                               f"{auth_str}" \
-                               f"{self.db_descriptor.db_uri}"
+        self.__auth_str = auth_str
+        self.__db_con_string = self.build_connection_string(self.db_descriptor.db_uri)
 
         if db_descriptor.schema is not None and 'options' not in self.connection_args:
             self.connection_args = {
@@ -70,10 +276,9 @@ class DbManager:
         app.config['SQLALCHEMY_DATABASE_URI'] = self.__db_con_string
         app.config['SQLALCHEMY_ECHO'] = self.db_descriptor.echo
         app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False  # Suppress warning
-        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-            'connect_args': self.connection_args
-        }
-        app.config['SQLALCHEMY_POOL_SIZE'] = self.db_descriptor.pool_size
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = DbManager.build_engine_options(
+            self.db_descriptor, self.connection_args
+        )
 
         self.db: SQLAlchemy = db
         if "sqlalchemy" not in app.extensions:
@@ -86,14 +291,54 @@ class DbManager:
                 cursor.execute("PRAGMA journal_mode=WAL")
                 cursor.close()
 
-            event.listen(self.db.engine, 'connect', set_sqlite_pragma)
+            with self.app.app_context():
+                event.listen(self.db.engine, 'connect', set_sqlite_pragma)
+
+        with self.app.app_context():
+            instrument_query_timing(self.db.engine, "primary")
+
+        self.__replica_lock = threading.Lock()
+        self.__next_replica_index = 0
+        self.replicas: List[ReadReplica] = [
+            ReadReplica(
+                uri,
+                create_engine(
+                    self.build_connection_string(uri),
+                    echo=self.db_descriptor.echo,
+                    **app.config['SQLALCHEMY_ENGINE_OPTIONS']
+                )
+            )
+            for uri in self.db_descriptor.replica_uris
+        ]
+        for replica in self.replicas:
+            instrument_query_timing(replica.engine, "replica")
+        self.__read_session_data = local()
+
+        self.register_request_hooks()
+        fork_utils.register_after_fork(self.dispose_inherited_pool)
+
+    def register_request_hooks(self):
+        """
+        Registers the request hooks that manage the app context and session. They are only registered once
+        per flask app, whichever DbManager gets there first.
+        """
+        if self.app.extensions.get(REQUEST_HOOKS_EXTENSION_KEY):
+            return
+
+        self.app.extensions[REQUEST_HOOKS_EXTENSION_KEY] = True
 
         @self.app.before_request
         def before_request():
+            if is_exempt_from_request_hooks(self.app):
+                return
+
             self.__enter__()
 
         @self.app.teardown_request
         def teardown_request(exception: Exception = None):
+            if is_exempt_from_request_hooks(self.app):
+                return
+
             if exception is None:
                 self.__exit__(None, None, None)
             else:
@@ -102,6 +347,82 @@ class DbManager:
         @self.app.teardown_appcontext
         def shutdown_session(exception=None):
             self.db.session.remove()
+            self.remove_read_session()
+
+    def dispose_inherited_pool(self):
+        """
+        Called in forked children. Replaces the pool inherited from the parent with a fresh one, without
+        closing the parent's connections, so parent and child never share a socket.
+        """
+        with self.app.app_context():
+            for engine in self.db.engines.values():
+                engine.dispose(close=False)
+
+        for replica in self.replicas:
+            replica.engine.dispose(close=False)
+
+        self.logger.debug(f"Disposed inherited connection pool in process {os.getpid()}.")
+
+    def build_connection_string(self, db_uri: str) -> str:
+        return f"{self.db_descriptor.engine_type.value}{self.__auth_str}{db_uri}"
+
+    @staticmethod
+    def build_engine_options(
+            db_descriptor: DbDescriptor, connect_args: dict = None, process_info: ProcessInfo = None
+    ) -> dict:
+        """
+        Builds the create_engine options for the descriptor's pool settings.
+        :param process_info: used for the default pool size and overflow, detected when not provided
+        """
+        engine_options = {'connect_args': connect_args if connect_args is not None else {}}
+
+        # sqlite connections are cheap and flask-sqlalchemy picks a suitable pool for them
+        if db_descriptor.engine_type == DbEngineTypes.SQLITE:
+            return engine_options
+
+        if not db_descriptor.use_pool:
+            engine_options['poolclass'] = NullPool
+            return engine_options
+
+        default_pool_size, default_max_overflow = get_default_pool_settings(
+            process_info if process_info is not None else detect_process_info()
+        )
+
+        engine_options['poolclass'] = InstrumentedQueuePool
+        engine_options['pool_size'] = db_descriptor.pool_size \
+            if db_descriptor.pool_size is not None else default_pool_size
+        engine_options['max_overflow'] = db_descriptor.max_overflow \
+            if db_descriptor.max_overflow is not None else default_max_overflow
+        engine_options['pool_pre_ping'] = db_descriptor.pool_pre_ping
+        engine_options['pool_recycle'] = db_descriptor.pool_recycle
+        engine_options['pool_timeout'] = db_descriptor.pool_timeout
+
+        return engine_options
+
+    def ping(self):
+        """
+        Runs SELECT 1 on the primary, raising if the database can't be reached.
+        """
+        with self.app.app_context():
+            with self.db.engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+
+    def get_pool_metrics(self) -> dict:
+        """
+        Current state of this process' connection pool, plus checkout wait times and overflow if it is instrumented.
+        """
+        pool = self.db.engine.pool
+        metrics = {"pool_class": pool.__class__.__name__}
+        if isinstance(pool, QueuePool):
+            metrics["size"] = pool.size()
+            metrics["checked_in"] = pool.checkedin()
+            metrics["checked_out"] = pool.checkedout()
+            metrics["overflow"] = pool.overflow()
+
+        if isinstance(pool, InstrumentedQueuePool):
+            metrics.update(pool.get_metrics().to_dict())
+
+        return metrics
 
     def upgrade_db(self, drop_first: bool = False):
         if drop_first:
@@ -112,6 +433,75 @@ class DbManager:
     def get_session(self):
         return self.db.session
 
+    def select_replica(self) -> Optional[ReadReplica]:
+        """
+        Picks the next replica round-robin, skipping replicas that lag more than the descriptor allows.
+        :return: None when there are no replicas or all of them are too far behind
+        """
+        max_lag = self.db_descriptor.max_replica_lag_seconds
+        num_replicas = len(self.replicas)
+        if num_replicas == 0:
+            return None
+
+        with self.__replica_lock:
+            start = self.__next_replica_index
+            self.__next_replica_index += 1
+
+        # lag is measured outside the lock, a slow replica shouldn't hold up every other thread's pick
+        for offset in range(num_replicas):
+            replica = self.replicas[(start + offset) % num_replicas]
+            if max_lag is None:
+                return replica
+
+            if replica.get_lag_seconds(self.db_descriptor.replica_lag_check_seconds) <= max_lag:
+                return replica
+
+        return None
+
+    def get_read_session(self) -> Session:
+        """
+        Session for queries that can tolerate replica lag, such as dashboards and stats. Each thread keeps the
+        replica it was given until the session is removed when the request or the DbManager context exits, or,
+        in threads with neither, when the read_session_scope it was taken in exits.
+        Falls back to the primary session when no replica is configured or none is within the allowed lag.
+        Objects loaded here belong to the read session, pass them to BaseService.save to write them.
+        """
+        if len(self.replicas) == 0:
+            return self.get_session()
+
+        session: Optional[Session] = getattr(self.__read_session_data, "session", None)
+        if session is None:
+            replica = self.select_replica()
+            if replica is None:
+                self.logger.warning("No read replica is within the allowed lag, reading from the primary.")
+                return self.get_session()
+
+            session = Session(bind=replica.engine, expire_on_commit=False)
+            self.__read_session_data.session = session
+
+        return session
+
+    @contextmanager
+    def read_session_scope(self) -> Iterator[Session]:
+        """
+        get_read_session for a single read. Requests and DbManager contexts close the thread's read session when
+        they end, but nothing would close it in threads without an app context (e.g. AsyncHandlerService work),
+        leaving a transaction open and an identity map that goes stale. There it is closed when the block exits,
+        and the objects loaded in it are detached, keeping the attributes that were loaded.
+        """
+        session = self.get_read_session()
+        try:
+            yield session
+        finally:
+            if not flask.has_app_context() and session is getattr(self.__read_session_data, "session", None):
+                self.remove_read_session()
+
+    def remove_read_session(self):
+        session: Optional[Session] = getattr(self.__read_session_data, "session", None)
+        if session is not None:
+            session.close()
+            self.__read_session_data.session = None
+
     def new_session(self):
         return self.db.create_scoped_session()
 
@@ -123,6 +513,9 @@ class DbManager:
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
+        # outside of requests, e.g. in celery workers, nothing else closes the thread's read session
+        self.remove_read_session()
+
         # Only pop the context if it exists for this thread.
         if (hasattr(self._thread_local_data, 'app_context')
                 and self._thread_local_data.app_context is not None):
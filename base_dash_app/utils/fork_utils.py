@@ -0,0 +1,40 @@
+import logging
+import os
+from typing import Callable, List
+
+logger = logging.getLogger(__name__)
+
+_after_fork_callbacks: List[Callable[[], None]] = []
+_last_run_pid: int = os.getpid()
+
+
+def register_after_fork(callback: Callable[[], None]):
+    """
+    Registers a callback to run once in every process forked from this one (gunicorn workers, celery prefork
+    children), before the child uses any resource it inherited. Callbacks run in registration order.
+    """
+    _after_fork_callbacks.append(callback)
+
+
+def run_after_fork_callbacks():
+    """
+    Runs the after fork callbacks if they haven't run in this process yet. Called by os.register_at_fork in
+    the child, and safe to call again from anything else that knows it is in a new process
+    (e.g. celery's worker_process_init).
+    """
+    global _last_run_pid
+    pid = os.getpid()
+    if pid == _last_run_pid:
+        return
+
+    # the child only has the forking thread, so no locks here, any lock may have been held at fork time
+    _last_run_pid = pid
+    for callback in list(_after_fork_callbacks):
+        try:
+            callback()
+        except Exception as e:
+            logger.error(f"After fork callback {callback} failed in process {pid}: {e}")
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=run_after_fork_callbacks)
@@ -0,0 +1,171 @@
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Any
+
+from base_dash_app.utils import metrics_utils
+
+DEFAULT_PROBE_INTERVAL_SECONDS = 10
+# results older than this many intervals mean the refresher is stuck, which is itself a readiness failure
+STALE_AFTER_INTERVALS = 3
+
+
+class ProbeResult:
+    def __init__(self, name: str, healthy: bool, latency_seconds: float, error: str = None):
+        self.name: str = name
+        self.healthy: bool = healthy
+        self.latency_seconds: float = latency_seconds
+        self.error: Optional[str] = error
+        self.checked_at: float = time.monotonic()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "healthy": self.healthy,
+            "latency_ms": round(self.latency_seconds * 1000, 3),
+            "error": self.error,
+        }
+
+
+class ProbeMetrics:
+    """
+    Running latency and failure counts of a single probe.
+    """
+    def __init__(self):
+        self.num_checks: int = 0
+        self.num_failures: int = 0
+        self.total_latency_seconds: float = 0
+        self.max_latency_seconds: float = 0
+        self.last_latency_seconds: Optional[float] = None
+
+    def record(self, result: ProbeResult):
+        self.num_checks += 1
+        if not result.healthy:
+            self.num_failures += 1
+
+        self.total_latency_seconds += result.latency_seconds
+        self.max_latency_seconds = max(self.max_latency_seconds, result.latency_seconds)
+        self.last_latency_seconds = result.latency_seconds
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "num_checks": self.num_checks,
+            "num_failures": self.num_failures,
+            "last_latency_seconds": self.last_latency_seconds,
+            "max_latency_seconds": self.max_latency_seconds,
+            "avg_latency_seconds": (
+                self.total_latency_seconds / self.num_checks if self.num_checks > 0 else None
+            ),
+        }
+
+
+class HealthMonitor:
+    """
+    Runs dependency probes on a background thread and keeps their latest results, so readiness checks only
+    read a cached answer and never wait on a dependency themselves.
+
+    A probe is a callable that raises (or returns False) when its dependency is unavailable.
+    """
+    def __init__(self, interval_seconds: float = DEFAULT_PROBE_INTERVAL_SECONDS, logger: logging.Logger = None):
+        self.interval_seconds: float = interval_seconds
+        self.logger = logger or logging.getLogger(self.__class__.__name__)
+        self.__probes: Dict[str, Callable[[], Any]] = {}
+        self.__results: Dict[str, ProbeResult] = {}
+        self.__metrics: Dict[str, ProbeMetrics] = {}
+        self.__lock = threading.Lock()
+        self.__stop_event = threading.Event()
+        self.__thread: Optional[threading.Thread] = None
+        self.__thread_pid: Optional[int] = None
+
+    def add_probe(self, name: str, probe: Callable[[], Any]):
+        self.__probes[name] = probe
+
+    def get_probe_names(self) -> List[str]:
+        return list(self.__probes.keys())
+
+    def run_probe(self, name: str) -> ProbeResult:
+        start = time.perf_counter()
+        try:
+            healthy = self.__probes[name]() is not False
+            error = None if healthy else "probe returned False"
+        except Exception as e:
+            healthy = False
+            error = f"{type(e).__name__}: {e}"
+
+        result = ProbeResult(name, healthy, time.perf_counter() - start, error)
+        metrics_utils.HEALTH_PROBE_DURATION.observe(result.latency_seconds, probe=name)
+        if not healthy:
+            self.logger.warning(f"Health probe {name} failed: {error}")
+
+        with self.__lock:
+            self.__results[name] = result
+            self.__metrics.setdefault(name, ProbeMetrics()).record(result)
+
+        return result
+
+    def refresh(self):
+        for name in list(self.__probes.keys()):
+            self.run_probe(name)
+
+    def ensure_started(self):
+        """
+        Starts the background refresher if it isn't running in this process. Threads don't survive a fork,
+        so a forked worker starts its own on first use.
+        """
+        if self.__thread is not None and self.__thread_pid == os.getpid() and self.__thread.is_alive():
+            return
+
+        with self.__lock:
+            if self.__thread is not None and self.__thread_pid == os.getpid() and self.__thread.is_alive():
+                return
+
+            self.__stop_event = threading.Event()
+            self.__thread = threading.Thread(
+                target=self.__refresh_loop, args=(self.__stop_event,), name="health-monitor", daemon=True
+            )
+            self.__thread_pid = os.getpid()
+            self.__thread.start()
+
+    def stop(self):
+        self.__stop_event.set()
+
+    def __refresh_loop(self, stop_event: threading.Event):
+        while not stop_event.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                self.logger.error(f"Error refreshing health probes: {e}")
+
+            stop_event.wait(self.interval_seconds)
+
+    def get_results(self) -> Dict[str, ProbeResult]:
+        with self.__lock:
+            return dict(self.__results)
+
+    def is_stale(self, result: ProbeResult) -> bool:
+        return time.monotonic() - result.checked_at > self.interval_seconds * STALE_AFTER_INTERVALS
+
+    def get_readiness(self) -> Dict[str, Any]:
+        """
+        :return: {"ready": bool, "probes": {name: {"healthy", "latency_ms", "error", "stale"}}}. Probes that
+            haven't reported yet count as not ready.
+        """
+        results = self.get_results()
+        probes = {}
+        ready = True
+        for name in self.__probes.keys():
+            result = results.get(name)
+            if result is None:
+                probes[name] = {"healthy": False, "latency_ms": None, "error": "not checked yet", "stale": False}
+                ready = False
+                continue
+
+            stale = self.is_stale(result)
+            probes[name] = {**result.to_dict(), "stale": stale}
+            ready = ready and result.healthy and not stale
+
+        return {"ready": ready, "probes": probes}
+
+    def get_metrics(self) -> Dict[str, Dict[str, Any]]:
+        with self.__lock:
+            return {name: metrics.to_dict() for name, metrics in self.__metrics.items()}
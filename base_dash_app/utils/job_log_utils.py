@@ -0,0 +1,105 @@
+import zlib
+from typing import List, Optional, Tuple
+
+from redis import StrictRedis
+
+# lines kept in a job's live log stream, older ones are trimmed. The full log is archived separately.
+DEFAULT_LOG_STREAM_MAX_LEN = 5000
+# streams of jobs that died without cleaning up expire after this long without new lines
+DEFAULT_LOG_STREAM_TTL_SECONDS = 60 * 60 * 24
+DEFAULT_ARCHIVE_CHUNK_LINES = 1000
+DEFAULT_TAIL_SIZE = 100
+
+
+def compress_lines(lines: List[str]) -> bytes:
+    return zlib.compress("\n".join(lines).encode("utf-8"))
+
+
+def decompress_lines(data: bytes) -> List[str]:
+    text = zlib.decompress(data).decode("utf-8")
+    return text.split("\n") if text != "" else []
+
+
+class JobLogStream:
+    """
+    A job's live log lines on a capped redis stream. Each line is one XADD (trimmed to max_len), and readers tail
+    it from a cursor, so neither side ever rewrites or re-reads the whole log.
+    """
+    def __init__(
+            self, redis_client: StrictRedis, key: str,
+            max_len: int = DEFAULT_LOG_STREAM_MAX_LEN,
+            ttl_seconds: int = DEFAULT_LOG_STREAM_TTL_SECONDS
+    ):
+        self.redis_client: StrictRedis = redis_client
+        self.key: str = key
+        self.max_len: int = max_len
+        self.ttl_seconds: int = ttl_seconds
+
+    def append(self, line: str) -> str:
+        pipeline = self.redis_client.pipeline(transaction=False)
+        pipeline.xadd(self.key, {"line": line}, maxlen=self.max_len, approximate=True)
+        pipeline.expire(self.key, self.ttl_seconds)
+        entry_id, _ = pipeline.execute()
+        return entry_id
+
+    def read_after(self, cursor: Optional[str], count: int = DEFAULT_TAIL_SIZE) -> Tuple[List[str], Optional[str]]:
+        """
+        :param cursor: id of the last line read, None to start from the latest count lines
+        :return: up to count lines after cursor, oldest first, and the new cursor
+        """
+        if cursor is None:
+            entries = list(reversed(self.redis_client.xrevrange(self.key, count=count)))
+        else:
+            entries = self.redis_client.xrange(self.key, min=f"({cursor}", count=count)
+
+        if len(entries) == 0:
+            return [], cursor
+
+        return [fields["line"] for _, fields in entries], entries[-1][0]
+
+    def delete(self):
+        self.redis_client.delete(self.key)
+
+
+class LogArchiveBuffer:
+    """
+    Keeps a job's full log in memory as compressed chunks of chunk_lines lines, so it can be archived on
+    completion without holding every line uncompressed while the job runs.
+    """
+    def __init__(self, chunk_lines: int = DEFAULT_ARCHIVE_CHUNK_LINES):
+        self.chunk_lines: int = chunk_lines
+        self.chunks: List[bytes] = []
+        self.pending_lines: List[str] = []
+        self.num_lines: int = 0
+
+    def append(self, line: str):
+        self.pending_lines.append(line)
+        self.num_lines += 1
+        if len(self.pending_lines) >= self.chunk_lines:
+            self.flush()
+
+    def flush(self):
+        if len(self.pending_lines) == 0:
+            return
+
+        self.chunks.append(compress_lines(self.pending_lines))
+        self.pending_lines = []
+
+    def get_chunks(self) -> List[bytes]:
+        self.flush()
+        return list(self.chunks)
+
+    def get_lines(self) -> List[str]:
+        return [line for chunk in self.chunks for line in decompress_lines(chunk)] + list(self.pending_lines)
+
+    def get_tail(self, count: int = DEFAULT_TAIL_SIZE) -> List[str]:
+        lines = list(self.pending_lines)
+        for chunk in reversed(self.chunks):
+            if len(lines) >= count:
+                break
+            lines = decompress_lines(chunk) + lines
+
+        return lines[-count:] if count > 0 else []
+
+    def __len__(self):
+        return self.num_lines
@@ -0,0 +1,64 @@
+import threading
+from typing import Callable, Dict, Hashable, Any
+
+
+class LazyRegistry(dict):
+    """
+    A dict whose values can be registered as factories, which are only called the first time their key is looked up.
+    Iterating over values or items builds everything that is still pending.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.__factories: Dict[Hashable, Callable[[], Any]] = {}
+        self.__lock = threading.RLock()
+
+    def register_factory(self, key: Hashable, factory: Callable[[], Any]):
+        self.__factories[key] = factory
+
+    def is_pending(self, key: Hashable) -> bool:
+        return key in self.__factories
+
+    def __build(self, key: Hashable):
+        with self.__lock:
+            factory = self.__factories.get(key)
+            if factory is not None:
+                super().__setitem__(key, factory())
+                del self.__factories[key]
+
+    def __getitem__(self, key):
+        if key in self.__factories:
+            self.__build(key)
+
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        if key in self.__factories:
+            self.__build(key)
+
+        return super().get(key, default)
+
+    def __contains__(self, key):
+        return key in self.__factories or super().__contains__(key)
+
+    def build_all(self):
+        for key in list(self.__factories.keys()):
+            self.__build(key)
+
+    def keys(self):
+        self.build_all()
+        return super().keys()
+
+    def values(self):
+        self.build_all()
+        return super().values()
+
+    def items(self):
+        self.build_all()
+        return super().items()
+
+    def __iter__(self):
+        self.build_all()
+        return super().__iter__()
+
+    def __len__(self):
+        return super().__len__() + len(self.__factories)
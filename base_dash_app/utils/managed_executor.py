@@ -0,0 +1,239 @@
+import multiprocessing
+import threading
+import time
+import traceback
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor, Executor, InvalidStateError
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, Hashable, Optional, Any, Tuple
+
+from base_dash_app.enums.executor_types import ExecutorTypesEnum
+from base_dash_app.enums.rejection_policies import RejectionPoliciesEnum
+from base_dash_app.utils import metrics_utils
+
+
+class ExecutorSaturatedError(RuntimeError):
+    pass
+
+
+def run_timed(func: Callable, args: tuple, kwargs: dict) -> Tuple[float, float, Any, Optional[BaseException]]:
+    """
+    Runs func and returns (started_at, finished_at, result, error). Module level, so process pools can pickle it.
+    Wall clock times, since they are compared across processes.
+    """
+    started_at = time.time()
+    try:
+        result = func(*args, **kwargs)
+        return started_at, time.time(), result, None
+    except Exception as e:
+        if not hasattr(e, "remote_traceback"):
+            e.remote_traceback = traceback.format_exc()
+        return started_at, time.time(), None, e
+
+
+class ManagedExecutor:
+    """
+    Thread or process pool with a bounded queue, deduplication of in-flight work by key, cancellation, timeouts
+    and queue metrics.
+
+    submit() returns a future of its own rather than the pool's, so that it can be cancelled or timed out from the
+    caller's side at any point. Work that hasn't started yet is then never run. Work that has started can't be
+    stopped from outside, it runs to the end and its result is dropped; long work should check for interrupts
+    itself (see WorkContainer.check_for_interrupt).
+    """
+    def __init__(
+            self, name: str = "async",
+            max_workers: int = 5,
+            max_queue_size: int = None,
+            rejection_policy: RejectionPoliciesEnum = RejectionPoliciesEnum.ABORT,
+            executor_type: ExecutorTypesEnum = ExecutorTypesEnum.THREAD,
+            mp_context: multiprocessing.context.BaseContext = None,
+    ):
+        """
+        :param max_queue_size: how much work may wait for a free worker, None for no limit
+        :param rejection_policy: what happens to work submitted while the queue is full
+        :param mp_context: process pools default to spawned workers, forking a process that runs threads can
+            deadlock the children
+        """
+        self.name: str = name
+        self.max_workers: int = max_workers
+        self.max_queue_size: Optional[int] = max_queue_size
+        self.rejection_policy: RejectionPoliciesEnum = rejection_policy
+        self.executor_type: ExecutorTypesEnum = executor_type
+
+        if executor_type == ExecutorTypesEnum.PROCESS:
+            self.executor: Executor = ProcessPoolExecutor(
+                max_workers=max_workers, mp_context=mp_context or multiprocessing.get_context("spawn")
+            )
+        else:
+            self.executor: Executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+
+        self.__lock = threading.Lock()
+        # our future -> the pool's
+        self.__in_flight: Dict[Future, Future] = {}
+        self.__keys_by_future: Dict[Future, Hashable] = {}
+        self.__futures_by_key: Dict[Hashable, Future] = {}
+        self.__counts: Dict[str, int] = {}
+        self.__counts_lock = threading.Lock()
+        self.__total_wait_seconds: float = 0
+        self.__max_wait_seconds: float = 0
+        self.__total_run_seconds: float = 0
+        self.__num_started: int = 0
+
+    def submit(
+            self, func: Callable, *args,
+            dedupe_key: Hashable = None, timeout_seconds: float = None,
+            **kwargs
+    ) -> Future:
+        """
+        :param dedupe_key: while work submitted with the same key is queued or running, its future is returned
+            instead of submitting func again
+        :param timeout_seconds: the future fails with a TimeoutError if the work hasn't finished by then
+        """
+        with self.__lock:
+            if dedupe_key is not None and dedupe_key in self.__futures_by_key:
+                self.__count("deduped")
+                return self.__futures_by_key[dedupe_key]
+
+            if self.max_queue_size is not None and len(self.__in_flight) >= self.max_workers + self.max_queue_size:
+                future = None
+            else:
+                future = Future()
+                submitted_at = time.time()
+                pool_future = self.executor.submit(run_timed, func, args, kwargs)
+                self.__in_flight[future] = pool_future
+                if dedupe_key is not None:
+                    self.__futures_by_key[dedupe_key] = future
+                    self.__keys_by_future[future] = dedupe_key
+
+                self.__count("submitted")
+
+        if future is None:
+            return self.__reject(func, args, kwargs)
+
+        future.add_done_callback(self.__handle_future_done)
+        pool_future.add_done_callback(
+            lambda done_pool_future: self.__handle_pool_future_done(future, submitted_at, done_pool_future)
+        )
+
+        if timeout_seconds is not None:
+            timer = threading.Timer(timeout_seconds, self.__time_out, args=(future, timeout_seconds))
+            timer.daemon = True
+            timer.start()
+            future.add_done_callback(lambda _: timer.cancel())
+
+        return future
+
+    def __reject(self, func: Callable, args: tuple, kwargs: dict) -> Future:
+        self.__count("rejected")
+        if self.rejection_policy == RejectionPoliciesEnum.ABORT:
+            raise ExecutorSaturatedError(
+                f"{self.name} executor is saturated ({self.max_workers} workers, {self.max_queue_size} queued)"
+            )
+
+        future = Future()
+        if self.rejection_policy == RejectionPoliciesEnum.DISCARD:
+            future.cancel()
+            return future
+
+        future.set_running_or_notify_cancel()
+        try:
+            future.set_result(func(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+
+        return future
+
+    def __time_out(self, future: Future, timeout_seconds: float):
+        try:
+            future.set_exception(FutureTimeoutError(f"Work did not finish within {timeout_seconds} seconds"))
+            self.__count("timed_out")
+        except InvalidStateError:
+            pass
+
+    def __handle_future_done(self, future: Future):
+        with self.__lock:
+            pool_future = self.__in_flight.pop(future, None)
+            key = self.__keys_by_future.pop(future, None)
+            if key is not None and self.__futures_by_key.get(key) is future:
+                del self.__futures_by_key[key]
+
+        if future.cancelled():
+            self.__count("cancelled")
+
+        # cancelled or timed out by the caller: don't start the work if it is still queued
+        if pool_future is not None and not pool_future.done():
+            pool_future.cancel()
+
+    def __handle_pool_future_done(self, future: Future, submitted_at: float, pool_future: Future):
+        if pool_future.cancelled():
+            future.cancel()
+            return
+
+        pool_error = pool_future.exception()
+        if pool_error is not None:
+            # the pool itself failed, e.g. a worker process died or the work couldn't be pickled
+            outcome, result, error = "failure", None, pool_error
+        else:
+            started_at, finished_at, result, error = pool_future.result()
+            outcome = "failure" if error is not None else "success"
+            wait_seconds = max(started_at - submitted_at, 0)
+            run_seconds = finished_at - started_at
+            with self.__lock:
+                self.__num_started += 1
+                self.__total_wait_seconds += wait_seconds
+                self.__max_wait_seconds = max(self.__max_wait_seconds, wait_seconds)
+                self.__total_run_seconds += run_seconds
+
+            metrics_utils.ASYNC_WAIT_DURATION.observe(wait_seconds, executor=self.name)
+            metrics_utils.ASYNC_RUN_DURATION.observe(run_seconds, executor=self.name, outcome=outcome)
+
+        try:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        except InvalidStateError:
+            # cancelled or timed out in the meantime
+            return
+
+        self.__count(outcome)
+
+    def __count(self, outcome: str):
+        with self.__counts_lock:
+            self.__counts[outcome] = self.__counts.get(outcome, 0) + 1
+
+        metrics_utils.ASYNC_TASKS.inc(executor=self.name, outcome=outcome)
+
+    def get_queue_depth(self) -> int:
+        with self.__lock:
+            return sum(1 for pool_future in self.__in_flight.values() if not pool_future.running())
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self.__lock:
+            pool_futures = list(self.__in_flight.values())
+            num_started = self.__num_started
+            total_wait_seconds = self.__total_wait_seconds
+            total_run_seconds = self.__total_run_seconds
+            max_wait_seconds = self.__max_wait_seconds
+
+        with self.__counts_lock:
+            counts = dict(self.__counts)
+
+        num_running = sum(1 for pool_future in pool_futures if pool_future.running())
+        return {
+            "executor_type": self.executor_type.value,
+            "max_workers": self.max_workers,
+            "max_queue_size": self.max_queue_size,
+            "in_flight": len(pool_futures),
+            "running": num_running,
+            "queued": len(pool_futures) - num_running,
+            **{name: counts.get(name, 0) for name in [
+                "submitted", "success", "failure", "cancelled", "timed_out", "rejected", "deduped"
+            ]},
+            "avg_wait_seconds": total_wait_seconds / num_started if num_started > 0 else None,
+            "max_wait_seconds": max_wait_seconds,
+            "avg_run_seconds": total_run_seconds / num_started if num_started > 0 else None,
+        }
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False):
+        self.executor.shutdown(wait=wait, cancel_futures=cancel_futures)
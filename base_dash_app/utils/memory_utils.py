@@ -0,0 +1,239 @@
+import collections
+import datetime
+import json
+import os
+import threading
+import tracemalloc
+from operator import itemgetter
+from typing import Deque, Dict, List, Optional
+
+from redis import StrictRedis
+
+DEFAULT_MEMORY_HISTORY_SIZE = 720
+# a pid that stops sampling (dead worker) drops out of the history after this long
+DEFAULT_MEMORY_HISTORY_TTL_SECONDS = 60 * 60
+MEMORY_HISTORY_KEY_PREFIX = "memory_history"
+DEFAULT_TRACEMALLOC_FRAMES = 1
+# tracing is stopped once nothing has asked for allocations for this long
+DEFAULT_TRACING_SECONDS = 60 * 5
+
+_tracing_lock = threading.Lock()
+_tracing_timer: Optional[threading.Timer] = None
+
+
+class MemorySample:
+    def __init__(
+            self, pid: int, sampled_at: datetime.datetime, rss_mb: float, uss_mb: Optional[float],
+            cpu_percent: float
+    ):
+        self.pid: int = pid
+        self.sampled_at: datetime.datetime = sampled_at
+        self.rss_mb: float = rss_mb
+        self.uss_mb: Optional[float] = uss_mb
+        self.cpu_percent: float = cpu_percent
+
+    def to_dict(self) -> dict:
+        return {
+            "pid": self.pid,
+            "sampled_at": self.sampled_at.isoformat(),
+            "rss_mb": self.rss_mb,
+            "uss_mb": self.uss_mb,
+            "cpu_percent": self.cpu_percent,
+        }
+
+    @staticmethod
+    def from_dict(data: dict) -> "MemorySample":
+        return MemorySample(
+            pid=int(data["pid"]),
+            sampled_at=datetime.datetime.fromisoformat(data["sampled_at"]),
+            rss_mb=data["rss_mb"],
+            uss_mb=data.get("uss_mb"),
+            cpu_percent=data.get("cpu_percent", 0),
+        )
+
+
+def sample_process() -> MemorySample:
+    """
+    Reads this process' resident (RSS) and unique (USS) memory from the OS. Unlike walking the heap this costs
+    about the same regardless of how many objects the process holds.
+    """
+    import psutil
+
+    process = psutil.Process(os.getpid())
+    try:
+        memory_info = process.memory_full_info()
+        uss = getattr(memory_info, "uss", None)
+    except (psutil.AccessDenied, NotImplementedError):
+        memory_info = process.memory_info()
+        uss = None
+
+    return MemorySample(
+        pid=process.pid,
+        sampled_at=datetime.datetime.now(),
+        rss_mb=memory_info.rss / (1024 ** 2),
+        uss_mb=uss / (1024 ** 2) if uss is not None else None,
+        cpu_percent=psutil.cpu_percent(),
+    )
+
+
+class MemoryHistory:
+    """
+    Fixed-size ring buffer of memory samples per pid. Samples are kept in this process and, with a redis client,
+    in a capped redis list per pid so every worker's history is visible from any of them.
+    """
+    def __init__(
+            self, redis_client: Optional[StrictRedis] = None, max_samples: int = DEFAULT_MEMORY_HISTORY_SIZE,
+            ttl_seconds: int = DEFAULT_MEMORY_HISTORY_TTL_SECONDS
+    ):
+        self.redis_client: Optional[StrictRedis] = redis_client
+        self.max_samples: int = max_samples
+        self.ttl_seconds: int = ttl_seconds
+        self.__samples: Deque[MemorySample] = collections.deque(maxlen=max_samples)
+
+    @staticmethod
+    def get_pid_key(pid: int) -> str:
+        return f"{MEMORY_HISTORY_KEY_PREFIX}:{pid}"
+
+    @staticmethod
+    def get_pids_key() -> str:
+        return f"{MEMORY_HISTORY_KEY_PREFIX}:pids"
+
+    def add(self, sample: MemorySample):
+        self.__samples.append(sample)
+        if self.redis_client is None:
+            return
+
+        key = MemoryHistory.get_pid_key(sample.pid)
+        pipeline = self.redis_client.pipeline(transaction=False)
+        pipeline.lpush(key, json.dumps(sample.to_dict()))
+        pipeline.ltrim(key, 0, self.max_samples - 1)
+        pipeline.expire(key, self.ttl_seconds)
+        pipeline.sadd(MemoryHistory.get_pids_key(), sample.pid)
+        pipeline.execute()
+
+    def get_local_samples(self) -> List[MemorySample]:
+        return list(self.__samples)
+
+    def get_pids(self) -> List[int]:
+        if self.redis_client is None:
+            return [os.getpid()] if len(self.__samples) > 0 else []
+
+        return sorted(int(pid) for pid in self.redis_client.smembers(MemoryHistory.get_pids_key()))
+
+    def get_samples_by_pid(self, latest_only: bool = False) -> Dict[int, List[MemorySample]]:
+        """
+        :param latest_only: only fetch the newest sample of each pid
+        :return: pid -> samples, oldest first. Pids whose history expired are dropped from the index.
+        """
+        if self.redis_client is None:
+            samples = self.get_local_samples()
+            return {os.getpid(): samples[-1:] if latest_only else samples} if len(samples) > 0 else {}
+
+        pids = self.get_pids()
+        pipeline = self.redis_client.pipeline(transaction=False)
+        for pid in pids:
+            pipeline.lrange(MemoryHistory.get_pid_key(pid), 0, 0 if latest_only else -1)
+
+        samples_by_pid = {}
+        expired_pids = []
+        for pid, raw_samples in zip(pids, pipeline.execute()):
+            if len(raw_samples) == 0:
+                expired_pids.append(pid)
+                continue
+
+            samples_by_pid[pid] = [MemorySample.from_dict(json.loads(raw)) for raw in reversed(raw_samples)]
+
+        if len(expired_pids) > 0:
+            self.redis_client.srem(MemoryHistory.get_pids_key(), *expired_pids)
+
+        return samples_by_pid
+
+
+def get_top_allocations(limit: int = 25, tracing_seconds: float = DEFAULT_TRACING_SECONDS) -> List[dict]:
+    """
+    Top allocation sites from a tracemalloc snapshot. Tracing is started by the first call (it slows allocations
+    down while on), so that call only has allocations made since then. It is stopped again once no call has been
+    made for tracing_seconds, or by stop_tracing_allocations.
+    """
+    start_tracing_allocations(tracing_seconds)
+
+    snapshot = tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ])
+
+    return [
+        {
+            "location": str(stat.traceback[0]) if len(stat.traceback) > 0 else "",
+            "size_mb": stat.size / (1024 ** 2),
+            "count": stat.count,
+        }
+        for stat in snapshot.statistics("lineno")[:limit]
+    ]
+
+
+def start_tracing_allocations(tracing_seconds: float = DEFAULT_TRACING_SECONDS):
+    """
+    Starts tracing if it isn't on, and (re)schedules it to stop in tracing_seconds.
+    """
+    global _tracing_timer
+    with _tracing_lock:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(DEFAULT_TRACEMALLOC_FRAMES)
+
+        if _tracing_timer is not None:
+            _tracing_timer.cancel()
+
+        _tracing_timer = threading.Timer(tracing_seconds, stop_tracing_allocations)
+        _tracing_timer.daemon = True
+        _tracing_timer.start()
+
+
+def stop_tracing_allocations():
+    global _tracing_timer
+    with _tracing_lock:
+        if _tracing_timer is not None:
+            _tracing_timer.cancel()
+            _tracing_timer = None
+
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+class ObjectCensus:
+    """
+    Full census of live objects by type (pympler). It walks every object on the heap, which can take seconds in a
+    large process, so it is only run on request and off the request thread (e.g. through AsyncHandlerService).
+    Concurrent requests don't start a second walk, they get the previous results.
+    """
+    def __init__(self, min_size: int = 50000):
+        self.min_size: int = min_size
+        self.results: List[dict] = []
+        self.num_objects: int = 0
+        self.total_size: int = 0
+        self.finished_at: Optional[datetime.datetime] = None
+        self.__lock = threading.Lock()
+
+    def is_running(self) -> bool:
+        return self.__lock.locked()
+
+    def run(self, *args, **kwargs) -> List[dict]:
+        if not self.__lock.acquire(blocking=False):
+            return self.results
+
+        try:
+            from pympler import muppy, summary
+
+            rows = summary.summarize(muppy.get_objects())
+            self.num_objects = sum(row[1] for row in rows)
+            self.total_size = sum(row[2] for row in rows)
+            self.results = [
+                {"type": row[0], "num_objects": row[1], "total_size": row[2] / 1000000}
+                for row in sorted(rows, reverse=True, key=itemgetter(2))
+                if row[2] > self.min_size
+            ]
+            self.finished_at = datetime.datetime.now()
+        finally:
+            self.__lock.release()
+
+        return self.results
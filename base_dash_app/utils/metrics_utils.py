@@ -0,0 +1,373 @@
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from base_dash_app.utils import fork_utils
+
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+DEFAULT_SIZE_BUCKETS = (1e3, 1e4, 5e4, 1e5, 5e5, 1e6, 5e6, 1e7)
+DEFAULT_COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250)
+DEFAULT_FLUSH_INTERVAL_SECONDS = 10
+METRICS_REDIS_KEY_PREFIX = "metrics"
+
+logger = logging.getLogger(__name__)
+
+
+def escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def format_labels(label_names: Sequence[str], label_values: Sequence[str]) -> str:
+    return ",".join(f'{name}="{escape_label_value(value)}"' for name, value in zip(label_names, label_values))
+
+
+def format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Metric:
+    """
+    A named metric whose samples are floats keyed by a field string. Values are cumulative in this process; what
+    hasn't been pushed to redis yet is tracked separately so flushes only send deltas, which lets every process
+    add into the same redis hash.
+    """
+    metric_type: str = None
+
+    def __init__(self, name: str, description: str, label_names: Sequence[str] = ()):
+        self.name: str = name
+        self.description: str = description
+        self.label_names: Tuple[str, ...] = tuple(label_names)
+        self._values: Dict[str, float] = {}
+        self._pending: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _get_label_values(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels.keys()) != set(self.label_names):
+            raise ValueError(f"Metric {self.name} expects labels {self.label_names}, got {tuple(labels.keys())}.")
+
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def _add(self, field: str, amount: float):
+        self._values[field] = self._values.get(field, 0) + amount
+        self._pending[field] = self._pending.get(field, 0) + amount
+
+    def get_values(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._values)
+
+    def pop_pending(self) -> Dict[str, float]:
+        with self._lock:
+            pending = self._pending
+            self._pending = {}
+
+        return pending
+
+    def restore_pending(self, pending: Dict[str, float]):
+        with self._lock:
+            for field, amount in pending.items():
+                self._pending[field] = self._pending.get(field, 0) + amount
+
+    def reset(self):
+        """
+        Drops every value, e.g. in a forked child, which would otherwise report and flush its parent's samples again.
+        """
+        # the parent's lock may have been held by another thread at fork time
+        self._lock = threading.Lock()
+        self._values = {}
+        self._pending = {}
+
+    def render(self, values: Dict[str, float]) -> List[str]:
+        raise NotImplementedError()
+
+
+class Counter(Metric):
+    metric_type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        field = format_labels(self.label_names, self._get_label_values(labels))
+        with self._lock:
+            self._add(field, amount)
+
+    def get(self, **labels) -> float:
+        return self.get_values().get(format_labels(self.label_names, self._get_label_values(labels)), 0)
+
+    def render(self, values: Dict[str, float]) -> List[str]:
+        return [
+            f"{self.name}{{{field}}} {format_value(value)}" if field != "" else f"{self.name} {format_value(value)}"
+            for field, value in sorted(values.items())
+        ]
+
+
+class Histogram(Metric):
+    """
+    Buckets are stored cumulatively, as prometheus exposes them, so summing two processes' fields is still a
+    valid histogram. Fields are "bucket:<le>:<labels>", "sum::<labels>" and "count::<labels>".
+    """
+    metric_type = "histogram"
+
+    def __init__(
+            self, name: str, description: str, label_names: Sequence[str] = (),
+            buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS
+    ):
+        super().__init__(name, description, label_names)
+        self.buckets: Tuple[float, ...] = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        label_string = format_labels(self.label_names, self._get_label_values(labels))
+        with self._lock:
+            for le in self.buckets:
+                if value <= le:
+                    self._add(f"bucket:{format_value(le)}:{label_string}", 1)
+
+            self._add(f"sum::{label_string}", value)
+            self._add(f"count::{label_string}", 1)
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def get_count(self, **labels) -> float:
+        label_string = format_labels(self.label_names, self._get_label_values(labels))
+        return self.get_values().get(f"count::{label_string}", 0)
+
+    def get_sum(self, **labels) -> float:
+        label_string = format_labels(self.label_names, self._get_label_values(labels))
+        return self.get_values().get(f"sum::{label_string}", 0)
+
+    def render(self, values: Dict[str, float]) -> List[str]:
+        by_labels: Dict[str, Dict[str, float]] = {}
+        for field, value in values.items():
+            kind, le, label_string = field.split(":", 2)
+            by_labels.setdefault(label_string, {})[kind if kind != "bucket" else le] = value
+
+        lines = []
+        for label_string, samples in sorted(by_labels.items()):
+            prefix = f"{label_string}," if label_string != "" else ""
+            for le in self.buckets:
+                le_string = format_value(le)
+                lines.append(f'{self.name}_bucket{{{prefix}le="{le_string}"}} {format_value(samples.get(le_string, 0))}')
+
+            suffix = f"{{{label_string}}}" if label_string != "" else ""
+            lines.append(f"{self.name}_sum{suffix} {format_value(samples.get('sum', 0))}")
+            lines.append(f"{self.name}_count{suffix} {format_value(samples.get('count', 0))}")
+
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Holds the metrics of this process. With a redis client set, a background thread pushes each metric's deltas
+    into a redis hash every flush interval, and collect() / render() report the totals of every process that
+    shares that redis, e.g. all gunicorn workers.
+    """
+    def __init__(self, key_prefix: str = METRICS_REDIS_KEY_PREFIX):
+        self.key_prefix: str = key_prefix
+        self.__metrics: Dict[str, Metric] = {}
+        self.__lock = threading.Lock()
+        self.redis_client = None
+        self.flush_interval_seconds: float = DEFAULT_FLUSH_INTERVAL_SECONDS
+        self.__flush_thread: Optional[threading.Thread] = None
+        self.__flush_thread_pid: Optional[int] = None
+
+    def __get_or_create(self, metric: Metric) -> Metric:
+        with self.__lock:
+            existing = self.__metrics.get(metric.name)
+            if existing is None:
+                self.__metrics[metric.name] = metric
+                return metric
+
+        if type(existing) != type(metric) or existing.label_names != metric.label_names:
+            raise ValueError(f"Metric {metric.name} is already registered with a different type or labels.")
+
+        return existing
+
+    def counter(self, name: str, description: str, label_names: Sequence[str] = ()) -> Counter:
+        return self.__get_or_create(Counter(name, description, label_names))
+
+    def histogram(
+            self, name: str, description: str, label_names: Sequence[str] = (),
+            buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS
+    ) -> Histogram:
+        return self.__get_or_create(Histogram(name, description, label_names, buckets))
+
+    def get_metrics(self) -> List[Metric]:
+        with self.__lock:
+            return list(self.__metrics.values())
+
+    def get_redis_key(self, metric: Metric) -> str:
+        return f"{self.key_prefix}:{metric.name}"
+
+    def set_redis_client(self, redis_client, flush_interval_seconds: float = DEFAULT_FLUSH_INTERVAL_SECONDS):
+        self.redis_client = redis_client
+        self.flush_interval_seconds = flush_interval_seconds
+
+    def flush(self):
+        """
+        Pushes every metric's unflushed deltas to redis in one pipeline. On failure the deltas are kept for the
+        next flush.
+        """
+        if self.redis_client is None:
+            return
+
+        pending_by_metric = [(metric, metric.pop_pending()) for metric in self.get_metrics()]
+        pending_by_metric = [(metric, pending) for metric, pending in pending_by_metric if len(pending) > 0]
+        if len(pending_by_metric) == 0:
+            return
+
+        try:
+            pipeline = self.redis_client.pipeline(transaction=False)
+            for metric, pending in pending_by_metric:
+                key = self.get_redis_key(metric)
+                for field, amount in pending.items():
+                    pipeline.hincrbyfloat(key, field, amount)
+            pipeline.execute()
+        except Exception as e:
+            logger.warning(f"Could not flush metrics to redis: {e}")
+            for metric, pending in pending_by_metric:
+                metric.restore_pending(pending)
+
+    def ensure_flushing(self):
+        """
+        Starts the flush thread if there is a redis client and it isn't running in this process. Threads don't
+        survive a fork, so forked workers start their own the first time they record something.
+        """
+        if self.redis_client is None:
+            return
+
+        if self.__flush_thread_pid == os.getpid() and self.__flush_thread.is_alive():
+            return
+
+        with self.__lock:
+            if self.__flush_thread_pid == os.getpid() and self.__flush_thread.is_alive():
+                return
+
+            self.__flush_thread = threading.Thread(target=self.__flush_loop, name="metrics-flush", daemon=True)
+            self.__flush_thread_pid = os.getpid()
+            self.__flush_thread.start()
+
+    def __flush_loop(self):
+        pid = os.getpid()
+        while self.__flush_thread_pid == pid:
+            time.sleep(self.flush_interval_seconds)
+            self.flush()
+
+    def reset_after_fork(self):
+        """
+        Registered with fork_utils. Samples recorded before a fork, e.g. db queries and redis round trips made while
+        the gunicorn master or celery parent started up, were already counted by the parent, so every child
+        starts empty instead of flushing them once more each.
+        """
+        for metric in self.get_metrics():
+            metric.reset()
+
+    def collect(self) -> Dict[str, Dict[str, float]]:
+        """
+        :return: metric name -> field -> value, summed over every process when a redis client is set, otherwise
+            this process' values.
+        """
+        metrics = self.get_metrics()
+        if self.redis_client is None:
+            return {metric.name: metric.get_values() for metric in metrics}
+
+        self.flush()
+        pipeline = self.redis_client.pipeline(transaction=False)
+        for metric in metrics:
+            pipeline.hgetall(self.get_redis_key(metric))
+
+        collected = {}
+        for metric, values in zip(metrics, pipeline.execute()):
+            collected[metric.name] = {
+                (field.decode() if isinstance(field, bytes) else field): float(value)
+                for field, value in (values or {}).items()
+            }
+
+        return collected
+
+    def render(self) -> str:
+        """
+        :return: all metrics in the prometheus text exposition format
+        """
+        collected = self.collect()
+        lines = []
+        for metric in self.get_metrics():
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.metric_type}")
+            lines += metric.render(collected.get(metric.name, {}))
+
+        return "\n".join(lines) + "\n"
+
+
+metrics_registry = MetricsRegistry()
+fork_utils.register_after_fork(metrics_registry.reset_after_fork)
+
+CALLBACK_DURATION = metrics_registry.histogram(
+    "dash_callback_duration_seconds", "Time spent in dash callbacks, by view or component class.", ["callback"]
+)
+CALLBACK_REDIS_ROUND_TRIPS = metrics_registry.histogram(
+    "dash_callback_redis_round_trips", "Redis round trips made by one dash callback.", ["callback"],
+    buckets=DEFAULT_COUNT_BUCKETS
+)
+CALLBACK_PAYLOAD_BYTES = metrics_registry.histogram(
+    "dash_callback_payload_bytes", "Size of dash callback responses.", ["callback"], buckets=DEFAULT_SIZE_BUCKETS
+)
+REDIS_ROUND_TRIPS = metrics_registry.counter("redis_round_trips_total", "Redis commands and pipelines sent.")
+DB_QUERY_DURATION = metrics_registry.histogram(
+    "db_query_duration_seconds", "Time spent executing sql statements.", ["engine"]
+)
+CELERY_TASK_DURATION = metrics_registry.histogram(
+    "celery_task_duration_seconds", "Celery task run time, by task name and outcome.", ["task", "outcome"]
+)
+JOB_RUNS = metrics_registry.counter("job_runs_total", "Completed job runs, by job class and status.",
+                                    ["job_class", "status"])
+HEALTH_PROBE_DURATION = metrics_registry.histogram(
+    "health_probe_duration_seconds", "Readiness probe latency, by probe.", ["probe"]
+)
+ASYNC_TASKS = metrics_registry.counter(
+    "async_tasks_total", "Work submitted to async executors, by executor and outcome.", ["executor", "outcome"]
+)
+ASYNC_WAIT_DURATION = metrics_registry.histogram(
+    "async_wait_duration_seconds", "Time async work spent queued before it started, by executor.", ["executor"]
+)
+ASYNC_RUN_DURATION = metrics_registry.histogram(
+    "async_run_duration_seconds", "Async work run time, by executor and outcome.", ["executor", "outcome"]
+)
+
+_callback_state = threading.local()
+
+
+@contextmanager
+def callback_scope(callback: str):
+    """
+    Times a dash callback and counts the redis round trips made while it runs.
+    """
+    _callback_state.callback = callback
+    _callback_state.redis_round_trips = 0
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        CALLBACK_DURATION.observe(time.perf_counter() - start, callback=callback)
+        CALLBACK_REDIS_ROUND_TRIPS.observe(_callback_state.redis_round_trips, callback=callback)
+        _callback_state.callback = None
+        metrics_registry.ensure_flushing()
+
+
+def get_current_callback() -> Optional[str]:
+    return getattr(_callback_state, "callback", None)
+
+
+def record_redis_round_trip():
+    REDIS_ROUND_TRIPS.inc()
+    if getattr(_callback_state, "callback", None) is not None:
+        _callback_state.redis_round_trips += 1
@@ -0,0 +1,78 @@
+import collections
+import threading
+import time
+from typing import Any, Hashable, Optional, Set
+
+DEFAULT_PAGE_CACHE_MAX_ENTRIES = 128
+
+
+class PageCacheEntry:
+    def __init__(self, content: Any, generation: int):
+        self.content: Any = content
+        self.generation: int = generation
+        self.rendered_at: float = time.monotonic()
+
+
+class PageCache:
+    """
+    Bounded LRU cache of rendered pages with a ttl. Entries past the ttl are still returned (stale-while-
+    revalidate), callers decide whether to refresh them. invalidate() bumps the generation, so renders that
+    started before it can't store their, by then outdated, result.
+    """
+    def __init__(self, ttl_seconds: float, max_entries: int = DEFAULT_PAGE_CACHE_MAX_ENTRIES):
+        self.ttl_seconds: float = ttl_seconds
+        self.max_entries: int = max_entries
+        self.generation: int = 0
+        self.__entries: "collections.OrderedDict[Hashable, PageCacheEntry]" = collections.OrderedDict()
+        self.__refreshing: Set[Hashable] = set()
+        self.__lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[PageCacheEntry]:
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None:
+                self.__entries.move_to_end(key)
+
+            return entry
+
+    def is_fresh(self, entry: PageCacheEntry) -> bool:
+        return time.monotonic() - entry.rendered_at < self.ttl_seconds
+
+    def put(self, key: Hashable, content: Any, generation: int) -> bool:
+        """
+        :param generation: the cache generation when the render started
+        :return: False if the cache was invalidated since, in which case content is dropped
+        """
+        with self.__lock:
+            if generation != self.generation:
+                return False
+
+            self.__entries[key] = PageCacheEntry(content, generation)
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.max_entries:
+                self.__entries.popitem(last=False)
+
+            return True
+
+    def start_refresh(self, key: Hashable) -> bool:
+        """
+        :return: False if key is already being refreshed
+        """
+        with self.__lock:
+            if key in self.__refreshing:
+                return False
+
+            self.__refreshing.add(key)
+            return True
+
+    def finish_refresh(self, key: Hashable):
+        with self.__lock:
+            self.__refreshing.discard(key)
+
+    def invalidate(self):
+        with self.__lock:
+            self.generation += 1
+            self.__entries.clear()
+
+    def __len__(self):
+        return len(self.__entries)
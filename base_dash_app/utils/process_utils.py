@@ -0,0 +1,71 @@
+import os
+import sys
+from typing import List, Optional
+
+from base_dash_app.enums.process_types import ProcessTypesEnum
+
+
+class ProcessInfo:
+    """
+    What kind of process we are in and how many threads in it may need resources (db connections etc.) at once.
+    """
+    def __init__(self, process_type: ProcessTypesEnum, num_threads: int = 1):
+        self.process_type: ProcessTypesEnum = process_type
+        self.num_threads: int = max(1, num_threads)
+
+    def __repr__(self):
+        return f"ProcessInfo({self.process_type.value}, threads={self.num_threads})"
+
+
+def get_cli_option(argv: List[str], names: List[str], default: str = None) -> Optional[str]:
+    """
+    Reads the value of a command line option given as "--name value", "--name=value" or "-n value".
+    """
+    for i, arg in enumerate(argv):
+        for name in names:
+            if arg == name and i + 1 < len(argv):
+                return argv[i + 1]
+            if arg.startswith(name + "="):
+                return arg[len(name) + 1:]
+
+    return default
+
+
+def _parse_int(value: Optional[str], default: int) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def detect_process_info(argv: List[str] = None, environ: dict = None) -> ProcessInfo:
+    """
+    Works out from the command line whether we are a gunicorn worker or a celery worker (and which pool),
+    or anything else such as the dev server.
+    :param argv: defaults to sys.argv
+    :param environ: defaults to os.environ
+    """
+    argv = sys.argv if argv is None else argv
+    environ = os.environ if environ is None else environ
+    program = os.path.basename(argv[0]) if len(argv) > 0 else ""
+
+    if "celery" in program and "worker" in argv:
+        pool = get_cli_option(argv, ["--pool", "-P"], default="prefork")
+        concurrency = _parse_int(
+            get_cli_option(argv, ["--concurrency", "-c"], default=environ.get("CELERY_WORKER_CONCURRENCY")),
+            default=os.cpu_count() or 1
+        )
+        if pool == "threads":
+            return ProcessInfo(ProcessTypesEnum.CELERY_THREADS, num_threads=concurrency)
+        elif pool == "solo":
+            return ProcessInfo(ProcessTypesEnum.CELERY_SOLO)
+
+        # each prefork child runs one task at a time
+        return ProcessInfo(ProcessTypesEnum.CELERY_PREFORK)
+
+    if "gunicorn" in program:
+        gunicorn_args = argv + environ.get("GUNICORN_CMD_ARGS", "").split()
+        threads = _parse_int(get_cli_option(gunicorn_args, ["--threads"]), default=1)
+        return ProcessInfo(ProcessTypesEnum.GUNICORN, num_threads=threads)
+
+    return ProcessInfo(ProcessTypesEnum.OTHER, num_threads=5)
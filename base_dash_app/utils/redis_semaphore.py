@@ -0,0 +1,113 @@
+import logging
+import threading
+import time
+import uuid
+from typing import Optional
+
+from redis import StrictRedis
+from redis.client import Pipeline
+
+logger = logging.getLogger(__name__)
+
+
+class RedisSemaphore:
+    """
+    A counting semaphore shared by every process that talks to the same redis server. Holders are kept in a
+    sorted set scored by when their lease expires, so slots held by crashed workers are reclaimed once the
+    lease runs out.
+    """
+    def __init__(self, redis_client: StrictRedis, name: str, limit: int, lease_seconds: int = 60 * 60):
+        self.redis_client: StrictRedis = redis_client
+        self.key: str = f"semaphore:{name}"
+        self.limit: int = limit
+        self.lease_seconds: int = lease_seconds
+
+    def acquire(self, token: str = None) -> Optional[str]:
+        """
+        Tries to take a slot without blocking.
+        :param token: identifies the holder. A random token is used if not provided.
+        :return: the token if a slot was taken, None if the semaphore is full
+        """
+        token = token or uuid.uuid4().hex
+        acquired = [False]
+
+        def do_acquire(pipeline: Pipeline):
+            # runs again if another client changes the semaphore between WATCH and EXEC
+            now = time.time()
+            num_holders = pipeline.zcount(self.key, now, "+inf")
+            current_lease = pipeline.zscore(self.key, token)
+            acquired[0] = num_holders < self.limit or (current_lease is not None and current_lease > now)
+
+            pipeline.multi()
+            pipeline.zremrangebyscore(self.key, "-inf", now)
+            if acquired[0]:
+                pipeline.zadd(self.key, {token: now + self.lease_seconds})
+                pipeline.expire(self.key, self.lease_seconds)
+
+        self.redis_client.transaction(do_acquire, self.key)
+        return token if acquired[0] else None
+
+    def renew(self, token: str) -> bool:
+        """
+        Extends token's lease by lease_seconds from now.
+        :return: False if token no longer holds a slot, e.g. its lease ran out before it was renewed
+        """
+        renewed = [False]
+
+        def do_renew(pipeline: Pipeline):
+            now = time.time()
+            current_lease = pipeline.zscore(self.key, token)
+            renewed[0] = current_lease is not None and current_lease > now
+
+            pipeline.multi()
+            if renewed[0]:
+                pipeline.zadd(self.key, {token: now + self.lease_seconds}, xx=True)
+                pipeline.expire(self.key, self.lease_seconds)
+
+        self.redis_client.transaction(do_renew, self.key)
+        return renewed[0]
+
+    def keep_alive(self, token: str, interval_seconds: float = None) -> "LeaseRenewer":
+        """
+        Renews token's lease in the background until the returned renewer is stopped, so a holder can keep its
+        slot for longer than lease_seconds while a crashed holder still loses it once the lease runs out.
+        :param interval_seconds: defaults to a third of lease_seconds
+        """
+        renewer = LeaseRenewer(self, token, interval_seconds or self.lease_seconds / 3)
+        renewer.start()
+        return renewer
+
+    def release(self, token: str):
+        self.redis_client.zrem(self.key, token)
+
+    def get_num_holders(self) -> int:
+        return self.redis_client.zcount(self.key, time.time(), "+inf")
+
+
+class LeaseRenewer:
+    def __init__(self, semaphore: RedisSemaphore, token: str, interval_seconds: float):
+        self.semaphore: RedisSemaphore = semaphore
+        self.token: str = token
+        self.interval_seconds: float = interval_seconds
+        self.lost: bool = False
+        self.__stopped = threading.Event()
+        self.__thread = threading.Thread(
+            target=self.__renew, name=f"lease-renewer-{semaphore.key}", daemon=True
+        )
+
+    def start(self):
+        self.__thread.start()
+
+    def __renew(self):
+        while not self.__stopped.wait(self.interval_seconds):
+            try:
+                if not self.semaphore.renew(self.token):
+                    self.lost = True
+                    logger.warning(f"{self.token} lost its slot in {self.semaphore.key}")
+                    return
+            except Exception as e:
+                # retried on the next interval, the lease outlives a few failed renewals
+                logger.warning(f"Could not renew the lease of {self.token} in {self.semaphore.key}: {e}")
+
+    def stop(self):
+        self.__stopped.set()
@@ -1,8 +1,115 @@
-from typing import List
+import weakref
+from typing import List, Iterator
 
+import redis
 from redis import StrictRedis
+from redis.client import Pipeline
+
+from base_dash_app.utils import metrics_utils
+
+_binary_clients = weakref.WeakKeyDictionary()
+
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def batched(values: List, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List]:
+    for i in range(0, len(values), batch_size):
+        yield values[i:i + batch_size]
+
+
+def rpush_batched(
+        redis_client: StrictRedis, destination_key: str, values: List, batch_size: int = DEFAULT_BATCH_SIZE
+):
+    """
+    Pushes all values onto destination_key using multi-value RPUSH commands of at most batch_size values,
+    sent together in one pipeline.
+    """
+    if len(values) == 0:
+        return
+
+    pipeline = redis_client.pipeline(transaction=False)
+    for batch in batched(values, batch_size):
+        pipeline.rpush(destination_key, *batch)
+    pipeline.execute()
+
+
+def get_all(redis_client: StrictRedis, keys: List[str], batch_size: int = DEFAULT_BATCH_SIZE) -> List:
+    """
+    Equivalent to calling GET on every key, in ceil(len(keys) / batch_size) MGET round trips.
+    """
+    values = []
+    for batch in batched(keys, batch_size):
+        values.extend(redis_client.mget(batch))
+
+    return values
+
+
+def lrange_all(redis_client: StrictRedis, keys: List[str], batch_size: int = DEFAULT_BATCH_SIZE) -> List[List]:
+    """
+    Equivalent to calling LRANGE key 0 -1 on every key, pipelined in batches of batch_size.
+    """
+    lists = []
+    for batch in batched(keys, batch_size):
+        pipeline = redis_client.pipeline(transaction=False)
+        for key in batch:
+            pipeline.lrange(key, 0, -1)
+        lists.extend(pipeline.execute())
+
+    return lists
 
 
 def flatten_redist_list(destination_key: str, source_keys: List[str], redis_client: StrictRedis):
-    for source_key in source_keys:
-        redis_client.rpush(destination_key, redis_client.get(source_key))
\ No newline at end of file
+    values = get_all(redis_client, source_keys)
+    # keys that don't exist can't be pushed to a list, skip them
+    rpush_batched(redis_client, destination_key, [value for value in values if value is not None])
+
+
+def get_binary_client(redis_client: StrictRedis) -> StrictRedis:
+    """
+    The framework's redis client is created with decode_responses=True, which breaks on binary payloads.
+    Returns a client that talks to the same server without decoding responses. Clients are cached per
+    connection pool, so calling this repeatedly is cheap.
+    :param redis_client: the client whose connection settings should be reused
+    :return: a client that returns raw bytes
+    """
+    pool = redis_client.connection_pool
+    if not pool.connection_kwargs.get("decode_responses", False):
+        return redis_client
+
+    if pool not in _binary_clients:
+        connection_kwargs = dict(pool.connection_kwargs)
+        connection_kwargs["decode_responses"] = False
+        client_class = InstrumentedRedis if isinstance(redis_client, InstrumentedRedis) else redis.StrictRedis
+        _binary_clients[pool] = client_class(
+            connection_pool=redis.ConnectionPool(
+                connection_class=pool.connection_class,
+                **connection_kwargs
+            )
+        )
+
+    return _binary_clients[pool]
+
+
+class InstrumentedPipeline(Pipeline):
+    def execute(self, raise_on_error: bool = True):
+        metrics_utils.record_redis_round_trip()
+        return super().execute(raise_on_error=raise_on_error)
+
+    def immediate_execute_command(self, *args, **options):
+        # commands sent straight away while a pipeline is WATCHing
+        metrics_utils.record_redis_round_trip()
+        return super().immediate_execute_command(*args, **options)
+
+
+class InstrumentedRedis(StrictRedis):
+    """
+    A StrictRedis that counts round trips (single commands and pipeline executions) in the metrics registry,
+    including per dash callback.
+    """
+    def execute_command(self, *args, **options):
+        metrics_utils.record_redis_round_trip()
+        return super().execute_command(*args, **options)
+
+    def pipeline(self, transaction=True, shard_hint=None) -> Pipeline:
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
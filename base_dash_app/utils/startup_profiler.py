@@ -0,0 +1,61 @@
+import logging
+import time
+from contextlib import contextmanager
+from typing import List, Tuple, Optional
+
+
+class StartupProfiler:
+    """
+    Times the phases of application start-up and reports them, warning when the total goes over budget.
+    """
+    def __init__(self, budget_seconds: float = None, logger: logging.Logger = None):
+        self.budget_seconds: Optional[float] = budget_seconds
+        self.logger = logger or logging.getLogger(self.__class__.__name__)
+        self.phases: List[Tuple[str, float]] = []
+        self.started_at: float = time.perf_counter()
+        self.finished_at: Optional[float] = None
+        self.__last_mark: float = self.started_at
+
+    def mark(self, name: str):
+        """
+        Ends a phase called name, which started at the previous mark (or when profiling started).
+        """
+        now = time.perf_counter()
+        self.phases.append((name, now - self.__last_mark))
+        self.__last_mark = now
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - start))
+            self.__last_mark = time.perf_counter()
+
+    def finish(self):
+        self.finished_at = time.perf_counter()
+        self.log_report()
+
+    def get_total_seconds(self) -> float:
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+    def is_over_budget(self) -> bool:
+        return self.budget_seconds is not None and self.get_total_seconds() > self.budget_seconds
+
+    def get_report(self) -> str:
+        total = self.get_total_seconds()
+        lines = [f"Start-up took {total:.3f}s"]
+        for name, seconds in self.phases:
+            lines.append(f"  {name}: {seconds:.3f}s ({seconds / total * 100 if total > 0 else 0:.1f}%)")
+
+        return "\n".join(lines)
+
+    def log_report(self):
+        self.logger.info(self.get_report())
+        if self.is_over_budget():
+            slowest = max(self.phases, key=lambda p: p[1])[0] if len(self.phases) > 0 else None
+            self.logger.warning(
+                f"Start-up took {self.get_total_seconds():.3f}s, over the budget of {self.budget_seconds}s."
+                f" Slowest phase: {slowest}."
+            )
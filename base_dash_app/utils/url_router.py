@@ -0,0 +1,135 @@
+import collections
+import re
+import threading
+from typing import Any, Dict, Generic, List, Optional, Pattern, Sequence, Tuple, TypeVar
+
+DEFAULT_RESOLUTION_CACHE_SIZE = 1024
+
+# inline flags that can be scoped to one alternative of the combined pattern
+SCOPED_FLAGS = [(re.IGNORECASE, "i"), (re.MULTILINE, "m"), (re.DOTALL, "s"), (re.VERBOSE, "x")]
+
+NAMED_GROUP_REGEX = re.compile(r"\(\?P<([A-Za-z_][A-Za-z0-9_]*)>")
+NAMED_BACKREFERENCE_REGEX = re.compile(r"\(\?P=([A-Za-z_][A-Za-z0-9_]*)\)")
+NUMBERED_BACKREFERENCE_REGEX = re.compile(r"\\[1-9]")
+
+Target = TypeVar("Target")
+
+
+class RouteMatch(Generic[Target]):
+    def __init__(self, target: Target, path_params: Dict[str, Optional[str]]):
+        self.target: Target = target
+        self.path_params: Dict[str, Optional[str]] = path_params
+
+
+def get_route_group_name(route_index: int, group_name: str = None) -> str:
+    return f"_r{route_index}" if group_name is None else f"_r{route_index}_{group_name}"
+
+
+def to_alternative(route_index: int, pattern: Pattern[str]) -> str:
+    """
+    Rewrites pattern so it can be one branch of the combined pattern: wrapped in a group naming the route, with
+    its named groups prefixed so they can't clash with other routes', and its flags scoped to the branch.
+    """
+    source = NAMED_GROUP_REGEX.sub(
+        lambda m: f"(?P<{get_route_group_name(route_index, m.group(1))}>", pattern.pattern
+    )
+    source = NAMED_BACKREFERENCE_REGEX.sub(
+        lambda m: f"(?P={get_route_group_name(route_index, m.group(1))})", source
+    )
+
+    flags = "".join(letter for flag, letter in SCOPED_FLAGS if pattern.flags & flag)
+    if flags != "":
+        source = f"(?{flags}:{source})"
+
+    return f"(?P<{get_route_group_name(route_index)}>{source})"
+
+
+class UrlRouter(Generic[Target]):
+    """
+    Resolves urls to targets (views) by their url patterns, with the same semantics as trying each pattern's
+    match() in order. The patterns are compiled into one alternation, so a lookup is a single regex match instead
+    of one per view, and recent resolutions are cached. Path params are returned per lookup, nothing is stored on
+    the targets.
+
+    Patterns that can't be combined (numbered backreferences, or anything the rewrite breaks) make the router
+    fall back to matching them one by one.
+    """
+    def __init__(
+            self, routes: Sequence[Tuple[Pattern[str], Target]],
+            cache_size: int = DEFAULT_RESOLUTION_CACHE_SIZE
+    ):
+        self.routes: List[Tuple[Pattern[str], Target]] = list(routes)
+        self.cache_size: int = cache_size
+        self.__cache: "collections.OrderedDict[str, Optional[Tuple[int, Dict[str, Optional[str]]]]]" = \
+            collections.OrderedDict()
+        self.__lock = threading.Lock()
+        self.combined_pattern: Optional[Pattern[str]] = UrlRouter.compile_routes(self.routes)
+
+    @staticmethod
+    def compile_routes(routes: Sequence[Tuple[Pattern[str], Any]]) -> Optional[Pattern[str]]:
+        if len(routes) == 0:
+            return None
+
+        if any(NUMBERED_BACKREFERENCE_REGEX.search(pattern.pattern) for pattern, _ in routes):
+            return None
+
+        try:
+            return re.compile("|".join(to_alternative(i, pattern) for i, (pattern, _) in enumerate(routes)))
+        except re.error:
+            return None
+
+    def __match(self, url: str) -> Optional[Tuple[int, Dict[str, Optional[str]]]]:
+        if self.combined_pattern is None:
+            for route_index, (pattern, _) in enumerate(self.routes):
+                match_result = pattern.match(url)
+                if match_result is not None:
+                    return route_index, match_result.groupdict()
+
+            return None
+
+        match_result = self.combined_pattern.match(url)
+        if match_result is None:
+            return None
+
+        # the route's wrapping group closes last, so it is the last matched group
+        route_index = int(match_result.lastgroup[2:])
+        prefix = get_route_group_name(route_index, "")
+        return route_index, {
+            name[len(prefix):]: value
+            for name, value in match_result.groupdict().items()
+            if name.startswith(prefix)
+        }
+
+    def resolve(self, url: str) -> Optional[RouteMatch[Target]]:
+        """
+        :return: the first route whose pattern matches url and its path params, or None
+        """
+        with self.__lock:
+            if url in self.__cache:
+                self.__cache.move_to_end(url)
+                resolution = self.__cache[url]
+                found = True
+            else:
+                found = False
+
+        if not found:
+            resolution = self.__match(url)
+            with self.__lock:
+                self.__cache[url] = resolution
+                if len(self.__cache) > self.cache_size:
+                    self.__cache.popitem(last=False)
+
+        if resolution is None:
+            return None
+
+        route_index, path_params = resolution
+        return RouteMatch(self.routes[route_index][1], dict(path_params))
+
+    def get_recent_urls(self, limit: int = None) -> List[str]:
+        """
+        :return: recently resolved urls that matched a route, most recent first
+        """
+        with self.__lock:
+            urls = [url for url, resolution in reversed(self.__cache.items()) if resolution is not None]
+
+        return urls if limit is None else urls[:limit]
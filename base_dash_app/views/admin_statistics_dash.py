@@ -1,11 +1,10 @@
 import datetime
 import json
 import re
-from operator import itemgetter
+from typing import Optional
 
 import dash.dcc
 from dash import html
-from pympler import tracker
 
 from base_dash_app.components.callback_utils.mappers import InputToState, InputMapping
 from base_dash_app.components.cards.info_card import InfoCard
@@ -14,6 +13,8 @@ from base_dash_app.components.data_visualization.simple_line_graph import LineGr
 from base_dash_app.components.datatable import datatable_wrapper
 from base_dash_app.components.datatable.datatable_wrapper import DataTableWrapper
 from base_dash_app.components.labelled_value_chip import LabelledValueChip
+from base_dash_app.utils import memory_utils
+from base_dash_app.utils.memory_utils import MemoryHistory, ObjectCensus
 from base_dash_app.views.base_view import BaseView
 from base_dash_app.virtual_objects.timeseries.time_series import TimeSeries
 from base_dash_app.virtual_objects.timeseries.time_series_data_point import TimeSeriesDataPoint
@@ -27,6 +28,7 @@ class AdminStatisticsDash(BaseView):
     def __init__(
         self, memory_timeseries: TimeSeries,
         cpu_timeseries: TimeSeries,
+        memory_history: MemoryHistory = None,
         **kwargs
     ):
         super().__init__(
@@ -54,28 +56,84 @@ class AdminStatisticsDash(BaseView):
 
         self.memory_timeseries = memory_timeseries
         self.cpu_timeseries = cpu_timeseries
+        self.memory_history: MemoryHistory = memory_history or MemoryHistory()
+        self.object_census: ObjectCensus = ObjectCensus()
 
         def wrapped_reload_function(stats_object):
-            def filter_function(m):
-                stats_object["sum"] += m[2]
-                stats_object["num_objects"] += m[1]
-                return m[2] > 50000
-
             def reload_memory_usages(*args, **kwargs):
-                stats_object["sum"] = 0
-                stats_object["num_objects"] = 0
-
-                mem = tracker.SummaryTracker()
-                memory_usages = list(sorted(mem.create_summary(), reverse=True, key=itemgetter(2)))
-                data_to_return = [
-                    {'type': x[0], 'num_objects': x[1], 'total_size': x[2] / 1000000}
-                    for x in filter(filter_function, memory_usages)
-                ]
-
+                # walks the whole heap, runs on the async handler's threads when the reload button is pressed
+                data_to_return = self.object_census.run()
+                stats_object["sum"] = self.object_census.total_size
+                stats_object["num_objects"] = self.object_census.num_objects
                 return data_to_return
 
             return reload_memory_usages
 
+        def reload_worker_memory(*args, **kwargs):
+            return [
+                {
+                    "pid": pid,
+                    "sampled_at": samples[-1].sampled_at.strftime("%Y-%m-%d %H:%M:%S"),
+                    "rss_mb": samples[-1].rss_mb,
+                    "uss_mb": samples[-1].uss_mb,
+                }
+                for pid, samples in self.memory_history.get_samples_by_pid(latest_only=True).items()
+            ]
+
+        self.workers_dtw = DataTableWrapper(
+            columns=[
+                {'name': 'PID', 'id': 'pid'},
+                {'name': 'Sampled At', 'id': 'sampled_at'},
+                {'name': 'RSS (MB)', 'id': 'rss_mb', "type": "numeric", "format": datatable_wrapper.float_format},
+                {'name': 'USS (MB)', 'id': 'uss_mb', "type": "numeric", "format": datatable_wrapper.float_format},
+            ],
+            reload_data_function=reload_worker_memory,
+            title="Worker Memory",
+        )
+
+        self.allocations_dtw = DataTableWrapper(
+            columns=[
+                {'name': 'Location', 'id': 'location'},
+                {'name': 'Size (MB)', 'id': 'size_mb', "type": "numeric", "format": datatable_wrapper.float_format},
+                {'name': 'Count', 'id': 'count', "type": "numeric", "format": datatable_wrapper.integer_format},
+            ],
+            reload_data_function=lambda *args, **kwargs: memory_utils.get_top_allocations(),
+            title="Top Allocations (tracemalloc, traces from the first reload until 5 minutes after the last)",
+        )
+
+        def reload_executor_stats(*args, **kwargs):
+            if self.get_service is None:
+                return []
+
+            from base_dash_app.services.async_handler_service import AsyncHandlerService
+            return [
+                {"executor": name, **stats}
+                for name, stats in self.get_service(AsyncHandlerService).get_stats().items()
+            ]
+
+        self.executors_dtw = DataTableWrapper(
+            columns=[
+                {'name': 'Executor', 'id': 'executor'},
+                *[
+                    {'name': name, 'id': column_id, "type": "numeric", "format": datatable_wrapper.integer_format}
+                    for name, column_id in [
+                        ("Running", "running"), ("Queued", "queued"), ("Submitted", "submitted"),
+                        ("Succeeded", "success"), ("Failed", "failure"), ("Timed Out", "timed_out"),
+                        ("Rejected", "rejected"), ("Deduped", "deduped"),
+                    ]
+                ],
+                *[
+                    {'name': name, 'id': column_id, "type": "numeric", "format": datatable_wrapper.float_format}
+                    for name, column_id in [
+                        ("Avg Wait (s)", "avg_wait_seconds"), ("Max Wait (s)", "max_wait_seconds"),
+                        ("Avg Run (s)", "avg_run_seconds"),
+                    ]
+                ],
+            ],
+            reload_data_function=reload_executor_stats,
+            title="Async Executors",
+        )
+
         self.memory_dtw = DataTableWrapper(
             columns=[
                 {
@@ -96,7 +154,8 @@ class AdminStatisticsDash(BaseView):
                 },
             ],
             reload_data_function=wrapped_reload_function(self.statistics),
-            title="Memory Usages",
+            title="Object Census",
+            service_provider=self.get_service,
         )
 
     def handle_any_input(self, *args, triggering_id, index):
@@ -105,6 +164,9 @@ class AdminStatisticsDash(BaseView):
             cpu_timeseries=self.cpu_timeseries,
             statistics=self.statistics,
             memory_dtw=self.memory_dtw,
+            workers_dtw=self.workers_dtw,
+            allocations_dtw=self.allocations_dtw,
+            executors_dtw=self.executors_dtw,
             current_tab_id=self.current_tab_id,
         )]
 
@@ -115,6 +177,9 @@ class AdminStatisticsDash(BaseView):
             statistics: dict,
             memory_dtw: DataTableWrapper,
             current_tab_id: str = 'tab-0',
+            workers_dtw: Optional[DataTableWrapper] = None,
+            allocations_dtw: Optional[DataTableWrapper] = None,
+            executors_dtw: Optional[DataTableWrapper] = None,
             *args, **kwargs
     ):
         latest_mem_usage = memory_timeseries[-1].get_y() if len(memory_timeseries) > 0 else 0
@@ -164,6 +229,14 @@ class AdminStatisticsDash(BaseView):
                                 memory_dtw.render()
                             ]
                         ),
+                        *[
+                            dbc.Tab(label=label, tab_id=f"tab-{i + 1}", children=[dtw.render()])
+                            for i, (label, dtw) in enumerate([
+                                ("Workers", workers_dtw), ("Allocations", allocations_dtw),
+                                ("Async Executors", executors_dtw),
+                            ])
+                            if dtw is not None
+                        ],
                     ]
                 )
             ]
@@ -177,6 +250,9 @@ class AdminStatisticsDash(BaseView):
                     cpu_timeseries=self.cpu_timeseries,
                     statistics=self.statistics,
                     memory_dtw=self.memory_dtw,
+                    workers_dtw=self.workers_dtw,
+                    allocations_dtw=self.allocations_dtw,
+                    executors_dtw=self.executors_dtw,
                     current_tab_id=self.current_tab_id,
                 )
             ],
@@ -1,8 +1,12 @@
+import json
 import logging
 from abc import ABC, abstractmethod
-from typing import Pattern, Callable, Optional, List
+from contextvars import ContextVar, Token
+from typing import Pattern, Callable, Optional, List, Dict, Hashable, Any, Tuple
+from urllib.parse import unquote, urlparse
 
 import dash
+import flask
 from dash import html
 from dash.dependencies import Output
 from dash.exceptions import PreventUpdate
@@ -12,9 +16,22 @@ from base_dash_app.components.callback_utils.utils import invalid_n_clicks, get_
     get_state_values_for_input_from_args_list
 from base_dash_app.components.callback_utils.mappers import InputToState
 from base_dash_app.utils.db_utils import DbManager
+from base_dash_app.utils.page_cache import PageCache, DEFAULT_PAGE_CACHE_MAX_ENTRIES
 from base_dash_app.virtual_objects.virtual_framework_obj import VirtualFrameworkObject
 
 
+# path params of the url being rendered, per request rather than per (shared) view instance
+_current_path_params: ContextVar[Optional[Dict[str, Optional[str]]]] = ContextVar("path_params", default=None)
+
+
+def set_current_path_params(path_params: Dict[str, Optional[str]]) -> Token:
+    return _current_path_params.set(path_params)
+
+
+def reset_current_path_params(token: Token):
+    _current_path_params.reset(token)
+
+
 class BaseView(VirtualFrameworkObject, BaseComponent, ABC):
     VIEWS = []
 
@@ -22,18 +39,30 @@ class BaseView(VirtualFrameworkObject, BaseComponent, ABC):
             self, title: str, url_regex: Pattern[str],
             nav_url: str = "", show_in_navbar: bool = True,
             input_to_states_map: List[InputToState] = None,
+            page_cache_ttl_seconds: float = None,
+            page_cache_state_keys: List[Hashable] = None,
+            page_cache_max_entries: int = DEFAULT_PAGE_CACHE_MAX_ENTRIES,
             **kwargs
     ):
+        """
+        :param page_cache_ttl_seconds: opts the view into caching its rendered pages for this long. Stale pages
+            keep being served while they are re-rendered in the background. None disables the cache.
+        :param page_cache_state_keys: global state keys the page depends on, their values are part of the cache key
+        """
         super().__init__(**kwargs)
         self.title: str = title
         self.url_regex = url_regex
-        self.path_params = {}
         self.nav_url = nav_url
         self.show_in_navbar = show_in_navbar
 
         self.input_to_states_map: List[InputToState] = input_to_states_map if input_to_states_map else []
         self.input_string_ids_map = {its.get_input_string_id(): its for its in self.input_to_states_map}
 
+        self.page_cache_state_keys: List[Hashable] = page_cache_state_keys or []
+        self.page_cache: Optional[PageCache] = (
+            PageCache(page_cache_ttl_seconds, page_cache_max_entries) if page_cache_ttl_seconds is not None else None
+        )
+
         self.__name = self.title.lower().replace(' ', '-')
         self.wrapper_div_id: str = f"{self.__name}-wrapper-div-id"
         self.logger = logging.getLogger(self.__name)
@@ -82,14 +111,38 @@ class BaseView(VirtualFrameworkObject, BaseComponent, ABC):
     def validate_state_on_trigger(self):
         return
 
-    # todo: move path params out of here. make it a return variable and have it sent to render function
+    @property
+    def path_params(self) -> Dict[str, Optional[str]]:
+        """
+        The path params of the url currently being rendered in this request. Callbacks aren't part of a render,
+        they get the params of the page that sent them (its url is the request's referrer).
+        """
+        path_params = _current_path_params.get()
+        if path_params is not None:
+            return path_params
+
+        return self.get_path_params_from_referrer()
+
+    def get_path_params_from_referrer(self) -> Dict[str, Optional[str]]:
+        if not flask.has_request_context() or flask.request.referrer is None:
+            return {}
+
+        match_result = self.url_regex.match(unquote(urlparse(flask.request.referrer).path))
+        return match_result.groupdict() if match_result is not None else {}
+
     def matches(self, target_url: str):
-        self.path_params = {}
-        match_result = self.url_regex.match(target_url)
-        if match_result is None:
-            return False
-        self.path_params = match_result.groupdict()
-        return True
+        """
+        Deprecated, RuntimeApplication resolves urls with its UrlRouter. Doesn't set path_params, those are only
+        set (and reset) around a render.
+        """
+        return self.url_regex.match(target_url) is not None
+
+    def prefetch(self, path_params: Dict[str, Optional[str]]):
+        """
+        Called ahead of a likely render of this view (see RuntimeApplication.prefetch_recent_views), to warm
+        whatever the render will need. Does nothing by default.
+        """
+        pass
 
     @staticmethod
     @abstractmethod
@@ -97,7 +150,81 @@ class BaseView(VirtualFrameworkObject, BaseComponent, ABC):
         pass
 
     def handle_global_state_change(self, new_state):
-        pass
+        """
+        Called with the full new state whenever GlobalStateService's state is updated. Overrides should call super,
+        which drops cached pages.
+        """
+        self.invalidate_page_cache()
+
+    def invalidate_page_cache(self):
+        if self.page_cache is not None:
+            self.page_cache.invalidate()
+
+    def get_page_cache_key(self, url: str, query_params: str, states_for_input: Dict) -> Tuple:
+        global_state = {}
+        if len(self.page_cache_state_keys) > 0 and self.get_service is not None:
+            from base_dash_app.services.global_state_service import GlobalStateService
+            global_state = self.get_service(GlobalStateService).state
+
+        return (
+            url,
+            query_params,
+            json.dumps(states_for_input, sort_keys=True, default=str),
+            tuple(repr(global_state.get(key)) for key in self.page_cache_state_keys),
+        )
+
+    def render_page(self, url: str, query_params: str, states_for_input: Dict) -> Any:
+        """
+        render() through the page cache, if the view opted into one. Fresh pages are returned as is. Stale pages
+        are returned too, and re-rendered in the background (once per key at a time). Misses render inline.
+        """
+        if self.page_cache is None:
+            return self.render(query_params, states_for_input)
+
+        key = self.get_page_cache_key(url, query_params, states_for_input)
+        entry = self.page_cache.get(key)
+        if entry is None:
+            generation = self.page_cache.generation
+            content = self.render(query_params, states_for_input)
+            self.page_cache.put(key, content, generation)
+            return content
+
+        if not self.page_cache.is_fresh(entry):
+            self.__revalidate_in_background(key, query_params, states_for_input)
+
+        return entry.content
+
+    def __revalidate_in_background(self, key: Tuple, query_params: str, states_for_input: Dict):
+        if self.get_service is None or not self.page_cache.start_refresh(key):
+            return
+
+        from base_dash_app.services.async_handler_service import AsyncHandlerService
+
+        # the worker thread doesn't see this request's context vars
+        path_params = self.path_params
+        generation = self.page_cache.generation
+
+        def revalidate(*args, **kwargs):
+            token = set_current_path_params(path_params)
+            try:
+                if self.dbm is not None:
+                    with self.dbm:
+                        content = self.render(query_params, states_for_input)
+                else:
+                    content = self.render(query_params, states_for_input)
+
+                self.page_cache.put(key, content, generation)
+            except Exception as e:
+                self.logger.error(f"Error re-rendering cached page {key[0]}: {e}")
+            finally:
+                reset_current_path_params(token)
+                self.page_cache.finish_refresh(key)
+
+        try:
+            self.get_service(AsyncHandlerService).do_work(revalidate)
+        except Exception:
+            self.page_cache.finish_refresh(key)
+            raise
 
     # @staticmethod
     # def get_full_page_inputs():
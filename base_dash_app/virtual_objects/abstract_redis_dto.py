@@ -1,5 +1,8 @@
 import abc
+import threading
+import time
 import uuid
+from typing import Any, Dict, Optional
 
 from redis import StrictRedis
 
@@ -10,12 +13,38 @@ class AbstractRedisDto(abc.ABC):
         *args,
         redis_client: StrictRedis = None,
         ignore_nones: bool = True,
+        max_writes_per_second: float = None,
         **kwargs
     ):
+        """
+        :param max_writes_per_second: limit for throttled writes, e.g. progress updates. Throttled values set more
+            often than this are coalesced and only the latest one is written. None writes every value right away.
+        """
         self.redis_client: StrictRedis = redis_client
         self.uuid: str = uuid.uuid4().hex
         self.read_only: bool = False
         self.ignore_nones: bool = ignore_nones
+        self.max_writes_per_second: Optional[float] = max_writes_per_second
+
+        # fields of the hash at pushed_uuid as this object last wrote or read them. Pushes only write fields whose
+        # value differs, so fields written by other processes (e.g. interrupted_by_user) aren't overwritten
+        # with stale values either.
+        self.pushed_values: Dict[str, str] = {}
+        self.pushed_uuid: Optional[str] = None
+        self.pending_values: Dict[str, Any] = {}
+        self.last_write_at: float = 0.0
+        self.__lock = threading.RLock()
+        self.__flush_timer: Optional[threading.Timer] = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_AbstractRedisDto__lock"] = None
+        state["_AbstractRedisDto__flush_timer"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__lock = threading.RLock()
 
     @classmethod
     def from_redis(cls, *args, redis_client: StrictRedis, uuid: str, **kwargs):
@@ -41,7 +70,22 @@ class AbstractRedisDto(abc.ABC):
     def set_read_only(self, read_only: bool = True):
         self.read_only = read_only
 
-    def set_value_in_redis(self, key: str, value):
+    def set_max_writes_per_second(self, max_writes_per_second: Optional[float]):
+        self.max_writes_per_second = max_writes_per_second
+        return self
+
+    @staticmethod
+    def encode_value(value) -> str:
+        """
+        :return: value as redis stores it, to compare it with what was pushed or read before
+        """
+        return repr(value) if isinstance(value, float) else str(value)
+
+    def set_value_in_redis(self, key: str, value, throttled: bool = False):
+        """
+        :param throttled: if True and max_writes_per_second is set, the value is coalesced with other throttled
+            values and written at most max_writes_per_second times a second
+        """
         if self.redis_client is None:
             return
 
@@ -53,7 +97,60 @@ class AbstractRedisDto(abc.ABC):
                 return
             value = ""
 
-        self.redis_client.hset(self.uuid, key, value)
+        with self.__lock:
+            if throttled and self.max_writes_per_second:
+                self.pending_values[key] = value
+                self.__schedule_flush()
+                return
+
+            self.pending_values.pop(key, None)
+            self.__write({key: value}, only_changed=False)
+
+    def __schedule_flush(self):
+        if self.__flush_timer is not None:
+            return
+
+        wait_seconds = self.last_write_at + 1 / self.max_writes_per_second - time.monotonic()
+        if wait_seconds <= 0:
+            self.flush_to_redis()
+            return
+
+        self.__flush_timer = threading.Timer(wait_seconds, self.flush_to_redis)
+        self.__flush_timer.daemon = True
+        self.__flush_timer.start()
+
+    def __cancel_flush(self):
+        if self.__flush_timer is not None:
+            self.__flush_timer.cancel()
+            self.__flush_timer = None
+
+    def flush_to_redis(self):
+        """
+        Writes throttled values that are waiting to be written.
+        """
+        with self.__lock:
+            self.__cancel_flush()
+            pending_values, self.pending_values = self.pending_values, {}
+            if self.redis_client is None or self.read_only or len(pending_values) == 0:
+                return
+
+            self.__write(pending_values)
+
+    def __write(self, values: Dict[str, Any], only_changed: bool = True):
+        if self.pushed_uuid != self.uuid:
+            self.pushed_values = {}
+            self.pushed_uuid = self.uuid
+
+        encoded_values = {k: AbstractRedisDto.encode_value(v) for k, v in values.items()}
+        if only_changed:
+            values = {k: v for k, v in values.items() if self.pushed_values.get(k) != encoded_values[k]}
+
+        if len(values) == 0:
+            return
+
+        self.redis_client.hset(self.uuid, mapping=values)
+        self.pushed_values.update({k: encoded_values[k] for k in values})
+        self.last_write_at = time.monotonic()
 
     def get_value_from_redis(self, key: str) -> str:
         if self.redis_client is None:
@@ -72,19 +169,32 @@ class AbstractRedisDto(abc.ABC):
     def use_redis(self, redis_client: StrictRedis, uuid: str):
         self.redis_client = redis_client
         self.uuid = uuid
+        self.pushed_values = {}
         return self
 
-    def push_to_redis(self):
+    def push_to_redis(self, force: bool = False):
+        """
+        Writes the fields that changed since they were last written or read, along with any throttled values
+        waiting to be written, in a single HSET.
+        :param force: write every field, e.g. if the hash may have been deleted by another process
+        """
         if self.redis_client is None:
             raise ValueError("Redis client is not set")
 
         if self.read_only:
             raise ValueError("This object is read only")
 
-        for k, v in self.to_dict().items():
-            self.set_value_in_redis(k, v)
+        with self.__lock:
+            self.__cancel_flush()
+            values = {**self.pending_values, **self.to_dict(), "uuid": self.uuid}
+            self.pending_values = {}
+
+            if self.ignore_nones:
+                values = {k: v for k, v in values.items() if v is not None}
+            else:
+                values = {k: "" if v is None else v for k, v in values.items()}
 
-        self.redis_client.hset(self.uuid, "uuid", self.uuid)
+            self.__write(values, only_changed=not force)
 
     def fetch_all_from_redis(self):
         if self.redis_client is None:
@@ -95,12 +205,19 @@ class AbstractRedisDto(abc.ABC):
         if len(data) == 0:
             return None
 
+        self.pushed_values = dict(data)
+        self.pushed_uuid = self.uuid
         return self.from_dict(data)
 
     def destroy_in_redis(self, expire: int = 0):
         if self.redis_client is None:
             raise ValueError("Redis client is not set")
 
+        with self.__lock:
+            self.__cancel_flush()
+            self.pending_values = {}
+            self.pushed_values = {}
+
         if expire > 0:
             self.redis_client.expire(self.uuid, expire)
         else:
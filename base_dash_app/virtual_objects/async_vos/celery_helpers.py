@@ -1,43 +1,166 @@
+import importlib
 import json
-from typing import List
+from typing import List, Any, Iterator, Callable, Optional
 
 from celery import shared_task, Task, states
 from redis import StrictRedis
+from redis.client import Pipeline
 
 from base_dash_app.enums.status_colors import StatusesEnum
 from base_dash_app.utils import redis_utils
+from base_dash_app.virtual_objects.async_vos import result_store
 from base_dash_app.virtual_objects.async_vos.celery_task import CeleryTask
+from base_dash_app.virtual_objects.async_vos.result_store import ResultHandle
 from base_dash_app.virtual_objects.async_vos.work_containers import WorkContainerGroup
 from base_dash_app.application.runtime_application import RuntimeApplication
+from base_dash_app.application.worker_resources import WorkerResources
 
 
 def get_celery_state(prog_container_uuid: str) -> (CeleryTask, RuntimeApplication, StrictRedis):
     rta: RuntimeApplication = RuntimeApplication.get_instance()
-    redis_client: StrictRedis = rta.redis_client
+    redis_client: StrictRedis = WorkerResources.get_instance().redis_client
     prog_container = CeleryTask().use_redis(redis_client, prog_container_uuid).hydrate_from_redis()
 
     return prog_container, rta, redis_client
 
 
+def get_result_for_uuid(redis_client: StrictRedis, uuid: str) -> Any:
+    """
+    Returns the result of the container stored at uuid, whether it was stored inline in the hash
+    or by reference in the result store.
+    """
+    result_handle_json, result_json = redis_client.hmget(uuid, ["result_handle", "result"])
+    if result_handle_json:
+        return result_store.get_default_store(redis_client).get(ResultHandle.from_json(result_handle_json))
+
+    return json.loads(result_json or "null")
+
+
+def iter_prev_results(redis_client: StrictRedis, prev_result_uuids: List[str]) -> Iterator[Any]:
+    """
+    Lazily yields the results of the previous tasks, one at a time, so only the result currently
+    being processed has to be held in memory.
+    """
+    for uuid in prev_result_uuids:
+        yield get_result_for_uuid(redis_client, uuid)
+
+
+def get_func_path(func: Callable) -> str:
+    """
+    Celery signatures can only carry serializable arguments, so functions are passed around by their dotted path.
+    """
+    if "<" in func.__qualname__:
+        raise ValueError(f"{func.__qualname__} must be a module level function to be used as a reducer.")
+
+    return f"{func.__module__}:{func.__qualname__}"
+
+
+def resolve_func_path(func_path: str) -> Callable:
+    module_name, qualname = func_path.split(":")
+    target = importlib.import_module(module_name)
+    for attr in qualname.split("."):
+        target = getattr(target, attr)
+
+    return target
+
+
+def get_accumulator_key(target_uuid: str) -> str:
+    return f"{target_uuid}_accumulator"
+
+
+def get_results_stream_key(target_uuid: str) -> str:
+    return f"{target_uuid}_results_stream"
+
+
+def fold_result(
+        redis_client: StrictRedis, target_uuid: str, source_uuid: str, reducer_path: Optional[str] = None
+):
+    """
+    Folds the result of the task stored at source_uuid into the accumulator of the group at target_uuid.
+    Without a reducer, the result is appended to a redis stream. Stored-by-reference results only append
+    their handle. With a reducer, the accumulated value is read, reduced and written back inside a
+    WATCH / MULTI transaction, so concurrent folds retry instead of overwriting each other.
+    """
+    if reducer_path is None:
+        result_handle_json, result_json = redis_client.hmget(source_uuid, ["result_handle", "result"])
+        entry = {"source": source_uuid}
+        if result_handle_json:
+            entry["result_handle"] = result_handle_json
+        else:
+            entry["result"] = result_json or "null"
+
+        pipeline = redis_client.pipeline(transaction=True)
+        pipeline.xadd(get_results_stream_key(target_uuid), entry)
+        pipeline.hincrby(target_uuid, "num_folded", 1)
+        pipeline.execute()
+        return
+
+    reducer: Callable[[Any, Any], Any] = resolve_func_path(reducer_path)
+    value = get_result_for_uuid(redis_client, source_uuid)
+    accumulator_key = get_accumulator_key(target_uuid)
+
+    def do_fold(pipeline: Pipeline):
+        current = pipeline.get(accumulator_key)
+        folded = value if current is None else reducer(json.loads(current), value)
+        pipeline.multi()
+        pipeline.set(accumulator_key, json.dumps(folded))
+        pipeline.hincrby(target_uuid, "num_folded", 1)
+
+    redis_client.transaction(do_fold, accumulator_key)
+
+
+def read_folded_results(redis_client: StrictRedis, target_uuid: str, reducer_path: Optional[str] = None) -> Any:
+    """
+    Reads whatever has been folded into the accumulator of the group at target_uuid so far.
+    Safe to call while the group is still running.
+    """
+    if reducer_path is not None:
+        accumulated = redis_client.get(get_accumulator_key(target_uuid))
+        return json.loads(accumulated) if accumulated is not None else None
+
+    results = []
+    for _, entry in redis_client.xrange(get_results_stream_key(target_uuid)):
+        if entry.get("result_handle"):
+            results.append(
+                result_store.get_default_store(redis_client).get(ResultHandle.from_json(entry["result_handle"]))
+            )
+        else:
+            results.append(json.loads(entry.get("result") or "null"))
+
+    return results
+
+
+@shared_task
+def fold_into_accumulator(*args, source_uuid: str, target_uuid: str, reducer_path: str = None, **kwargs):
+    redis_client: StrictRedis = WorkerResources.get_instance().redis_client
+    fold_result(redis_client, target_uuid, source_uuid, reducer_path)
+
+
+@shared_task
+def finalize_folded_results(*args, target_uuid: str, **kwargs):
+    """
+    Chord body for groups that reduce incrementally. Everything has already been folded, so this only
+    marks the reduction as complete.
+    """
+    redis_client: StrictRedis = WorkerResources.get_instance().redis_client
+    redis_client.hset(target_uuid, "reduction_complete", "True")
+
+
 @shared_task
 def flatten_redis_lists(*args, prev_result_uuids: List[str], target_uuid: str, **kwargs):
-    from base_dash_app.application.runtime_application import RuntimeApplication
-    redis_client: StrictRedis = RuntimeApplication.get_instance().redis_client
+    redis_client: StrictRedis = WorkerResources.get_instance().redis_client
     redis_utils.flatten_redist_list(target_uuid, prev_result_uuids, redis_client)
 
 
 @shared_task
 def store_uuids(*args, prev_result_uuids: List[str], target_uuid: str, **kwargs):
-    from base_dash_app.application.runtime_application import RuntimeApplication
-    redis_client: StrictRedis = RuntimeApplication.get_instance().redis_client
-    for uuid in prev_result_uuids:
-        redis_client.rpush(target_uuid, uuid)
+    redis_client: StrictRedis = WorkerResources.get_instance().redis_client
+    redis_utils.rpush_batched(redis_client, target_uuid, prev_result_uuids)
 
 
 @shared_task
 def serialize_uuids(*args, prev_result_uuids: List[str], target_uuid: str, hash_key: str = None, **kwargs):
-    from base_dash_app.application.runtime_application import RuntimeApplication
-    redis_client: StrictRedis = RuntimeApplication.get_instance().redis_client
+    redis_client: StrictRedis = WorkerResources.get_instance().redis_client
     if hash_key is None:
         redis_client.set(target_uuid, json.dumps(prev_result_uuids))
     else:
@@ -46,11 +169,8 @@ def serialize_uuids(*args, prev_result_uuids: List[str], target_uuid: str, hash_
 
 @shared_task
 def serialize_flattened_result_lists(*args, prev_result_uuids: List[str], target_uuid: str, hash_key: str = None, **kwargs):
-    from base_dash_app.application.runtime_application import RuntimeApplication
-    redis_client: StrictRedis = RuntimeApplication.get_instance().redis_client
-    results = []
-    for uuid in prev_result_uuids:
-        results.append(redis_client.lrange(uuid, 0, -1))
+    redis_client: StrictRedis = WorkerResources.get_instance().redis_client
+    results = redis_utils.lrange_all(redis_client, prev_result_uuids)
 
     if hash_key is None:
         redis_client.set(target_uuid, json.dumps(results))
@@ -60,8 +180,7 @@ def serialize_flattened_result_lists(*args, prev_result_uuids: List[str], target
 
 @shared_task(bind=True)
 def abort_on_failure(task: Task, *args, target_uuid: str, **kwargs):
-    from base_dash_app.application.runtime_application import RuntimeApplication
-    redis_client: StrictRedis = RuntimeApplication.get_instance().redis_client
+    redis_client: StrictRedis = WorkerResources.get_instance().redis_client
     key_type = redis_client.type(target_uuid)
     if key_type == "hash":
         value = redis_client.hgetall(target_uuid)
@@ -73,13 +192,12 @@ def abort_on_failure(task: Task, *args, target_uuid: str, **kwargs):
 
 @shared_task
 def handle_chord_error(*args, target_uuid: str, request, exc, traceback, **kwargs):
-    from base_dash_app.application.runtime_application import RuntimeApplication
     print(f"Chord error for {target_uuid}")
     print(f"Request: {request}")
     print(f"Exception: {exc}")
     print(f"Traceback: {traceback}")
 
-    redis_client: StrictRedis = RuntimeApplication.get_instance().redis_client
+    redis_client: StrictRedis = WorkerResources.get_instance().redis_client
     key_type = redis_client.type(target_uuid)
     if key_type == "hash":
         value = redis_client.hgetall(target_uuid)
@@ -1,6 +1,6 @@
 import json
 import pprint
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Callable
 
 from celery import Task, chain, group, chord
 
@@ -129,8 +129,20 @@ class CeleryUnorderedTaskGroup(WorkContainerGroup, CeleryTask):
             tasks: List[CeleryTask] = None,
             reducer_task: Task = None,
             require_all_success: bool = True,
+            stream_results: bool = False,
+            incremental_reducer: Callable[[Any, Any], Any] = None,
             **kwargs
     ):
+        """
+        :param reducer_task: celery task to run once all tasks are done. Ignored when reducing incrementally.
+        :param require_all_success: abort the remaining tasks as soon as one of them fails
+        :param stream_results: if True, each task appends its result to a redis stream as soon as it finishes,
+            instead of the results being collected after every task is done. Partial results can be read with
+            get_partial_result while the group is running.
+        :param incremental_reducer: module level, associative function taking (accumulated, result) and
+            returning the new accumulated value. Each task folds its result into the accumulator as soon as
+            it finishes. Implies stream_results.
+        """
         super().__init__(
             containers=tasks,
             name=name,
@@ -151,6 +163,35 @@ class CeleryUnorderedTaskGroup(WorkContainerGroup, CeleryTask):
             prev_result_uuids=[]
         )
         self.require_all_success: bool = require_all_success
+        self.incremental_reducer_path: Optional[str] = (
+            celery_helpers.get_func_path(incremental_reducer) if incremental_reducer is not None else None
+        )
+        self.reduce_incrementally: bool = stream_results or incremental_reducer is not None
+
+    def to_dict(self) -> dict:
+        return {
+            **super().to_dict(),
+            "reduce_incrementally": str(self.reduce_incrementally),
+            "incremental_reducer_path": self.incremental_reducer_path or "",
+        }
+
+    def from_dict(self, data: dict):
+        super().from_dict(data)
+        self.reduce_incrementally = data.get("reduce_incrementally", "False") == "True"
+        self.incremental_reducer_path = data.get("incremental_reducer_path", "") or None
+
+    def get_partial_result(self) -> Any:
+        """
+        Returns what has been reduced so far. Only available when reducing incrementally.
+        """
+        from base_dash_app.virtual_objects.async_vos import celery_helpers
+        if not self.reduce_incrementally:
+            raise ValueError(f"{self.name} does not reduce incrementally.")
+
+        return celery_helpers.read_folded_results(self.redis_client, self.uuid, self.incremental_reducer_path)
+
+    def get_num_folded(self) -> int:
+        return int(self.redis_client.hget(self.uuid, "num_folded") or 0)
 
     def get_result(self, *args, **kwargs):
         if not self.work_containers:
@@ -162,6 +203,9 @@ class CeleryUnorderedTaskGroup(WorkContainerGroup, CeleryTask):
         if len(self.work_containers) == 0:
             return None
 
+        if self.reduce_incrementally:
+            return self.get_partial_result()
+
         # return own result
         # todo: should parse? add function to help get results?
         #   should reducer function be processed here?
@@ -171,26 +215,47 @@ class CeleryUnorderedTaskGroup(WorkContainerGroup, CeleryTask):
         self.tasks.append(task)
         super().add_container(task)
 
-    def signature(self, *args, prev_result_uuids: List[str], **kwargs):
+    def get_header_signature(self, task: CeleryTask, *args, prev_result_uuids: List[str], **kwargs):
         from base_dash_app.virtual_objects.async_vos import celery_helpers
+        signatures = []
         if self.require_all_success:
-            task_list = [
-                chain(
-                    celery_helpers.abort_on_failure.s(target_uuid=self.uuid),
-                    task.signature(*args, prev_result_uuids=prev_result_uuids, **kwargs)
+            signatures.append(celery_helpers.abort_on_failure.s(target_uuid=self.uuid))
+
+        signatures.append(task.signature(*args, prev_result_uuids=prev_result_uuids, **kwargs))
+
+        if self.reduce_incrementally:
+            signatures.append(
+                celery_helpers.fold_into_accumulator.si(
+                    source_uuid=task.uuid,
+                    target_uuid=self.uuid,
+                    reducer_path=self.incremental_reducer_path,
                 )
-                for task in self.tasks
-            ]
+            )
+
+        return chain(*signatures) if len(signatures) > 1 else signatures[0]
+
+    def signature(self, *args, prev_result_uuids: List[str], **kwargs):
+        from base_dash_app.virtual_objects.async_vos import celery_helpers
+        task_list = [
+            self.get_header_signature(task, *args, prev_result_uuids=prev_result_uuids, **kwargs)
+            for task in self.tasks
+        ]
+
+        if self.reduce_incrementally:
+            # clear anything folded by a previous run, the body then has nothing left to do
+            self.redis_client.delete(
+                celery_helpers.get_accumulator_key(self.uuid),
+                celery_helpers.get_results_stream_key(self.uuid),
+            )
+            self.redis_client.hdel(self.uuid, "num_folded", "reduction_complete")
+            body = celery_helpers.finalize_folded_results.si(target_uuid=self.uuid)
         else:
-            task_list = [
-                task.signature(*args, prev_result_uuids=prev_result_uuids, **kwargs)
-                for task in self.tasks
-            ]
+            body = self.reducer_task
 
         self.push_to_redis()
         return chord(
             header=task_list,
-            body=self.reducer_task
+            body=body
         ).on_error(
             celery_helpers.handle_chord_error.s(
                 target_uuid=self.uuid
@@ -0,0 +1,321 @@
+import datetime
+import logging
+import pickle
+import threading
+import traceback
+from concurrent.futures import Future
+from multiprocessing import shared_memory, resource_tracker
+from typing import Any, Callable, Dict, Optional
+
+from base_dash_app.enums.status_colors import StatusesEnum
+from base_dash_app.virtual_objects.async_vos.work_containers import WorkContainer
+
+# inputs smaller than this are cheaper to pickle along with the work than to put in shared memory
+DEFAULT_SHARED_INPUT_MIN_BYTES = 1024 * 1024
+
+# WorkContainer methods the process side may call on the task it reports for
+FORWARDED_METHODS = ["start", "set_progress", "set_status_message"]
+
+logger = logging.getLogger(__name__)
+
+
+class SharedInput:
+    """
+    Handle to a task input placed in shared memory. Only the handle is pickled when work is sent to a process
+    pool, each process then reads the input from the shared block. Bytes and numpy arrays aren't pickled at all,
+    processes get a read only view of the block, which is only valid while their work function runs.
+
+    The process that shares an input owns the block and has to unlink() it once all work using it is done.
+    """
+    def __init__(self, name: str, size: int, kind: str, dtype: str = None, shape: tuple = None):
+        self.name: str = name
+        self.size: int = size
+        self.kind: str = kind
+        self.dtype: Optional[str] = dtype
+        self.shape: Optional[tuple] = shape
+        self._block: Optional[shared_memory.SharedMemory] = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_block"] = None
+        return state
+
+    def attach(self) -> Any:
+        self._block = shared_memory.SharedMemory(name=self.name)
+        try:
+            # attaching registers the block with this process' resource tracker, which would unlink it when this
+            # process exits, while the owner still uses it
+            resource_tracker.unregister(self._block._name, "shared_memory")
+        except Exception:
+            pass
+
+        buffer = self._block.buf[:self.size]
+        if self.kind == "bytes":
+            return buffer.toreadonly()
+        elif self.kind == "ndarray":
+            import numpy
+
+            array = numpy.ndarray(self.shape, dtype=numpy.dtype(self.dtype), buffer=buffer)
+            array.flags.writeable = False
+            return array
+
+        return pickle.loads(buffer)
+
+    def detach(self):
+        if self._block is None:
+            return
+
+        try:
+            self._block.close()
+        except BufferError:
+            # the work kept a view of the input, the block is closed when that view is collected
+            pass
+
+        self._block = None
+
+    def unlink(self):
+        block = shared_memory.SharedMemory(name=self.name)
+        block.close()
+        block.unlink()
+
+
+def share_input(value: Any, min_bytes: int = DEFAULT_SHARED_INPUT_MIN_BYTES) -> Any:
+    """
+    :return: a SharedInput for value if it is at least min_bytes in size, otherwise value itself
+    """
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        data, kind, dtype, shape = memoryview(value).cast("B"), "bytes", None, None
+    elif type(value).__module__ == "numpy" and type(value).__name__ == "ndarray" and value.dtype != object:
+        import numpy
+
+        contiguous = numpy.ascontiguousarray(value)
+        data, kind, dtype, shape = memoryview(contiguous).cast("B"), "ndarray", contiguous.dtype.str, value.shape
+    elif value is None or isinstance(value, (int, float, bool, str)):
+        return value
+    else:
+        data, kind, dtype, shape = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), "pickle", None, None
+
+    if len(data) < min_bytes:
+        return value
+
+    block = shared_memory.SharedMemory(create=True, size=max(len(data), 1))
+    try:
+        block.buf[:len(data)] = data
+        return SharedInput(name=block.name, size=len(data), kind=kind, dtype=dtype, shape=shape)
+    finally:
+        block.close()
+
+
+class ProcessWorkContainer:
+    """
+    Stands in for a task's WorkContainer inside a pool process. Progress and status messages are sent back over
+    a queue and applied to the real container by a ProcessProgressChannel, the final state is returned with the
+    work's result.
+    """
+    def __init__(self, container_id: str, name: str, queue, interrupt_event):
+        self.container_id: str = container_id
+        self.name: str = name
+        self.queue = queue
+        self.interrupt_event = interrupt_event
+        # by name, StatusesEnum members don't survive pickling
+        self.status_name: str = StatusesEnum.NOT_STARTED.value.name
+        self._progress: float = 0.0
+        self.status_message: Optional[str] = None
+        self.result = None
+        self.stacktrace: Optional[str] = None
+        self.start_time: Optional[datetime.datetime] = None
+        self.completed: bool = False
+
+    def __send(self, method: str, *args):
+        self.queue.put((self.container_id, method, args))
+
+    @property
+    def progress(self) -> float:
+        return self._progress
+
+    @progress.setter
+    def progress(self, progress: float):
+        self.set_progress(progress)
+
+    def start(self):
+        self.start_time = datetime.datetime.now()
+        self.status_name = StatusesEnum.IN_PROGRESS.value.name
+        self.__send("start")
+
+    def set_progress(self, progress: float):
+        self._progress = progress
+        self.__send("set_progress", progress)
+
+    def set_status_message(self, status_message: str):
+        self.status_message = status_message
+        self.__send("set_status_message", status_message)
+
+    def check_for_interrupt(self) -> bool:
+        return self.interrupt_event.is_set()
+
+    def get_name(self):
+        return self.name
+
+    def get_status(self) -> StatusesEnum:
+        return StatusesEnum.get_by_name(self.status_name)
+
+    def get_progress(self) -> float:
+        return self._progress
+
+    def get_result(self, clear_result=False) -> Any:
+        return self.result
+
+    def complete(self, result=None, status=StatusesEnum.SUCCESS, progress=100, status_message=None, stacktrace=None):
+        self.status_name = status.value.name
+        self._progress = progress
+        self.status_message = status_message
+        self.stacktrace = stacktrace
+        self.completed = True
+        if result is not None:
+            self.result = result
+
+    def get_final_state(self) -> Dict[str, Any]:
+        return {
+            "completed": self.completed,
+            "start_time": self.start_time,
+            "status": self.status_name,
+            "progress": self._progress,
+            "status_message": self.status_message,
+            "stacktrace": self.stacktrace,
+            "result": self.result,
+        }
+
+
+def run_in_process(
+        work_func: Callable[[Any, Any, Optional[Dict]], Any], container: ProcessWorkContainer, task_input: Any,
+        func_kwargs: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    What a pool process runs for an AsyncTask, same contract as AsyncTask.start.
+    :return: the container's final state
+    """
+    container.start()
+    shared_input = task_input if isinstance(task_input, SharedInput) else None
+    try:
+        if shared_input is not None:
+            task_input = shared_input.attach()
+
+        work_func(container, task_input, func_kwargs)
+    except Exception as e:
+        e.remote_traceback = traceback.format_exc()
+        raise e
+    finally:
+        if shared_input is not None:
+            task_input = None
+            shared_input.detach()
+
+    return container.get_final_state()
+
+
+class ProcessProgressChannel:
+    """
+    Carries progress from pool processes back to the WorkContainers of the tasks they run. Processes put messages
+    on a manager queue, a thread here applies them. Multiprocessing queues can't be passed to pool processes, the
+    manager's can.
+    """
+    def __init__(self, mp_context):
+        self.manager = mp_context.Manager()
+        self.queue = self.manager.Queue()
+        self.__containers: Dict[str, WorkContainer] = {}
+        self.__interrupt_events: Dict[str, Any] = {}
+        self.__lock = threading.Lock()
+        self.__thread = threading.Thread(target=self.__apply_messages, name="process-progress", daemon=True)
+        self.__thread.start()
+
+    def open(self, container: WorkContainer) -> ProcessWorkContainer:
+        interrupt_event = self.manager.Event()
+        with self.__lock:
+            self.__containers[container.id] = container
+            self.__interrupt_events[container.id] = interrupt_event
+
+        return ProcessWorkContainer(container.id, container.get_name(), self.queue, interrupt_event)
+
+    def interrupt(self, container: WorkContainer) -> bool:
+        with self.__lock:
+            interrupt_event = self.__interrupt_events.get(container.id)
+
+        if interrupt_event is None:
+            return False
+
+        interrupt_event.set()
+        return True
+
+    def close(self, container: WorkContainer, future: Future):
+        """
+        Applies the final state of the work behind future to container. Messages still queued for it are dropped.
+        """
+        with self.__lock:
+            self.__containers.pop(container.id, None)
+            self.__interrupt_events.pop(container.id, None)
+            self.__apply_final_state(container, future)
+
+    @staticmethod
+    def __apply_final_state(container: WorkContainer, future: Future):
+        if future.cancelled():
+            container.complete(status=StatusesEnum.CANCELLED, status_message="Cancelled")
+            return
+
+        error = future.exception()
+        if error is not None:
+            container.complete(
+                status=StatusesEnum.FAILURE,
+                status_message=str(error),
+                stacktrace=getattr(error, "remote_traceback", None),
+            )
+            return
+
+        state = future.result()
+        if container.get_start_time() is None:
+            container.set_start_time(state["start_time"])
+
+        if state["completed"]:
+            container.complete(
+                result=state["result"],
+                status=StatusesEnum.get_by_name(state["status"]),
+                progress=state["progress"],
+                status_message=state["status_message"],
+                stacktrace=state["stacktrace"],
+            )
+        elif state["result"] is not None:
+            container.set_result(state["result"])
+
+    def __apply_messages(self):
+        while True:
+            try:
+                message = self.queue.get()
+            except (EOFError, OSError):
+                # the manager shut down
+                return
+
+            if message is None:
+                return
+
+            container_id, method, args = message
+            if method not in FORWARDED_METHODS:
+                continue
+
+            # under the lock, so nothing is applied after close() has set the final state
+            with self.__lock:
+                container = self.__containers.get(container_id)
+                if container is None:
+                    continue
+
+                try:
+                    if method == "start":
+                        # AsyncTask.start runs the work, only the container's bookkeeping is wanted here
+                        WorkContainer.start(container)
+                    else:
+                        getattr(container, method)(*args)
+                except Exception as e:
+                    logger.warning(f"Could not apply {method} to {container}: {e}")
+
+    def shutdown(self):
+        try:
+            self.queue.put(None)
+        finally:
+            self.manager.shutdown()
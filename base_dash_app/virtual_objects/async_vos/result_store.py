@@ -0,0 +1,433 @@
+import abc
+import json
+import os
+import socket
+import tempfile
+import time
+import uuid
+import weakref
+import zlib
+from typing import Any, Optional, List, Union
+
+from redis import StrictRedis
+
+from base_dash_app.utils import redis_utils
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+DEFAULT_TTL_SECONDS = 60 * 60 * 24
+DEFAULT_CHUNK_SIZE = 512 * 1024
+RESULT_KEY_PREFIX = "result_store"
+DEFAULT_PURGE_INTERVAL_SECONDS = 60 * 5
+# mtime of local result files stored without a ttl
+NEVER_EXPIRES = float(2 ** 32)
+
+
+class ResultNotAvailableError(Exception):
+    def __init__(self, handle: 'ResultHandle', reason: str):
+        self.handle = handle
+        self.reason = reason
+
+    def __str__(self):
+        return f"Result {self.handle.key} is not available: {self.reason}"
+
+
+def get_default_codec() -> str:
+    return "msgpack" if msgpack is not None else "json"
+
+
+def get_default_compression() -> str:
+    return "zstd" if zstandard is not None else "zlib"
+
+
+def check_available(codec: str, compression: str):
+    """
+    Raises if codec or compression needs a package that isn't installed, rather than letting the read or write
+    fail halfway. Handles written with msgpack or zstd can only be read where those packages are installed.
+    """
+    if codec == "msgpack" and msgpack is None:
+        raise ImportError("The msgpack result codec needs the msgpack package")
+
+    if compression == "zstd" and zstandard is None:
+        raise ImportError("The zstd result compression needs the zstandard package")
+
+
+def encode(value: Any, codec: str, compression: str) -> bytes:
+    check_available(codec, compression)
+    if codec == "msgpack":
+        raw = msgpack.packb(value, use_bin_type=True)
+    elif codec == "json":
+        raw = json.dumps(value).encode("utf-8")
+    else:
+        raise ValueError(f"Unknown codec: {codec}")
+
+    if compression == "zstd":
+        return zstandard.ZstdCompressor().compress(raw)
+    elif compression == "zlib":
+        return zlib.compress(raw)
+    elif compression == "none":
+        return raw
+
+    raise ValueError(f"Unknown compression: {compression}")
+
+
+def decode(blob: bytes, codec: str, compression: str) -> Any:
+    check_available(codec, compression)
+    if compression == "zstd":
+        raw = zstandard.ZstdDecompressor().decompress(blob)
+    elif compression == "zlib":
+        raw = zlib.decompress(blob)
+    elif compression == "none":
+        raw = blob
+    else:
+        raise ValueError(f"Unknown compression: {compression}")
+
+    if codec == "msgpack":
+        return msgpack.unpackb(raw, raw=False)
+    elif codec == "json":
+        return json.loads(raw.decode("utf-8"))
+
+    raise ValueError(f"Unknown codec: {codec}")
+
+
+class ResultHandle:
+    """
+    A small, serializable reference to a result held in a ResultStore. Handles are what tasks pass
+    to each other instead of the result itself.
+    """
+    def __init__(
+            self, key: str, tier: str,
+            codec: str, compression: str,
+            num_chunks: int = 1, size: int = 0,
+            host: str = None, expires_at: float = None,
+    ):
+        self.key: str = key
+        self.tier: str = tier
+        self.codec: str = codec
+        self.compression: str = compression
+        self.num_chunks: int = num_chunks
+        self.size: int = size
+        self.host: str = host
+        self.expires_at: Optional[float] = expires_at
+
+    def is_expired(self) -> bool:
+        return self.expires_at is not None and self.expires_at <= time.time()
+
+    def to_dict(self) -> dict:
+        return {
+            "key": self.key,
+            "tier": self.tier,
+            "codec": self.codec,
+            "compression": self.compression,
+            "num_chunks": self.num_chunks,
+            "size": self.size,
+            "host": self.host,
+            "expires_at": self.expires_at,
+        }
+
+    @staticmethod
+    def from_dict(data: dict) -> 'ResultHandle':
+        return ResultHandle(
+            key=data["key"],
+            tier=data["tier"],
+            codec=data.get("codec", "json"),
+            compression=data.get("compression", "none"),
+            num_chunks=int(data.get("num_chunks", 1)),
+            size=int(data.get("size", 0)),
+            host=data.get("host"),
+            expires_at=data.get("expires_at"),
+        )
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict())
+
+    @staticmethod
+    def from_json(json_str: str) -> 'ResultHandle':
+        return ResultHandle.from_dict(json.loads(json_str))
+
+    def __repr__(self):
+        return f"ResultHandle({self.tier}:{self.key}, chunks={self.num_chunks}, size={self.size})"
+
+
+class ResultStore(abc.ABC):
+    tier: str = None
+
+    def __init__(
+            self, default_ttl: int = DEFAULT_TTL_SECONDS,
+            codec: str = None, compression: str = None,
+    ):
+        self.default_ttl: int = default_ttl
+        self.codec: str = codec or get_default_codec()
+        self.compression: str = compression or get_default_compression()
+        check_available(self.codec, self.compression)
+
+    def new_key(self) -> str:
+        return f"{RESULT_KEY_PREFIX}:{uuid.uuid4().hex}"
+
+    def put(self, value: Any, ttl: int = None, key: str = None) -> ResultHandle:
+        """
+        Stores value and returns a handle to it.
+        :param value: the result to store. Must be serializable by the store's codec.
+        :param ttl: seconds to keep the result for. Defaults to the store's default ttl.
+        :param key: optional key to store the result under. A random key is used if not provided.
+        :return: the handle to pass on to consumers
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+        blob = encode(value, self.codec, self.compression)
+        handle = ResultHandle(
+            key=key or self.new_key(),
+            tier=self.tier,
+            codec=self.codec,
+            compression=self.compression,
+            size=len(blob),
+            host=socket.gethostname(),
+            expires_at=(time.time() + ttl) if ttl else None,
+        )
+        self._write(handle, blob, ttl)
+        return handle
+
+    def get(self, handle: ResultHandle) -> Any:
+        if handle.is_expired():
+            raise ResultNotAvailableError(handle, "expired")
+
+        blob = self._read(handle)
+        if blob is None:
+            raise ResultNotAvailableError(handle, "missing")
+
+        return decode(blob, handle.codec, handle.compression)
+
+    def can_read(self, handle: ResultHandle) -> bool:
+        return handle.tier == self.tier
+
+    @abc.abstractmethod
+    def _write(self, handle: ResultHandle, blob: bytes, ttl: int):
+        pass
+
+    @abc.abstractmethod
+    def _read(self, handle: ResultHandle) -> Optional[bytes]:
+        pass
+
+    @abc.abstractmethod
+    def delete(self, handle: ResultHandle):
+        pass
+
+
+class RedisResultStore(ResultStore):
+    """
+    Stores compressed results in redis as binary blobs. Large results are split into chunks so that
+    no single value grows past chunk_size, and every chunk carries the ttl.
+    """
+    tier = "redis"
+
+    def __init__(self, redis_client: StrictRedis, chunk_size: int = DEFAULT_CHUNK_SIZE, **kwargs):
+        super().__init__(**kwargs)
+        self.redis_client: StrictRedis = redis_utils.get_binary_client(redis_client)
+        self.chunk_size: int = chunk_size
+
+    @staticmethod
+    def get_chunk_keys(handle: ResultHandle) -> List[str]:
+        return [f"{handle.key}:{i}" for i in range(handle.num_chunks)]
+
+    def _write(self, handle: ResultHandle, blob: bytes, ttl: int):
+        chunks = [blob[i:i + self.chunk_size] for i in range(0, len(blob), self.chunk_size)] or [b""]
+        handle.num_chunks = len(chunks)
+
+        pipeline = self.redis_client.pipeline(transaction=False)
+        for chunk_key, chunk in zip(RedisResultStore.get_chunk_keys(handle), chunks):
+            pipeline.set(chunk_key, chunk, ex=ttl or None)
+        pipeline.execute()
+
+    def _read(self, handle: ResultHandle) -> Optional[bytes]:
+        chunks = self.redis_client.mget(RedisResultStore.get_chunk_keys(handle))
+        if any(chunk is None for chunk in chunks):
+            return None
+
+        return b"".join(chunks)
+
+    def delete(self, handle: ResultHandle):
+        self.redis_client.delete(*RedisResultStore.get_chunk_keys(handle))
+
+
+class LocalFileResultStore(ResultStore):
+    """
+    Stores results as files on the local machine, for producers and consumers that share a host.
+    Uses /dev/shm when it exists so the files live in shared memory rather than on disk.
+
+    A file's mtime is set to when it expires. Expired files are purged from the write path, at most every
+    purge_interval_seconds.
+    """
+    tier = "file"
+
+    def __init__(self, directory: str = None, purge_interval_seconds: int = DEFAULT_PURGE_INTERVAL_SECONDS, **kwargs):
+        super().__init__(**kwargs)
+        if directory is None:
+            base_dir = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+            directory = os.path.join(base_dir, "base_dash_app_results")
+
+        self.directory: str = directory
+        os.makedirs(self.directory, exist_ok=True)
+        self.host: str = socket.gethostname()
+        self.purge_interval_seconds: int = purge_interval_seconds
+        self.last_purged_at: float = 0.0
+
+    def get_path(self, handle: ResultHandle) -> str:
+        return os.path.join(self.directory, handle.key.replace(":", "_"))
+
+    def can_read(self, handle: ResultHandle) -> bool:
+        return super().can_read(handle) and handle.host == self.host
+
+    def _write(self, handle: ResultHandle, blob: bytes, ttl: int):
+        path = self.get_path(handle)
+        # unique per writer, so concurrent writes of the same key don't clobber each other's temp file
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix=f"{os.path.basename(path)}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(blob)
+
+            now = time.time()
+            os.utime(temp_path, (now, now + ttl if ttl else NEVER_EXPIRES))
+            # rename is atomic, so readers never see a partially written file
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        if time.monotonic() - self.last_purged_at >= self.purge_interval_seconds:
+            self.purge_expired()
+
+    def _read(self, handle: ResultHandle) -> Optional[bytes]:
+        if handle.host != self.host:
+            raise ResultNotAvailableError(handle, f"stored on host {handle.host}")
+
+        path = self.get_path(handle)
+        try:
+            if os.path.getmtime(path) < time.time():
+                return None
+
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def delete(self, handle: ResultHandle):
+        path = self.get_path(handle)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def purge_expired(self) -> int:
+        """
+        Files don't expire on their own. Removes every file whose expiry has passed, and temp files left behind
+        by writers that died.
+        :return: the number of files removed
+        """
+        self.last_purged_at = time.monotonic()
+        now = time.time()
+        num_removed = 0
+        for file_name in os.listdir(self.directory):
+            path = os.path.join(self.directory, file_name)
+            try:
+                expires_at = os.path.getmtime(path)
+                if file_name.endswith(".tmp"):
+                    # still being written, its mtime is when the write started
+                    expires_at += self.purge_interval_seconds
+
+                if expires_at < now:
+                    os.remove(path)
+                    num_removed += 1
+            except FileNotFoundError:
+                pass
+
+        return num_removed
+
+
+class TieredResultStore:
+    """
+    Writes to the local tier when the caller knows the consumer is on the same host, and to redis otherwise.
+    Reads are routed by the tier recorded in the handle. It only holds the tiers, every read and write is done
+    by one of them.
+    """
+    def __init__(self, redis_store: RedisResultStore, local_store: LocalFileResultStore = None):
+        self.redis_store: RedisResultStore = redis_store
+        self.local_store: Optional[LocalFileResultStore] = local_store
+
+    def put(self, value: Any, ttl: int = None, key: str = None, local: bool = False) -> ResultHandle:
+        if local and self.local_store is not None:
+            return self.local_store.put(value, ttl=ttl, key=key)
+
+        return self.redis_store.put(value, ttl=ttl, key=key)
+
+    def get_store_for(self, handle: ResultHandle) -> ResultStore:
+        if self.local_store is not None and handle.tier == self.local_store.tier:
+            return self.local_store
+
+        if handle.tier == self.redis_store.tier:
+            return self.redis_store
+
+        raise ResultNotAvailableError(handle, f"unknown tier {handle.tier}")
+
+    def get(self, handle: ResultHandle) -> Any:
+        return self.get_store_for(handle).get(handle)
+
+    def can_read(self, handle: ResultHandle) -> bool:
+        try:
+            return self.get_store_for(handle).can_read(handle)
+        except ResultNotAvailableError:
+            return False
+
+    def delete(self, handle: ResultHandle):
+        self.get_store_for(handle).delete(handle)
+
+
+class LazyResult:
+    """
+    Wraps a handle and only fetches the result from the store the first time it is accessed.
+    """
+    def __init__(self, handle: ResultHandle, store: Union[ResultStore, TieredResultStore]):
+        self.handle: ResultHandle = handle
+        self.store: Union[ResultStore, TieredResultStore] = store
+        self.__hydrated: bool = False
+        self.__value: Any = None
+
+    def is_hydrated(self) -> bool:
+        return self.__hydrated
+
+    def get(self) -> Any:
+        if not self.__hydrated:
+            self.__value = self.store.get(self.handle)
+            self.__hydrated = True
+
+        return self.__value
+
+    @property
+    def value(self) -> Any:
+        return self.get()
+
+    def __repr__(self):
+        return f"LazyResult({self.handle}, hydrated={self.__hydrated})"
+
+
+_default_stores = weakref.WeakKeyDictionary()
+
+
+def get_default_store(redis_client: StrictRedis) -> TieredResultStore:
+    """
+    Returns the process wide result store for the given redis client, creating it on first use.
+    """
+    pool = redis_client.connection_pool
+    if pool not in _default_stores:
+        _default_stores[pool] = TieredResultStore(
+            redis_store=RedisResultStore(redis_client),
+            local_store=LocalFileResultStore(),
+        )
+
+    return _default_stores[pool]
@@ -10,6 +10,8 @@ from base_dash_app.components.base_component import BaseComponent
 from base_dash_app.enums.status_colors import StatusesEnum
 from base_dash_app.utils import date_utils
 from base_dash_app.virtual_objects.abstract_redis_dto import AbstractRedisDto
+from base_dash_app.virtual_objects.async_vos import result_store
+from base_dash_app.virtual_objects.async_vos.result_store import ResultHandle
 from base_dash_app.virtual_objects.interfaces.startable import BaseWorkContainer, BaseWorkContainerGroup
 
 
@@ -18,8 +20,19 @@ class WorkContainer(BaseWorkContainer, BaseComponent, AbstractRedisDto):
             self, name: str = None,
             color: str = "primary",
             is_hidden: bool = False,
+            store_result_by_reference: bool = False,
+            result_ttl: int = None,
+            local_result: bool = False,
             *args, **kwargs
     ):
+        """
+        :param store_result_by_reference: if True, the result is written to the result store as a compressed
+            blob and only a handle to it is kept in this container's hash. The result is fetched the first
+            time get_result is called.
+        :param result_ttl: seconds to keep a result stored by reference for
+        :param local_result: with store_result_by_reference, writes the result to the local file tier instead of
+            redis. Only for results consumed on the same host, e.g. by the next task of a chain on the same worker.
+        """
         super().__init__()
         BaseComponent.__init__(self, *args, **kwargs)
         AbstractRedisDto.__init__(self, *args, **kwargs)
@@ -37,6 +50,10 @@ class WorkContainer(BaseWorkContainer, BaseComponent, AbstractRedisDto):
         self.celery_task_id: Optional[str] = None
         self.interrupted_by_user: bool = False
         self.serialize_result: bool = False
+        self.store_result_by_reference: bool = store_result_by_reference
+        self.result_ttl: Optional[int] = result_ttl
+        self.local_result: bool = local_result
+        self.result_handle: Optional[ResultHandle] = None
 
     def use_redis(self, redis_client: StrictRedis, uuid: str):
         super().use_redis(redis_client, uuid)
@@ -70,9 +87,19 @@ class WorkContainer(BaseWorkContainer, BaseComponent, AbstractRedisDto):
         self.interrupted_by_user = False
         if destroy_in_redis:
             self.destroy_in_redis()
+        self.result_handle = None
+
+    def destroy_in_redis(self, expire: int = 0):
+        if self.result_handle is not None and self.redis_client is not None and expire == 0:
+            result_store.get_default_store(self.redis_client).delete(self.result_handle)
+
+        super().destroy_in_redis(expire)
 
     def to_dict(self):
-        if self.result:
+        if self.store_result_by_reference and self.serialize_result:
+            # the result itself lives in the result store, only the handle goes in the hash
+            result = ""
+        elif self.result:
             result = json.dumps(self.result) if self.serialize_result else self.result
         else:
             result = "" if self.serialize_result else None
@@ -97,6 +124,9 @@ class WorkContainer(BaseWorkContainer, BaseComponent, AbstractRedisDto):
             "uuid": self.uuid,
             "task_id": self.celery_task_id or "",
             "interrupted_by_user": str(self.interrupted_by_user),
+            "result_by_reference": str(self.store_result_by_reference),
+            "local_result": str(self.local_result),
+            "result_handle": self.result_handle.to_json() if self.result_handle else "",
         }
 
     def from_dict(self, d: Dict[str, str]):
@@ -112,6 +142,11 @@ class WorkContainer(BaseWorkContainer, BaseComponent, AbstractRedisDto):
             )
         )
 
+        self.store_result_by_reference = d.get("result_by_reference", "False") == "True"
+        self.local_result = d.get("local_result", "False") == "True"
+        result_handle_json = d.get("result_handle", "")
+        self.result_handle = ResultHandle.from_json(result_handle_json) if result_handle_json else None
+
         self.result = d.get("result", "")
 
         if self.result == "":
@@ -147,7 +182,7 @@ class WorkContainer(BaseWorkContainer, BaseComponent, AbstractRedisDto):
             raise ValueError("Cannot update progress of a cancelled task")
 
         self.progress = progress
-        self.set_value_in_redis("progress", str(progress))
+        self.set_value_in_redis("progress", str(progress), throttled=True)
 
     def set_status_message(self, status_message: str):
         if status_message:
@@ -200,10 +235,23 @@ class WorkContainer(BaseWorkContainer, BaseComponent, AbstractRedisDto):
 
     def set_result(self, result: Any, push_to_redis: bool = True):
         self.result = result
-        if self.serialize_result:
-            dumped_string = json.dumps(result)
-            if push_to_redis:
-                self.set_value_in_redis("result", dumped_string)
+        if self.serialize_result and push_to_redis:
+            if self.store_result_by_reference:
+                self.set_result_handle(
+                    result_store.get_default_store(self.redis_client).put(
+                        result, ttl=self.result_ttl, key=f"{result_store.RESULT_KEY_PREFIX}:{self.uuid}",
+                        local=self.local_result
+                    )
+                )
+            else:
+                self.set_value_in_redis("result", json.dumps(result))
+
+    def set_result_handle(self, result_handle: ResultHandle):
+        self.result_handle = result_handle
+        self.set_value_in_redis("result_handle", result_handle.to_json() if result_handle else "")
+
+    def get_result_handle(self) -> Optional[ResultHandle]:
+        return self.result_handle
 
     def set_stacktrace(self, stacktrace: str):
         self.stacktrace = stacktrace
@@ -228,6 +276,8 @@ class WorkContainer(BaseWorkContainer, BaseComponent, AbstractRedisDto):
         if result is not None:
             self.set_result(result=result)
 
+        self.flush_to_redis()
+
     def get_start_time(self, with_refresh=False):
         if with_refresh:
             str_val = self.get_value_from_redis("start_time")
@@ -262,6 +312,10 @@ class WorkContainer(BaseWorkContainer, BaseComponent, AbstractRedisDto):
         return self.execution_status
 
     def get_result(self, clear_result=False) -> Any:
+        if self.result is None and self.result_handle is not None and self.redis_client is not None:
+            # lazily hydrate results that were stored by reference
+            self.result = result_store.get_default_store(self.redis_client).get(self.result_handle)
+
         to_return = self.result
         if clear_result:
             self.result = None
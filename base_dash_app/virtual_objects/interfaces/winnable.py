@@ -150,6 +150,7 @@ class Winnable(ResultableEvent, Representable, ABC):
         self.losing_teams: List[CompetingTeam] = losing_teams
         self.all_teams: List[CompetingTeam] = [] + [winning_team] + losing_teams
         self.extra_data = extra_data
+        # ratings after this game, filled by WinnableRatingEngine under (dims key, Competitor.get_repr_for_dims)
         self.rating_cache: Dict[Tuple, trueskill.Rating] = {}
 
     def __lt__(self, other):
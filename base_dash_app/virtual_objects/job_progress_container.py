@@ -1,14 +1,14 @@
 import datetime
-import json
 import logging
 from enum import Enum
-from typing import Optional, TypeVar, Type
+from typing import Optional, TypeVar, Type, List
 
 from redis import Redis, StrictRedis
 
 from base_dash_app.enums.log_levels import LogLevelsEnum, LogLevel
 from base_dash_app.enums.status_colors import StatusesEnum
 from base_dash_app.utils import date_utils
+from base_dash_app.utils.job_log_utils import JobLogStream, LogArchiveBuffer
 from base_dash_app.virtual_objects.abstract_redis_dto import AbstractRedisDto
 from base_dash_app.virtual_objects.interfaces.selectable import Selectable
 
@@ -39,7 +39,6 @@ class VirtualJobProgressContainer(AbstractRedisDto):
             "prerequisites_status": self.prerequisites_status.value.name,
             "completion_status": self.completion_criteria_status.value.name,
             "progress": self.progress if self.progress != "" else 0.0,
-            "logs": json.dumps(self.logs or []),
             "completed": "True" if self.completed else "False",
             "start_time": datetime.datetime.strftime(
                 self.start_time, date_utils.STANDARD_DATETIME_FORMAT
@@ -54,7 +53,6 @@ class VirtualJobProgressContainer(AbstractRedisDto):
         self.completion_criteria_status = StatusesEnum.get_by_name(data.get("completion_status", StatusesEnum.PENDING.value.name))
         self.progress = float(data.get("progress", 0.0))
         self.uuid = f"{BASE_KEY}_{self.job_instance_id}"
-        self.logs = json.loads(data.get("logs", "[]"))
         self.completed = data.get("completed", "False") == "True"
         self.start_time = data.get("start_time", "")
         if self.start_time == "":
@@ -89,14 +87,31 @@ class VirtualJobProgressContainer(AbstractRedisDto):
         self.progress: float = 0.0
         self.completed: bool = False
         self.extras = {}
-        self.logs = []
+        # lines at or above log_level, for the archive written on completion. They also go to the live log stream.
+        self.log_archive: LogArchiveBuffer = LogArchiveBuffer()
         self.log_level: LogLevel = LogLevelsEnum.INFO.value
         self.logger = logging.getLogger(f"job_instance_{self.job_instance_id}")
         self.selectable: Optional[Selectable] = None
         self.last_status_updated_at: Optional[datetime.datetime] = None
         self.redis_client: Optional[Redis] = None
         self.celery_task_id: Optional[str] = None
-        self.logs_tail_id = f"{self.uuid}_logs_tail"
+
+    @property
+    def logs_tail_id(self) -> str:
+        return f"{self.uuid}_logs_stream"
+
+    @property
+    def logs(self) -> List[str]:
+        """
+        Every archived line logged by this process, decompressed.
+        """
+        return self.log_archive.get_lines()
+
+    def get_log_stream(self) -> Optional[JobLogStream]:
+        if self.redis_client is None:
+            return None
+
+        return JobLogStream(self.redis_client, self.logs_tail_id)
 
     def __repr__(self):
         return str(self.to_dict())
@@ -123,7 +138,7 @@ class VirtualJobProgressContainer(AbstractRedisDto):
                f"progress={self.progress}, " \
                f"completed={self.completed}, " \
                f"extras={self.extras}, " \
-               f"logs={self.logs}, " \
+               f"num_logs={len(self.log_archive)}, " \
                f"selectable: {self.selectable})"
 
     def set_progress(self, progress):
@@ -132,7 +147,7 @@ class VirtualJobProgressContainer(AbstractRedisDto):
             return
         self.progress = progress
         self.last_status_updated_at = datetime.datetime.now()
-        self.set_value_in_redis("progress", progress or 0.0)
+        self.set_value_in_redis("progress", progress or 0.0, throttled=True)
 
     def set_pending(self):
         self.execution_status = StatusesEnum.PENDING
@@ -180,57 +195,40 @@ class VirtualJobProgressContainer(AbstractRedisDto):
 
         return (self.end_time - self.start_time).total_seconds()
 
+    def __log(self, tag: str, level: LogLevel, message):
+        if level < self.log_level:
+            return
+
+        line = f"[{tag}]{message}"
+        self.log_archive.append(line)
+
+        log_stream = self.get_log_stream()
+        if log_stream is not None:
+            log_stream.append(line)
+
     def info_log(self, message):
         self.logger.info(message)
-        if self.log_level <= LogLevelsEnum.INFO.value:
-            self.logs.append(f"[INFO]{message}")
-
-        if self.redis_client is not None:
-            self.redis_client.rpush(
-                self.logs_tail_id,
-                f"[INFO]{message}\n"
-            )
+        self.__log("INFO", LogLevelsEnum.INFO.value, message)
 
     def error_log(self, message):
         self.logger.error(message)
-        if self.log_level <= LogLevelsEnum.ERROR.value:
-            self.logs.append(f"[ERROR]{message}")
-
-        if self.redis_client is not None:
-            self.redis_client.rpush(
-                self.logs_tail_id,
-                f"[ERROR]{message}\n"
-            )
+        self.__log("ERROR", LogLevelsEnum.ERROR.value, message)
 
     def critical_log(self, message):
         self.logger.critical(message)
-        if self.log_level <= LogLevelsEnum.CRITICAL.value:
-            self.logs.append(f"[CRITICAL]{message}")
-
-        if self.redis_client is not None:
-            self.redis_client.rpush(
-                self.logs_tail_id,
-                f"[CRITICAL]{message}\n"
-            )
+        self.__log("CRITICAL", LogLevelsEnum.CRITICAL.value, message)
 
     def debug_log(self, message):
         self.logger.debug(message)
-        if self.log_level <= LogLevelsEnum.DEBUG.value:
-            self.logs.append(f"[DEBUG]{message}")
-
-        if self.redis_client is not None:
-            self.redis_client.rpush(
-                self.logs_tail_id,
-                f"[DEBUG]{message}\n"
-            )
+        self.__log("DEBUG", LogLevelsEnum.DEBUG.value, message)
 
     def warn_log(self, message):
         self.logger.warning(message)
-        if self.log_level <= LogLevelsEnum.WARNING.value:
-            self.logs.append(f"[WARN]{message}")
+        self.__log("WARN", LogLevelsEnum.WARNING.value, message)
 
-        if self.redis_client is not None:
-            self.redis_client.rpush(
-                self.logs_tail_id,
-                f"[WARN]{message}\n"
-            )
+    def destroy_in_redis(self, expire: int = 0):
+        super().destroy_in_redis(expire)
+        if expire > 0:
+            self.redis_client.expire(self.logs_tail_id, expire)
+        else:
+            self.redis_client.delete(self.logs_tail_id)
@@ -0,0 +1,307 @@
+import bisect
+import datetime
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, List, Optional, Set, Tuple, Type
+
+import trueskill
+
+from base_dash_app.enums.executor_types import ExecutorTypesEnum
+from base_dash_app.virtual_objects.interfaces.winnable import Winnable, CompetitorDimension
+
+DEFAULT_CHECKPOINT_INTERVAL = 100
+
+# a game reduced to the rating keys of each team's competitors, winning team first
+RatedGame = Tuple[Tuple[Tuple, ...], ...]
+
+
+def get_dims_key(competitor_dims: List[Type[CompetitorDimension]]) -> Tuple[str, ...]:
+    return tuple(sorted(dim.__name__ for dim in competitor_dims))
+
+
+def extract_game(winnable: Winnable, competitor_dims: List[Type[CompetitorDimension]]) -> Optional[RatedGame]:
+    """
+    :return: the rating keys (Competitor.get_repr_for_dims) of each team's competitors, or None if a team has no
+        competitor with any of competitor_dims, in which case the game can't be rated
+    """
+    teams = []
+    for team in [winnable.get_winning_team()] + winnable.get_losing_teams():
+        keys = tuple(
+            key for key in (c.get_repr_for_dims(competitor_dims) for c in team.get_competitors()) if len(key) > 0
+        )
+        if len(keys) == 0:
+            return None
+        teams.append(keys)
+
+    return tuple(teams)
+
+
+def get_env_params(env: trueskill.TrueSkill) -> Dict[str, float]:
+    return {
+        "mu": env.mu, "sigma": env.sigma, "beta": env.beta, "tau": env.tau, "draw_probability": env.draw_probability
+    }
+
+
+def rate_game(env: trueskill.TrueSkill, ratings: Dict[Tuple, trueskill.Rating], game: RatedGame):
+    """
+    Updates ratings with the outcome of game. The winning team beats every losing team, losing teams tie among
+    themselves. A key appearing more than once in a game gets the sum of its changes, like
+    Rateable.update_trueskills.
+    """
+    rating_groups = [tuple(ratings.get(key) or env.create_rating() for key in team) for team in game]
+    new_rating_groups = env.rate(rating_groups, ranks=[0] + [1] * (len(game) - 1))
+
+    keys = [key for team in game for key in team]
+    if len(set(keys)) == len(keys):
+        for team, new_ratings in zip(game, new_rating_groups):
+            for key, new_rating in zip(team, new_ratings):
+                ratings[key] = new_rating
+        return
+
+    diffs: Dict[Tuple, List[float]] = {}
+    for team, old_ratings, new_ratings in zip(game, rating_groups, new_rating_groups):
+        for key, old_rating, new_rating in zip(team, old_ratings, new_ratings):
+            diff = diffs.setdefault(key, [0.0, 0.0])
+            diff[0] += new_rating.mu - old_rating.mu
+            diff[1] += new_rating.sigma - old_rating.sigma
+
+    for key, (mu_diff, sigma_diff) in diffs.items():
+        old_rating = ratings.get(key) or env.create_rating()
+        ratings[key] = env.create_rating(mu=old_rating.mu + mu_diff, sigma=old_rating.sigma + sigma_diff)
+
+
+def rate_games(
+        games: List[RatedGame], env_params: Dict[str, float] = None,
+        initial_ratings: Dict[Tuple, trueskill.Rating] = None
+) -> Dict[Tuple, trueskill.Rating]:
+    """
+    Rates games in order. Module level and working on plain tuples only, so process pools can run it.
+    """
+    env = trueskill.TrueSkill(**env_params) if env_params else trueskill.TrueSkill()
+    ratings = dict(initial_ratings or {})
+    for game in games:
+        rate_game(env, ratings, game)
+
+    return ratings
+
+
+class RatingCheckpoint:
+    def __init__(self, num_games: int, ratings: Dict[Tuple, trueskill.Rating]):
+        self.num_games: int = num_games
+        # ratings are replaced, never mutated, so a shallow copy is a snapshot
+        self.ratings: Dict[Tuple, trueskill.Rating] = dict(ratings)
+
+
+class RatingSlice:
+    """
+    A what-if view of a history: ratings by competitor_dims over only the games winnable_filter keeps.
+    """
+    def __init__(
+            self, competitor_dims: List[Type[CompetitorDimension]],
+            winnable_filter: Callable[[Winnable], bool] = None, name: str = None
+    ):
+        self.competitor_dims: List[Type[CompetitorDimension]] = competitor_dims
+        self.winnable_filter: Optional[Callable[[Winnable], bool]] = winnable_filter
+        self.name: str = name or ", ".join(get_dims_key(competitor_dims))
+
+    def extract_games(self, winnables: List[Winnable]) -> List[RatedGame]:
+        games = []
+        for winnable in sorted(winnables):
+            if self.winnable_filter is not None and not self.winnable_filter(winnable):
+                continue
+
+            game = extract_game(winnable, self.competitor_dims)
+            if game is not None:
+                games.append(game)
+
+        return games
+
+
+class WinnableRatingEngine:
+    """
+    TrueSkill ratings of competitors, keyed by Competitor.get_repr_for_dims(competitor_dims), over a stream of
+    Winnables. Games newer than the latest one are rated incrementally. Snapshots are taken every
+    checkpoint_interval games, so a game added out of order only replays the games after the checkpoint before it.
+
+    Each rated game's rating_cache gets its competitors' ratings after the game, under (dims key, rating key).
+    """
+    def __init__(
+            self, competitor_dims: List[Type[CompetitorDimension]],
+            checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL,
+            env: trueskill.TrueSkill = None,
+            id_func: Callable[[Winnable], Hashable] = id
+    ):
+        """
+        :param id_func: identifies a game, so adding it again doesn't rate it twice. Object identity by default.
+            Winnables rebuilt from the same rows, e.g. on every query, should pass their row id instead. Date and
+            teams aren't enough, rematches have the same ones.
+        """
+        self.competitor_dims: List[Type[CompetitorDimension]] = competitor_dims
+        self.dims_key: Tuple[str, ...] = get_dims_key(competitor_dims)
+        self.checkpoint_interval: int = checkpoint_interval
+        self.env: trueskill.TrueSkill = env or trueskill.TrueSkill()
+        self.id_func: Callable[[Winnable], Hashable] = id_func
+
+        self.winnables: List[Winnable] = []
+        self.games: List[Optional[RatedGame]] = []
+        self.dates: List[datetime.datetime] = []
+        self.game_keys: Set[Hashable] = set()
+        self.ratings: Dict[Tuple, trueskill.Rating] = {}
+        self.checkpoints: List[RatingCheckpoint] = [RatingCheckpoint(0, {})]
+        self.__lock = threading.RLock()
+
+    def add(self, winnable: Winnable) -> bool:
+        """
+        :return: False if the game was already rated
+        """
+        return self.add_all([winnable]) == 1
+
+    def add_all(self, winnables: List[Winnable]) -> int:
+        """
+        Rates games that weren't rated before. Games older than the latest rated one are inserted in order and
+        the games after them are replayed once, from the checkpoint before the oldest of them.
+        :return: the number of games that weren't rated before
+        """
+        with self.__lock:
+            num_rated = len(self.games)
+            first_index = None
+            for winnable in sorted(winnables):
+                game_key = self.id_func(winnable)
+                if game_key in self.game_keys:
+                    continue
+                self.game_keys.add(game_key)
+
+                index = bisect.bisect_right(self.dates, winnable.date)
+                self.winnables.insert(index, winnable)
+                self.games.insert(index, extract_game(winnable, self.competitor_dims))
+                self.dates.insert(index, winnable.date)
+                first_index = index if first_index is None else min(first_index, index)
+
+            if first_index is None:
+                return 0
+
+            if first_index >= num_rated:
+                for i in range(num_rated, len(self.games)):
+                    self.__rate(i)
+            else:
+                self.__replay_from(first_index)
+
+            return len(self.games) - num_rated
+
+    def __rate(self, index: int):
+        game = self.games[index]
+        if game is not None:
+            rate_game(self.env, self.ratings, game)
+            rating_cache = self.winnables[index].rating_cache
+            for key in set(k for team in game for k in team):
+                rating_cache[(self.dims_key, key)] = self.ratings[key]
+
+        num_games = index + 1
+        if num_games % self.checkpoint_interval == 0:
+            self.checkpoints.append(RatingCheckpoint(num_games, self.ratings))
+
+    def __get_checkpoint_before(self, num_games: int) -> RatingCheckpoint:
+        index = bisect.bisect_right([c.num_games for c in self.checkpoints], num_games) - 1
+        return self.checkpoints[index]
+
+    def __replay_from(self, index: int):
+        checkpoint = self.__get_checkpoint_before(index)
+        self.checkpoints = [c for c in self.checkpoints if c.num_games <= checkpoint.num_games]
+        self.ratings = dict(checkpoint.ratings)
+        for i in range(checkpoint.num_games, len(self.games)):
+            self.__rate(i)
+
+    def get_rating_for_repr(self, key: Tuple) -> trueskill.Rating:
+        return self.ratings.get(key) or self.env.create_rating()
+
+    def get_rating(self, competitor) -> trueskill.Rating:
+        return self.get_rating_for_repr(competitor.get_repr_for_dims(self.competitor_dims))
+
+    def get_ratings(self) -> Dict[Tuple, trueskill.Rating]:
+        with self.__lock:
+            return dict(self.ratings)
+
+    def get_ratings_at(self, date: datetime.datetime) -> Dict[Tuple, trueskill.Rating]:
+        """
+        :return: ratings after every game on or before date, replayed from the checkpoint before it
+        """
+        with self.__lock:
+            num_games = bisect.bisect_right(self.dates, date)
+            checkpoint = self.__get_checkpoint_before(num_games)
+            games = [g for g in self.games[checkpoint.num_games:num_games] if g is not None]
+            return rate_games(games, get_env_params(self.env), checkpoint.ratings)
+
+    def get_leaderboard(self, min_games: int = 0) -> List[Tuple[Tuple, trueskill.Rating]]:
+        """
+        :return: (rating key, rating) pairs, highest conservative rating (mu - 3 sigma) first
+        """
+        with self.__lock:
+            if min_games > 0:
+                games_played: Dict[Tuple, int] = {}
+                for game in self.games:
+                    for key in set(k for team in game or [] for k in team):
+                        games_played[key] = games_played.get(key, 0) + 1
+                ratings = [(k, r) for k, r in self.ratings.items() if games_played.get(k, 0) >= min_games]
+            else:
+                ratings = list(self.ratings.items())
+
+        return sorted(ratings, key=lambda item: item[1].mu - 3 * item[1].sigma, reverse=True)
+
+    def __len__(self):
+        return len(self.games)
+
+
+def compute_slices(
+        winnables: List[Winnable], slices: List[RatingSlice], async_service=None,
+        env: trueskill.TrueSkill = None
+) -> Dict[str, Dict[Tuple, trueskill.Rating]]:
+    """
+    Recomputes ratings from scratch for several what-if slices of winnables. Games are reduced to plain tuples
+    here, then each slice is rated in async_service's process pool, so slices are rated on separate cores.
+    Without async_service they are rated one after the other.
+    :return: each slice's ratings, by slice name
+    """
+    env_params = get_env_params(env or trueskill.TrueSkill())
+    games_by_slice = {s.name: s.extract_games(winnables) for s in slices}
+
+    if async_service is None:
+        return {name: rate_games(games, env_params) for name, games in games_by_slice.items()}
+
+    executor = async_service.get_executor(ExecutorTypesEnum.PROCESS)
+    futures: Dict[str, Future] = {
+        name: executor.submit(rate_games, games, env_params) for name, games in games_by_slice.items()
+    }
+    return {name: future.result() for name, future in futures.items()}
+
+
+class RatingEngineRegistry:
+    """
+    Process wide rating engines, keyed by (history key, competitor dims), so views showing the same history
+    share one engine and only rate games they haven't seen. Engines outlive the winnables they were given, so
+    histories whose winnables are rebuilt on every query should pass an id_func to get_engine.
+    """
+    def __init__(self):
+        self.__engines: Dict[Tuple[Hashable, Tuple[str, ...]], WinnableRatingEngine] = {}
+        self.__lock = threading.Lock()
+
+    def get_engine(
+            self, history_key: Hashable, competitor_dims: List[Type[CompetitorDimension]], **kwargs: Any
+    ) -> WinnableRatingEngine:
+        key = (history_key, get_dims_key(competitor_dims))
+        with self.__lock:
+            if key not in self.__engines:
+                self.__engines[key] = WinnableRatingEngine(competitor_dims, **kwargs)
+
+            return self.__engines[key]
+
+    def invalidate(self, history_key: Hashable = None):
+        """
+        Drops engines, e.g. after games were edited or deleted. With no arguments everything is dropped.
+        """
+        with self.__lock:
+            for key in list(self.__engines.keys()):
+                if history_key is None or key[0] == history_key:
+                    del self.__engines[key]
+
+
+rating_engines = RatingEngineRegistry()
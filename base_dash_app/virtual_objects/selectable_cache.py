@@ -0,0 +1,94 @@
+import threading
+import time
+from typing import Dict, List, Optional, Tuple, Any
+
+from sqlalchemy import event
+
+from base_dash_app.virtual_objects.interfaces.selectable import Selectable, CachedSelectable
+
+DEFAULT_SELECTABLES_CACHE_TTL = 60
+
+
+class SelectableCacheEntry:
+    """
+    The selectables of one job class parameter, detached from any session, with a value -> selectable index.
+    Model rows are never kept, only their values, so they can be loaded into the caller's session instead of
+    being handed out as wrappers.
+    """
+    def __init__(self, selectables: List[Selectable], holds_models: bool = False):
+        self.holds_models: bool = holds_models
+        self.values: List[Any] = [s.get_value() for s in selectables]
+        self.selectables: List[CachedSelectable] = [] if holds_models else [
+            s if isinstance(s, CachedSelectable) else CachedSelectable.from_selectable(s)
+            for s in selectables
+        ]
+        self.selectables_by_value: Dict[Any, CachedSelectable] = {
+            s.get_value(): s for s in self.selectables
+        }
+        self.loaded_at: float = time.monotonic()
+
+    def is_fresh(self, ttl: Optional[float]) -> bool:
+        return ttl is None or time.monotonic() - self.loaded_at < ttl
+
+    def get_by_value(self, value: Any) -> Optional[CachedSelectable]:
+        return self.selectables_by_value.get(value)
+
+
+class SelectableCache:
+    """
+    Process wide cache of selectables, keyed by (job class, param name).
+    """
+    def __init__(self):
+        self.__entries: Dict[Tuple[type, str], SelectableCacheEntry] = {}
+        self.__lock = threading.Lock()
+        self.__watched_models = set()
+
+    def get(self, job_class: type, param_name: str, ttl: Optional[float]) -> Optional[SelectableCacheEntry]:
+        entry = self.__entries.get((job_class, param_name))
+        if entry is None or not entry.is_fresh(ttl):
+            return None
+
+        return entry
+
+    def put(
+            self, job_class: type, param_name: str, selectables: List[Selectable], holds_models: bool = False
+    ) -> SelectableCacheEntry:
+        entry = SelectableCacheEntry(selectables or [], holds_models=holds_models)
+        with self.__lock:
+            self.__entries[(job_class, param_name)] = entry
+
+        return entry
+
+    def invalidate(self, job_class: type = None, param_name: str = None):
+        """
+        Drops cached entries. With no arguments everything is dropped.
+        :param job_class: only drop entries of this job class
+        :param param_name: only drop entries of this parameter
+        """
+        with self.__lock:
+            for key in list(self.__entries.keys()):
+                entry_job_class, entry_param_name = key
+                if job_class is not None and entry_job_class is not job_class:
+                    continue
+                if param_name is not None and entry_param_name != param_name:
+                    continue
+
+                del self.__entries[key]
+
+    def invalidate_on_change(self, model_type: type, job_class: type):
+        """
+        Drops job_class' entries whenever a model_type row is inserted, updated or deleted through the ORM.
+        """
+        with self.__lock:
+            if (model_type, job_class) in self.__watched_models:
+                return
+            self.__watched_models.add((model_type, job_class))
+
+        def invalidate(mapper, connection, target):
+            self.invalidate(job_class=job_class)
+
+        for event_name in ["after_insert", "after_update", "after_delete"]:
+            event.listen(model_type, event_name, invalidate)
+
+
+selectable_cache = SelectableCache()
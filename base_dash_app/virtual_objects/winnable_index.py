@@ -0,0 +1,183 @@
+import threading
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from base_dash_app.virtual_objects.interfaces.winnable import Winnable, CompetitorDimension, CompetingTeamDimension, \
+    WinnableDimension, BaseWinnablesDimension
+
+# a dimension value as the index sees it, Dimensions themselves aren't reliably hashable
+ValueKey = Tuple[type, Tuple]
+
+
+def get_value_key(value: BaseWinnablesDimension) -> ValueKey:
+    return type(value), tuple(value.get_repr())
+
+
+def intersect(sets: List[Set[int]]) -> Set[int]:
+    if len(sets) == 0:
+        return set()
+
+    # smallest first, so every step works on at most the smallest set
+    sets = sorted(sets, key=len)
+    result = set(sets[0])
+    for s in sets[1:]:
+        if len(result) == 0:
+            break
+        result &= s
+
+    return result
+
+
+class WinnableIndex:
+    """
+    Inverted index from dimension values to the games they appear in, built incrementally as games are added.
+    Competitors, teams and games get ids in the order they are added, each with a posting set per value, so
+    filters are answered with set intersections instead of scanning every game's teams and competitors.
+
+    The get_*_ids methods have the same semantics as Winnable's has_* methods, over every indexed game at once.
+    """
+    def __init__(self, winnables: Iterable[Winnable] = None, id_func: Callable[[Winnable], Hashable] = id):
+        """
+        :param id_func: identifies a game, so adding it again doesn't index it twice. Object identity by default.
+            Winnables rebuilt from the same rows, e.g. on every query, should pass their row id instead. Date and
+            teams aren't enough, rematches have the same ones.
+        """
+        self.id_func: Callable[[Winnable], Hashable] = id_func
+        self.winnables: List[Winnable] = []
+        self.game_ids_by_key: Dict[Hashable, int] = {}
+        self.team_game_ids: List[int] = []
+        self.competitor_team_ids: List[int] = []
+
+        self.competitor_postings: Dict[ValueKey, Set[int]] = {}
+        self.team_postings: Dict[ValueKey, Set[int]] = {}
+        self.game_postings: Dict[ValueKey, Set[int]] = {}
+        self.__lock = threading.RLock()
+
+        if winnables is not None:
+            self.add_all(winnables)
+
+    def add(self, winnable: Winnable) -> int:
+        """
+        :return: the game's id in this index. A game that was already added keeps its id.
+        """
+        with self.__lock:
+            game_key = self.id_func(winnable)
+            if game_key in self.game_ids_by_key:
+                return self.game_ids_by_key[game_key]
+
+            game_id = len(self.winnables)
+            self.winnables.append(winnable)
+            self.game_ids_by_key[game_key] = game_id
+
+            for value in winnable.extra_data or []:
+                self.game_postings.setdefault(get_value_key(value), set()).add(game_id)
+
+            for team in winnable.get_all_teams():
+                team_id = len(self.team_game_ids)
+                self.team_game_ids.append(game_id)
+                for value in team.extra_data or []:
+                    self.team_postings.setdefault(get_value_key(value), set()).add(team_id)
+
+                for competitor in team.get_competitors():
+                    competitor_id = len(self.competitor_team_ids)
+                    self.competitor_team_ids.append(team_id)
+                    for value in competitor.data:
+                        self.competitor_postings.setdefault(get_value_key(value), set()).add(competitor_id)
+
+            return game_id
+
+    def add_all(self, winnables: Iterable[Winnable]) -> List[int]:
+        with self.__lock:
+            return [self.add(winnable) for winnable in winnables]
+
+    def __postings(self, postings: Dict[ValueKey, Set[int]], values: List[BaseWinnablesDimension]) -> List[Set[int]]:
+        return [postings.get(get_value_key(value), set()) for value in values]
+
+    def get_competitor_ids_with_all_values(self, values: List[CompetitorDimension]) -> Set[int]:
+        return intersect(self.__postings(self.competitor_postings, values))
+
+    def get_team_ids_with_competitor_with_all_values(self, values: List[CompetitorDimension]) -> Set[int]:
+        return {self.competitor_team_ids[c] for c in self.get_competitor_ids_with_all_values(values)}
+
+    def get_game_ids_with_team_with_all_competitor_values(self, values: List[CompetitorDimension]) -> Set[int]:
+        return {self.team_game_ids[t] for t in self.get_team_ids_with_competitor_with_all_values(values)}
+
+    def get_game_ids_with_team_with_any_competitor_value(self, values: List[CompetitorDimension]) -> Set[int]:
+        competitor_ids = set().union(*self.__postings(self.competitor_postings, values))
+        return {self.team_game_ids[self.competitor_team_ids[c]] for c in competitor_ids}
+
+    def get_team_ids_with_multiple_competitors_with_all_specific_values(
+            self, values_for_each_competitor: List[List[CompetitorDimension]],
+            team_values: List[CompetingTeamDimension] = None
+    ) -> Set[int]:
+        """
+        :return: teams that, for each list of values, have a competitor with all of them, and that have all of
+            team_values
+        """
+        team_sets = [self.get_team_ids_with_competitor_with_all_values(values) for values in values_for_each_competitor]
+        team_sets += self.__postings(self.team_postings, team_values or [])
+        return intersect(team_sets)
+
+    def get_game_ids_with_team_with_multiple_competitors_with_all_specific_values(
+            self, values_for_each_competitor: List[List[CompetitorDimension]],
+            team_values: List[CompetingTeamDimension] = None
+    ) -> Set[int]:
+        return {
+            self.team_game_ids[t]
+            for t in self.get_team_ids_with_multiple_competitors_with_all_specific_values(
+                values_for_each_competitor, team_values
+            )
+        }
+
+    def get_game_ids_with_all_values(self, values: List[WinnableDimension]) -> Set[int]:
+        return intersect(self.__postings(self.game_postings, values))
+
+    def filter(
+            self, *,
+            competitor_values: List[CompetitorDimension] = None,
+            any_competitor_values: List[CompetitorDimension] = None,
+            team_competitor_values: List[List[CompetitorDimension]] = None,
+            team_values: List[CompetingTeamDimension] = None,
+            winnable_values: List[WinnableDimension] = None,
+    ) -> List[Winnable]:
+        """
+        Games matching every filter given, in the order they were added. No filters returns every game.
+        :param competitor_values: a competitor has all of these
+        :param any_competitor_values: some competitor has any of these
+        :param team_competitor_values: a team has, for each list, a competitor with all of its values
+        :param team_values: a team has all of these. With team_competitor_values, it has to be the same team.
+        :param winnable_values: the game has all of these
+        """
+        with self.__lock:
+            game_sets: List[Set[int]] = []
+            if competitor_values:
+                game_sets.append(self.get_game_ids_with_team_with_all_competitor_values(competitor_values))
+            if any_competitor_values:
+                game_sets.append(self.get_game_ids_with_team_with_any_competitor_value(any_competitor_values))
+            if team_competitor_values or team_values:
+                game_sets.append(self.get_game_ids_with_team_with_multiple_competitors_with_all_specific_values(
+                    team_competitor_values or [], team_values
+                ))
+            if winnable_values:
+                game_sets.append(self.get_game_ids_with_all_values(winnable_values))
+
+            if len(game_sets) == 0:
+                return list(self.winnables)
+
+            return [self.winnables[game_id] for game_id in sorted(intersect(game_sets))]
+
+    def get_values(self, dim: type) -> List[Tuple]:
+        """
+        :return: the representations of every indexed value of dim, e.g. to fill a filter dropdown
+        """
+        with self.__lock:
+            keys = set()
+            for postings in [self.competitor_postings, self.team_postings, self.game_postings]:
+                keys.update(value_repr for value_type, value_repr in postings.keys() if value_type is dim)
+
+        return sorted(keys)
+
+    def get_game_id(self, winnable: Winnable) -> Optional[int]:
+        return self.game_ids_by_key.get(self.id_func(winnable))
+
+    def __len__(self):
+        return len(self.winnables)
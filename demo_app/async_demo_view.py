@@ -66,10 +66,12 @@ class AsyncDemoView(BaseView):
                         CeleryTask(
                             name="Celery Task 1 ",
                             work_func=celery_tasks.gen_graph_data,
+                            store_result_by_reference=True,
                         ),
                         CeleryTask(
                             name="Celery Task 2",
-                            work_func=celery_tasks.gen_graph_data
+                            work_func=celery_tasks.gen_graph_data,
+                            store_result_by_reference=True
                         ),
                         CeleryOrderedTaskGroup(
                             name="Ordered Task Group 2",
@@ -1,5 +1,4 @@
 import datetime
-import json
 import logging
 import random
 import time
@@ -9,6 +8,7 @@ from typing import List
 from celery import shared_task, Task, states
 from redis import StrictRedis
 
+from base_dash_app.application.worker_resources import WorkerResources
 from base_dash_app.enums.status_colors import StatusesEnum
 from base_dash_app.services.async_handler_service import AsyncWorkProgressContainer
 from base_dash_app.virtual_objects.async_vos import celery_helpers
@@ -42,9 +42,8 @@ def gen_graph_data(*args, prog_container_uuid: str, prev_result_uuids: List[str]
     prog_container.set_progress(75)
     # hydrate prev_result from uuid
     prev_result = []
-    for uuid in prev_result_uuids:
-        logger.info(f"Hydrating prev result from {uuid}")
-        parsed_array = json.loads(redis_client.hget(uuid, "result") or "[]")
+    for parsed_array in celery_helpers.iter_prev_results(redis_client, prev_result_uuids):
+        parsed_array = parsed_array or []
         logger.info(f"size of parsed array: {len(parsed_array)}")
         prev_result.extend(parsed_array)
 
@@ -71,8 +70,7 @@ def gen_graph_data(*args, prog_container_uuid: str, prev_result_uuids: List[str]
 
 @shared_task(bind=True)
 def throw_exception_func(task: Task, *args, prog_container_uuid: str, **kwargs):
-    from base_dash_app.application.runtime_application import RuntimeApplication
-    redis_client: StrictRedis = RuntimeApplication.get_instance().redis_client
+    redis_client: StrictRedis = task.resources.redis_client
     prog_container = CeleryTask().use_redis(redis_client, prog_container_uuid).hydrate_from_redis()
     prog_container.set_status(StatusesEnum.IN_PROGRESS)
 
@@ -105,8 +103,7 @@ def throw_exception_func(task: Task, *args, prog_container_uuid: str, **kwargs):
 
 @shared_task
 def long_sleep_task(*args, prog_container_uuid: str, **kwargs):
-    from base_dash_app.application.runtime_application import RuntimeApplication
-    redis_client: StrictRedis = RuntimeApplication.get_instance().redis_client
+    redis_client: StrictRedis = WorkerResources.get_instance().redis_client
     prog_container = CeleryTask().use_redis(redis_client, prog_container_uuid).hydrate_from_redis()
     interrupted = prog_container.check_for_interrupt()
     if interrupted:
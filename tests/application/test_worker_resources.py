@@ -0,0 +1,70 @@
+from typing import Optional
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from base_dash_app.application.db_declaration import db
+from base_dash_app.application.worker_resources import WorkerResources
+from base_dash_app.models.job_definition import JobDefinition
+
+
+class CachedDefinitionJob(JobDefinition):
+    __mapper_args__ = {
+        "polymorphic_identity": "CachedDefinitionJob"
+    }
+
+    @classmethod
+    def single_selectable_param_name(cls) -> Optional[str]:
+        return None
+
+    @classmethod
+    def get_selectables_by_param_name(cls, param_name, session):
+        return []
+
+    @classmethod
+    def construct_instance(cls, **kwargs):
+        return None
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    db.metadata.create_all(engine)
+    return engine
+
+
+@pytest.fixture
+def statements(engine):
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+    return statements
+
+
+def test_cached_definitions_are_merged_into_each_session(engine, statements, redis_client):
+    with Session(engine) as session:
+        session.add(CachedDefinitionJob(name="job", description="before"))
+        session.commit()
+        job_def_id = session.query(JobDefinition.id).scalar()
+
+    resources = WorkerResources(redis_client=redis_client, server=None)
+    with Session(engine) as session:
+        job_def = resources.get_job_definition(job_def_id, session)
+        assert job_def in session
+
+    statements.clear()
+    with Session(engine, expire_on_commit=False) as session:
+        job_def = resources.get_job_definition(job_def_id, session)
+        assert isinstance(job_def, CachedDefinitionJob)
+        assert statements == []
+
+        # changes the job makes to its definition are persisted and invalidate the cache
+        job_def.description = "after"
+        session.commit()
+
+    statements.clear()
+    with Session(engine) as session:
+        job_def = resources.get_job_definition(job_def_id, session)
+        assert job_def.description == "after"
+        assert len(statements) > 0
@@ -0,0 +1,80 @@
+"""
+Measures the per-task overhead celery tasks pay in this framework, using a no-op task.
+
+Compares ContextTask, which reuses the per-process WorkerResources and the current app context, with
+the previous behaviour of printing and pushing a new app context on every call.
+
+    python -m tests.benchmarks.celery_task_overhead [num_calls]
+"""
+import contextlib
+import io
+import os
+import sys
+import time
+from typing import Dict
+
+import fakeredis
+from celery import Celery, Task
+from flask import Flask
+
+os.environ.setdefault("REDIS_HOST", "localhost")
+
+from base_dash_app.application.celery_decleration import ContextTask  # noqa: E402
+from base_dash_app.application.worker_resources import WorkerResources  # noqa: E402
+
+DEFAULT_NUM_CALLS = 10000
+
+
+class PerCallContextTask(Task):
+    """
+    What every task used to do: print, then push a fresh app context.
+    """
+    def __call__(self, *args, **kwargs):
+        print(f"-- IN CONTEXT TASK: Running task {self.name}.")
+        with WorkerResources.get_instance().server.app_context():
+            return self.run(*args, **kwargs)
+
+
+def noop(*args, **kwargs):
+    return WorkerResources.get_instance().redis_client is not None
+
+
+def time_calls(task, num_calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(num_calls):
+        task()
+    return time.perf_counter() - start
+
+
+def run_benchmark(num_calls: int = DEFAULT_NUM_CALLS) -> Dict[str, float]:
+    """
+    :return: microseconds of overhead per call for each task class, on top of calling the function directly
+    """
+    server = Flask(__name__)
+    WorkerResources.set_instance(
+        WorkerResources(redis_client=fakeredis.FakeStrictRedis(decode_responses=True), server=server)
+    )
+
+    timings = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for _ in range(num_calls):
+            noop()
+        baseline = time.perf_counter() - start
+
+        for task_cls in [PerCallContextTask, ContextTask]:
+            app = Celery(f"benchmark-{task_cls.__name__}", task_cls=task_cls, broker="memory://")
+            task = app.task(noop, name=f"noop-{task_cls.__name__}")
+            timings[task_cls.__name__] = time_calls(task, num_calls)
+
+        # a worker process that keeps its own app context pushed
+        with server.app_context():
+            timings["ContextTask (app context already pushed)"] = time_calls(task, num_calls)
+
+    return {name: (seconds - baseline) / num_calls * 10 ** 6 for name, seconds in timings.items()}
+
+
+if __name__ == "__main__":
+    num_calls_arg = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_NUM_CALLS
+    for task_name, overhead in run_benchmark(num_calls_arg).items():
+        print(f"{task_name:>45}: {overhead:,.2f} us/task")
@@ -0,0 +1,77 @@
+"""
+Measures the throughput of the celery_helpers fan-in helpers for a large number of tasks.
+
+Runs against the redis server at REDIS_BENCHMARK_URL (e.g. redis://localhost:6379/15) when it is set,
+and against fakeredis otherwise. fakeredis has no network round trips, so use a real server to see
+the effect of pipelining.
+
+    python -m tests.benchmarks.redis_fan_in [num_tasks]
+"""
+import os
+import sys
+import time
+import uuid
+from typing import Dict
+
+import fakeredis
+import redis
+from redis import StrictRedis
+
+from base_dash_app.utils import redis_utils
+
+DEFAULT_NUM_TASKS = 10000
+
+
+def get_benchmark_redis_client() -> StrictRedis:
+    redis_url = os.getenv("REDIS_BENCHMARK_URL")
+    if redis_url:
+        return redis.StrictRedis.from_url(redis_url, decode_responses=True)
+
+    return fakeredis.FakeStrictRedis(decode_responses=True)
+
+
+def populate_task_results(redis_client: StrictRedis, num_tasks: int):
+    prefix = uuid.uuid4().hex
+    result_keys = [f"{prefix}_result_{i}" for i in range(num_tasks)]
+    list_keys = [f"{prefix}_list_{i}" for i in range(num_tasks)]
+
+    pipeline = redis_client.pipeline(transaction=False)
+    for i, (result_key, list_key) in enumerate(zip(result_keys, list_keys)):
+        pipeline.set(result_key, str(i))
+        pipeline.rpush(list_key, str(i), str(i + 1))
+    pipeline.execute()
+
+    return prefix, result_keys, list_keys
+
+
+def run_fan_in(redis_client: StrictRedis, num_tasks: int = DEFAULT_NUM_TASKS) -> Dict[str, float]:
+    """
+    Runs each fan-in helper once over num_tasks task results.
+    :return: tasks per second for each helper
+    """
+    prefix, result_keys, list_keys = populate_task_results(redis_client, num_tasks)
+    timings = {}
+
+    start = time.perf_counter()
+    redis_utils.flatten_redist_list(f"{prefix}_flattened", result_keys, redis_client)
+    timings["flatten_redist_list"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    redis_utils.rpush_batched(redis_client, f"{prefix}_uuids", result_keys)
+    timings["store_uuids"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    redis_utils.lrange_all(redis_client, list_keys)
+    timings["serialize_flattened_result_lists"] = time.perf_counter() - start
+
+    redis_client.delete(f"{prefix}_flattened", f"{prefix}_uuids")
+    for batch in redis_utils.batched(result_keys + list_keys):
+        redis_client.delete(*batch)
+
+    return {name: num_tasks / max(seconds, 1e-9) for name, seconds in timings.items()}
+
+
+if __name__ == "__main__":
+    num_tasks_arg = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_NUM_TASKS
+    for helper_name, tasks_per_second in run_fan_in(get_benchmark_redis_client(), num_tasks_arg).items():
+        print(f"{helper_name:>35}: {tasks_per_second:,.0f} tasks/s")
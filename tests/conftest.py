@@ -0,0 +1,7 @@
+import fakeredis
+import pytest
+
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.FakeStrictRedis(decode_responses=True)
@@ -0,0 +1,125 @@
+import numpy
+import pytest
+
+from base_dash_app.enums.executor_types import ExecutorTypesEnum
+from base_dash_app.enums.status_colors import StatusesEnum
+from base_dash_app.services.async_handler_service import AsyncHandlerService, AsyncTask, AsyncUnorderedTaskGroup
+from base_dash_app.virtual_objects.async_vos import process_work
+
+
+def sum_input(container, task_input, kwargs):
+    container.progress = 50
+    container.complete(result=int(numpy.asarray(task_input).sum()) * kwargs["factor"])
+
+
+def fail(container, task_input, kwargs):
+    raise ValueError("boom")
+
+
+@pytest.fixture(scope="module")
+def async_service():
+    return AsyncHandlerService()
+
+
+@pytest.mark.parametrize("value", [
+    b"x" * 2048,
+    numpy.arange(1000, dtype=numpy.int64).reshape(10, 100),
+    {"items": list(range(1000))},
+])
+def test_share_input_round_trip(value):
+    shared_input = process_work.share_input(value, min_bytes=1024)
+    assert isinstance(shared_input, process_work.SharedInput)
+    try:
+        attached = shared_input.attach()
+        if isinstance(value, numpy.ndarray):
+            assert numpy.array_equal(attached, value)
+            assert not attached.flags.writeable
+        else:
+            assert (bytes(attached) if isinstance(value, bytes) else attached) == value
+
+        attached = None
+        shared_input.detach()
+    finally:
+        shared_input.unlink()
+
+
+def test_small_inputs_are_not_shared():
+    assert process_work.share_input([1, 2, 3]) == [1, 2, 3]
+
+
+def test_process_task_reports_back_to_its_container(async_service):
+    task = AsyncTask(
+        work_func=sum_input, func_kwargs={"factor": 2}, task_name="sum", executor_type=ExecutorTypesEnum.PROCESS
+    )
+    async_service.submit_async_task(task, task_input=[1, 2, 3])
+    task.future.result(60)
+
+    assert task.get_status() == StatusesEnum.SUCCESS
+    assert task.get_result() == 12
+    assert task.get_start_time() is not None
+
+
+def test_process_task_failure(async_service):
+    task = AsyncTask(work_func=fail, task_name="fail", executor_type=ExecutorTypesEnum.PROCESS)
+    async_service.submit_async_task(task)
+    with pytest.raises(ValueError):
+        task.future.result(60)
+
+    assert task.get_status() == StatusesEnum.FAILURE
+    assert "boom" in task.stacktrace
+
+
+def test_unordered_group_in_processes_with_shared_input(async_service):
+    group = AsyncUnorderedTaskGroup(
+        async_service=async_service,
+        async_tasks=[
+            AsyncTask(work_func=sum_input, func_kwargs={"factor": factor}, task_name=f"x{factor}")
+            for factor in [1, 2, 3]
+        ],
+        reducer_func=sum,
+        executor_type=ExecutorTypesEnum.PROCESS,
+    )
+    group.start(task_input=numpy.ones(process_work.DEFAULT_SHARED_INPUT_MIN_BYTES // 8, dtype=numpy.int64))
+
+    assert group.get_status() == StatusesEnum.SUCCESS
+    assert group.get_result() == (process_work.DEFAULT_SHARED_INPUT_MIN_BYTES // 8) * 6
+
+
+def square(x):
+    return x * x
+
+
+def add(accumulated, result):
+    return accumulated + result
+
+
+def fail_on_13(x):
+    if x == 13:
+        raise ValueError("13")
+    return x
+
+
+@pytest.mark.parametrize("executor_type", [ExecutorTypesEnum.THREAD, ExecutorTypesEnum.PROCESS])
+def test_map_reduce_reduces_chunks(async_service, executor_type):
+    group = AsyncUnorderedTaskGroup(async_service=async_service, task_group_title="squares")
+    result = group.map_reduce(square, range(1000), chunk_size=64, reducer=add, executor_type=executor_type)
+
+    assert result == sum(x * x for x in range(1000))
+    assert group.get_result() == result
+    assert group.get_status() == StatusesEnum.SUCCESS
+    assert len(group.work_containers) == 1
+    assert group.get_progress() == 100
+
+
+def test_map_reduce_without_reducer_keeps_order(async_service):
+    group = AsyncUnorderedTaskGroup(async_service=async_service)
+    assert group.map_reduce(square, list(range(101)), chunk_size=10) == [x * x for x in range(101)]
+    assert group.map_reduce(square, []) == []
+
+
+def test_map_reduce_failure(async_service):
+    group = AsyncUnorderedTaskGroup(async_service=async_service)
+    with pytest.raises(ValueError):
+        group.map_reduce(fail_on_13, range(100), chunk_size=5, reducer=add)
+
+    assert group.get_status() == StatusesEnum.FAILURE
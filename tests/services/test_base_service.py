@@ -0,0 +1,153 @@
+import pytest
+from flask import Flask
+from sqlalchemy import Column, Integer, String
+
+from base_dash_app.models.base_model import BaseModel
+from base_dash_app.services.base_service import BaseService
+from base_dash_app.utils.db_utils import DbManager, DbDescriptor
+
+
+class Widget(BaseModel):
+    __tablename__ = "test_widgets"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String)
+    color = Column(String)
+
+    def __lt__(self, other):
+        return self.id < other.id
+
+    def __eq__(self, other):
+        return isinstance(other, Widget) and self.id == other.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __repr__(self):
+        return f"Widget({self.id})"
+
+    def __str__(self):
+        return self.__repr__()
+
+
+class WidgetService(BaseService):
+    def __init__(self, **kwargs):
+        super().__init__(object_type=Widget, **kwargs)
+
+
+@pytest.fixture(scope="module")
+def widget_service(tmp_path_factory):
+    app = Flask(__name__)
+    dbm = DbManager(DbDescriptor(db_uri=str(tmp_path_factory.mktemp("db") / "test.db")), app)
+    with app.app_context():
+        Widget.__table__.create(dbm.db.engine)
+        service = WidgetService(dbm=dbm)
+        service.save_all([
+            Widget(id=i, name=f"widget {i:03d}", color="red" if i % 3 == 0 else "blue")
+            for i in range(1, 101)
+        ])
+        yield service
+
+
+def test_iter_all_walks_every_row_in_key_order(widget_service):
+    ids = [widget.id for widget in widget_service.iter_all(batch_size=7)]
+    assert ids == list(range(1, 101))
+
+
+def test_iter_all_with_order_by_and_criteria(widget_service):
+    widgets = list(widget_service.iter_all(batch_size=5, order_by=Widget.color, color="red"))
+    assert [w.id for w in widgets] == list(range(3, 101, 3))
+
+
+def test_iter_all_exact_multiple_of_batch_size(widget_service):
+    assert len(list(widget_service.iter_all(batch_size=10))) == 100
+
+
+def test_get_many(widget_service):
+    widgets = widget_service.get_many([5, 50, 500, 2], batch_size=2)
+    assert sorted(w.id for w in widgets) == [2, 5, 50]
+
+
+def test_count_and_find(widget_service):
+    assert widget_service.count() == 100
+    assert widget_service.count(color="red") == 33
+    assert [w.id for w in widget_service.find(name="widget 042")] == [42]
+    assert len(widget_service.find(color="blue", limit=4)) == 4
+
+
+class Gadget(BaseModel):
+    __tablename__ = "test_gadgets"
+
+    id = Column(Integer, primary_key=True)
+    sku = Column(String, unique=True)
+    stock = Column(Integer, default=0)
+
+    def __lt__(self, other):
+        return self.id < other.id
+
+    def __eq__(self, other):
+        return isinstance(other, Gadget) and self.id == other.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __repr__(self):
+        return f"Gadget({self.sku})"
+
+    def __str__(self):
+        return self.__repr__()
+
+
+class GadgetService(BaseService):
+    def __init__(self, **kwargs):
+        super().__init__(object_type=Gadget, **kwargs)
+
+
+@pytest.fixture
+def gadget_service(tmp_path_factory):
+    app = Flask(__name__)
+    dbm = DbManager(DbDescriptor(db_uri=str(tmp_path_factory.mktemp("db") / "test.db")), app)
+    with app.app_context():
+        Gadget.__table__.create(dbm.db.engine)
+        service = GadgetService(dbm=dbm)
+        # services are singletons, point this one at the new database
+        service.dbm = dbm
+        yield service
+
+
+def test_bulk_insert_counts_and_defaults(gadget_service):
+    num_inserted = gadget_service.bulk_insert(
+        [{"sku": f"sku-{i}", "stock": i} for i in range(2500)] + [Gadget(sku="no-stock")],
+        batch_size=1000,
+    )
+
+    assert num_inserted == 2501
+    assert gadget_service.count() == 2501
+    assert gadget_service.find(sku="no-stock")[0].stock == 0
+
+
+def test_bulk_insert_returning_objects(gadget_service):
+    gadgets = gadget_service.bulk_insert(
+        [{"id": 10, "sku": "a"}, {"id": 11, "sku": "b"}], return_objects=True
+    )
+    assert sorted(g.sku for g in gadgets) == ["a", "b"]
+
+    with pytest.raises(ValueError):
+        gadget_service.bulk_insert([{"sku": "c"}], return_objects=True)
+    assert gadget_service.find(sku="c") == []
+
+
+def test_bulk_upsert(gadget_service):
+    gadget_service.bulk_insert([{"sku": "a", "stock": 1}, {"sku": "b", "stock": 2}])
+
+    num_affected = gadget_service.bulk_upsert(
+        [{"sku": "a", "stock": 10}, {"sku": "c", "stock": 3}],
+        conflict_columns=["sku"],
+    )
+
+    assert num_affected == 2
+    stock = {g.sku: g.stock for g in gadget_service.iter_all()}
+    assert stock == {"a": 10, "b": 2, "c": 3}
+
+    gadget_service.bulk_upsert([{"sku": "a"}], conflict_columns=["sku"])
+    assert gadget_service.find(sku="a")[0].stock == 10
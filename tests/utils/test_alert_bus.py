@@ -0,0 +1,58 @@
+import time
+
+from base_dash_app.components.alerts import Alert
+from base_dash_app.utils.alert_bus import AlertBus, get_backoff_interval
+
+
+def test_alerts_from_other_processes_are_seen(redis_client):
+    worker_bus, web_bus = AlertBus(redis_client), AlertBus(redis_client)
+
+    assert web_bus.has_changed("session")
+    assert web_bus.read("session") == []
+    assert not web_bus.has_changed("session")
+
+    alert = Alert("Job finished", color="success")
+    alert_id = worker_bus.publish(alert)
+    assert alert.id == alert_id
+
+    assert web_bus.has_changed("session")
+    alerts = web_bus.read("session")
+    assert [(a.id, a.body, a.color) for a in alerts] == [(alert_id, "Job finished", "success")]
+    assert not web_bus.has_changed("session")
+
+
+def test_dismissals_are_per_session(redis_client):
+    bus = AlertBus(redis_client)
+    first = bus.publish(Alert("first"))
+    bus.publish(Alert("second"))
+    bus.read("a")
+    bus.read("b")
+
+    bus.dismiss("a", [first])
+
+    assert bus.has_changed("a")
+    assert [alert.body for alert in bus.read("a")] == ["second"]
+    assert not bus.has_changed("b")
+    assert [alert.body for alert in bus.read("b")] == ["first", "second"]
+
+
+def test_expired_alerts_are_hidden_and_trigger_a_change(redis_client):
+    bus = AlertBus(redis_client)
+    bus.publish(Alert("short", duration=0.2))
+    bus.publish(Alert("long"))
+
+    assert [alert.body for alert in bus.read("session")] == ["short", "long"]
+
+    assert not bus.has_changed("session")
+
+    time.sleep(0.25)
+    assert bus.has_changed("session")
+    assert [alert.body for alert in bus.read("session")] == ["long"]
+    assert not bus.has_changed("session")
+
+
+def test_backoff_interval():
+    assert get_backoff_interval(1000, 1000, 8000, changed=False) == (2000, True)
+    assert get_backoff_interval(8000, 1000, 8000, changed=False) == (8000, False)
+    assert get_backoff_interval(8000, 1000, 8000, changed=True) == (1000, True)
+    assert get_backoff_interval(None, 1000, 8000, changed=False) == (1000, True)
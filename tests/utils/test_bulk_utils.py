@@ -0,0 +1,35 @@
+import datetime
+import enum
+
+from base_dash_app.utils import bulk_utils
+
+
+def test_batch_size_respects_parameter_limits():
+    assert bulk_utils.get_max_batch_size("sqlite", 10, 1000) == 99
+    assert bulk_utils.get_max_batch_size("postgresql", 10, 1000) == 1000
+    assert bulk_utils.get_max_batch_size("sqlite", 2000, 1000) == 1
+
+
+def test_csv_distinguishes_null_and_empty_strings():
+    rows = [
+        {"a": None, "b": "", "c": 'say "hi"'},
+        {"a": 1, "b": datetime.datetime(2024, 1, 2, 3, 4), "c": {"k": 1}},
+    ]
+
+    assert bulk_utils.to_csv(rows, ["a", "b", "c"]) == (
+        ',"","say ""hi"""\n'
+        '"1","2024-01-02T03:04:00","{""k"": 1}"\n'
+    )
+
+
+class Color(enum.Enum):
+    RED = "red"
+
+
+def test_csv_encodes_bytes_as_bytea_hex():
+    assert bulk_utils.to_csv_field(b"\x00\xffab") == '"\\x00ff6162"'
+    assert bulk_utils.to_csv_field(bytearray(b"\x01")) == '"\\x01"'
+
+
+def test_csv_encodes_enums_by_name():
+    assert bulk_utils.to_csv_field(Color.RED) == '"RED"'
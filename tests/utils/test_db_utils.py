@@ -0,0 +1,225 @@
+import sqlite3
+
+import pytest
+from sqlalchemy import exc
+from sqlalchemy.pool import NullPool
+
+from base_dash_app.enums.process_types import ProcessTypesEnum
+from base_dash_app.utils.db_utils import DbDescriptor, DbEngineTypes, DbManager, InstrumentedQueuePool, \
+    exempt_from_request_hooks
+from base_dash_app.utils.process_utils import ProcessInfo
+
+
+def postgres_descriptor(**kwargs) -> DbDescriptor:
+    return DbDescriptor(db_uri="db:5432/test", engine_type=DbEngineTypes.POSTGRES, **kwargs)
+
+
+def test_engine_options_use_process_defaults():
+    options = DbManager.build_engine_options(
+        postgres_descriptor(), process_info=ProcessInfo(ProcessTypesEnum.CELERY_THREADS, num_threads=8)
+    )
+
+    assert options["poolclass"] is InstrumentedQueuePool
+    assert options["pool_size"] == 8
+    assert options["max_overflow"] == 4
+    assert options["pool_pre_ping"] is True
+
+    prefork_options = DbManager.build_engine_options(
+        postgres_descriptor(), process_info=ProcessInfo(ProcessTypesEnum.CELERY_PREFORK)
+    )
+    assert prefork_options["pool_size"] == 1
+
+
+def test_engine_options_explicit_values_win():
+    options = DbManager.build_engine_options(
+        postgres_descriptor(pool_size=20, max_overflow=0, pool_recycle=60, pool_timeout=5),
+        process_info=ProcessInfo(ProcessTypesEnum.GUNICORN),
+    )
+
+    assert options["pool_size"] == 20
+    assert options["max_overflow"] == 0
+    assert options["pool_recycle"] == 60
+    assert options["pool_timeout"] == 5
+
+
+def test_engine_options_without_pool():
+    options = DbManager.build_engine_options(postgres_descriptor(use_pool=False))
+    assert options["poolclass"] is NullPool
+    assert "pool_size" not in options
+
+
+def test_engine_options_sqlite_has_no_pool_args():
+    options = DbManager.build_engine_options(DbDescriptor(db_uri="test.db"), connect_args={"timeout": 15})
+    assert options == {"connect_args": {"timeout": 15}}
+
+
+def test_instrumented_pool_records_overflow_and_timeouts():
+    pool = InstrumentedQueuePool(
+        lambda: sqlite3.connect(":memory:", check_same_thread=False),
+        pool_size=1, max_overflow=1, timeout=0.05
+    )
+
+    first = pool.connect()
+    second = pool.connect()
+    with pytest.raises(exc.TimeoutError):
+        pool.connect()
+
+    metrics = pool.get_metrics().to_dict()
+    assert metrics["num_checkouts"] == 2
+    assert metrics["num_timeouts"] == 1
+    assert metrics["max_overflow_reached"] == 1
+    assert metrics["max_wait_seconds"] >= 0.05
+
+    first.close()
+    second.close()
+
+
+def test_request_hooks_registered_once(tmp_path):
+    from flask import Flask
+
+    app = Flask(__name__)
+    descriptor = DbDescriptor(db_uri=str(tmp_path / "test.db"))
+    DbManager(descriptor, app)
+    DbManager(descriptor, app)
+
+    assert len(app.before_request_funcs[None]) == 1
+    assert len(app.teardown_request_funcs[None]) == 1
+
+
+def test_exempt_paths_skip_request_hooks(tmp_path):
+    from flask import Flask
+
+    app = Flask(__name__)
+    dbm = DbManager(DbDescriptor(db_uri=str(tmp_path / "test.db")), app)
+    exempt_from_request_hooks(app, "/healthz")
+
+    entered = []
+    original_enter = dbm.__enter__
+    dbm.__enter__ = lambda: entered.append(True) or original_enter()
+
+    @app.route("/healthz")
+    def health():
+        return "OK"
+
+    @app.route("/page")
+    def page():
+        return "page"
+
+    client = app.test_client()
+    assert client.get("/healthz").status_code == 200
+    assert entered == []
+
+    assert client.get("/page").status_code == 200
+    assert entered == [True]
+
+
+def replica_manager(tmp_path, **kwargs) -> DbManager:
+    from flask import Flask
+
+    descriptor = DbDescriptor(
+        db_uri=str(tmp_path / "primary.db"),
+        replica_uris=[str(tmp_path / "replica_0.db"), str(tmp_path / "replica_1.db")],
+        **kwargs
+    )
+    return DbManager(descriptor, Flask(__name__))
+
+
+def test_read_sessions_round_robin_over_replicas(tmp_path):
+    dbm = replica_manager(tmp_path)
+
+    first = dbm.get_read_session()
+    assert first is dbm.get_read_session()
+    assert str(first.get_bind().url).endswith("replica_0.db")
+
+    dbm.remove_read_session()
+    assert str(dbm.get_read_session().get_bind().url).endswith("replica_1.db")
+
+    dbm.remove_read_session()
+    assert str(dbm.get_read_session().get_bind().url).endswith("replica_0.db")
+    dbm.remove_read_session()
+
+
+def test_read_session_is_closed_when_the_context_exits(tmp_path):
+    dbm = replica_manager(tmp_path)
+
+    with dbm:
+        first = dbm.get_read_session()
+        assert first is dbm.get_read_session()
+
+    with dbm:
+        assert dbm.get_read_session() is not first
+    dbm.remove_read_session()
+
+
+def test_read_session_scope_closes_sessions_nothing_else_owns(tmp_path):
+    dbm = replica_manager(tmp_path)
+
+    with dbm.read_session_scope() as session:
+        assert session is dbm.get_read_session()
+    with dbm.read_session_scope() as other:
+        assert other is not session
+
+    with dbm.app.app_context():
+        with dbm.read_session_scope() as session:
+            pass
+        # the app context closes it when it ends
+        assert dbm.get_read_session() is session
+        dbm.remove_read_session()
+
+
+def test_lag_is_not_measured_under_the_replica_lock(tmp_path):
+    import threading
+
+    dbm = replica_manager(tmp_path, max_replica_lag_seconds=5)
+    measuring = threading.Event()
+    finish_measuring = threading.Event()
+
+    def slow_lag():
+        measuring.set()
+        finish_measuring.wait(5)
+        return 1
+
+    dbm.replicas[0].measure_lag = slow_lag
+    slow_pick = threading.Thread(target=dbm.select_replica)
+    slow_pick.start()
+    assert measuring.wait(5)
+
+    # the second pick starts at the other replica and doesn't wait for the first measurement
+    assert dbm.select_replica() is dbm.replicas[1]
+    finish_measuring.set()
+    slow_pick.join()
+
+
+def test_lagging_replicas_are_skipped(tmp_path):
+    dbm = replica_manager(tmp_path, max_replica_lag_seconds=5)
+    dbm.replicas[0].measure_lag = lambda: 60
+    dbm.replicas[1].measure_lag = lambda: 1
+
+    assert dbm.select_replica() is dbm.replicas[1]
+    assert dbm.select_replica() is dbm.replicas[1]
+
+    dbm.replicas[1].measure_lag = lambda: float("inf")
+    dbm.replicas[1].lag_checked_at = None
+    assert dbm.select_replica() is None
+
+    with dbm.app.app_context():
+        assert dbm.get_read_session() is dbm.get_session()
+
+
+def test_read_session_is_primary_without_replicas(tmp_path):
+    from flask import Flask
+
+    dbm = DbManager(DbDescriptor(db_uri=str(tmp_path / "primary.db")), Flask(__name__))
+    assert dbm.get_read_session() is dbm.get_session()
+
+
+def test_query_time_is_recorded(tmp_path):
+    from flask import Flask
+
+    from base_dash_app.utils import metrics_utils
+
+    dbm = DbManager(DbDescriptor(db_uri=str(tmp_path / "test.db")), Flask(__name__))
+    before = metrics_utils.DB_QUERY_DURATION.get_count(engine="primary")
+    dbm.ping()
+
+    assert metrics_utils.DB_QUERY_DURATION.get_count(engine="primary") == before + 1
@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+from base_dash_app.utils import fork_utils
+
+
+@pytest.fixture
+def callbacks():
+    registered = fork_utils._after_fork_callbacks
+    fork_utils._after_fork_callbacks = []
+    yield fork_utils._after_fork_callbacks
+    fork_utils._after_fork_callbacks = registered
+
+
+def test_callbacks_run_once_per_process(callbacks, monkeypatch):
+    calls = []
+    fork_utils.register_after_fork(lambda: calls.append(os.getpid()))
+
+    fork_utils.run_after_fork_callbacks()
+    assert calls == []
+
+    monkeypatch.setattr(fork_utils, "_last_run_pid", -1)
+    fork_utils.run_after_fork_callbacks()
+    fork_utils.run_after_fork_callbacks()
+    assert calls == [os.getpid()]
+
+
+def test_failing_callback_does_not_stop_the_others(callbacks, monkeypatch):
+    calls = []
+
+    def failing():
+        raise ValueError("boom")
+
+    fork_utils.register_after_fork(failing)
+    fork_utils.register_after_fork(lambda: calls.append(True))
+
+    monkeypatch.setattr(fork_utils, "_last_run_pid", -1)
+    fork_utils.run_after_fork_callbacks()
+    assert calls == [True]
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+def test_callbacks_run_in_forked_child(callbacks):
+    read_fd, write_fd = os.pipe()
+    fork_utils.register_after_fork(lambda: os.write(write_fd, b"ran"))
+
+    pid = os.fork()
+    if pid == 0:
+        os._exit(0)
+
+    os.waitpid(pid, 0)
+    os.close(write_fd)
+    assert os.read(read_fd, 16) == b"ran"
+    os.close(read_fd)
+
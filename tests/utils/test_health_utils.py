@@ -0,0 +1,53 @@
+import time
+
+from base_dash_app.utils.health_utils import HealthMonitor
+
+
+def failing_probe():
+    raise ConnectionError("unreachable")
+
+
+def test_readiness_reflects_cached_probe_results():
+    monitor = HealthMonitor(interval_seconds=60)
+    monitor.add_probe("ok", lambda: True)
+    monitor.add_probe("down", failing_probe)
+
+    readiness = monitor.get_readiness()
+    assert not readiness["ready"]
+    assert readiness["probes"]["ok"]["error"] == "not checked yet"
+
+    monitor.refresh()
+    readiness = monitor.get_readiness()
+    assert not readiness["ready"]
+    assert readiness["probes"]["ok"]["healthy"]
+    assert "unreachable" in readiness["probes"]["down"]["error"]
+
+    metrics = monitor.get_metrics()
+    assert metrics["down"]["num_failures"] == 1
+    assert metrics["ok"]["num_checks"] == 1
+    assert metrics["ok"]["last_latency_seconds"] is not None
+
+
+def test_stale_results_are_not_ready():
+    monitor = HealthMonitor(interval_seconds=0.01)
+    monitor.add_probe("ok", lambda: True)
+    monitor.refresh()
+    time.sleep(0.05)
+
+    readiness = monitor.get_readiness()
+    assert readiness["probes"]["ok"]["stale"]
+    assert not readiness["ready"]
+
+
+def test_background_refresh():
+    monitor = HealthMonitor(interval_seconds=0.01)
+    monitor.add_probe("ok", lambda: True)
+    monitor.ensure_started()
+    try:
+        deadline = time.monotonic() + 2
+        while monitor.get_metrics().get("ok", {}).get("num_checks", 0) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        assert monitor.get_metrics()["ok"]["num_checks"] >= 2
+    finally:
+        monitor.stop()
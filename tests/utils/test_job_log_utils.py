@@ -0,0 +1,96 @@
+import json
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from base_dash_app.application.db_declaration import db
+# registers job_definitions, which job_instances has a foreign key to
+from base_dash_app.models.job_definition import JobDefinition  # noqa: F401
+from base_dash_app.models.job_instance import JobInstance
+from base_dash_app.models.job_log_chunk import JobLogChunk
+from base_dash_app.utils.job_log_utils import JobLogStream, LogArchiveBuffer
+from base_dash_app.virtual_objects.job_progress_container import VirtualJobProgressContainer
+
+
+def test_stream_is_tailed_from_a_cursor(redis_client):
+    stream = JobLogStream(redis_client, "logs", max_len=1000)
+    for i in range(5):
+        stream.append(f"line {i}")
+
+    lines, cursor = stream.read_after(None, count=3)
+    assert lines == ["line 2", "line 3", "line 4"]
+
+    assert stream.read_after(cursor) == ([], cursor)
+
+    stream.append("line 5")
+    lines, cursor = stream.read_after(cursor)
+    assert lines == ["line 5"]
+    assert redis_client.ttl("logs") > 0
+
+
+def test_stream_is_capped(redis_client):
+    stream = JobLogStream(redis_client, "logs", max_len=10)
+    for i in range(1000):
+        stream.append(f"line {i}")
+
+    # trimming is approximate, but nowhere near every line is kept
+    assert redis_client.xlen("logs") < 1000
+
+
+def test_archive_buffer_compresses_in_chunks():
+    archive = LogArchiveBuffer(chunk_lines=10)
+    lines = [f"line {i}" for i in range(25)]
+    for line in lines:
+        archive.append(line)
+
+    assert len(archive.chunks) == 2
+    assert len(archive) == 25
+    assert archive.get_lines() == lines
+    assert archive.get_tail(12) == lines[-12:]
+
+    assert len(archive.get_chunks()) == 3
+    assert archive.get_lines() == lines
+
+
+def test_container_logs_are_not_pushed_with_the_hash(redis_client):
+    container = VirtualJobProgressContainer(job_instance_id=7)
+    container.use_redis(redis_client, container.uuid)
+    container.push_to_redis()
+
+    container.info_log("hello")
+    container.debug_log("below the info level")
+    container.push_to_redis()
+
+    assert "logs" not in redis_client.hgetall(container.uuid)
+    assert container.logs == ["[INFO]hello"]
+    assert container.get_log_stream().read_after(None)[0] == ["[INFO]hello"]
+
+    container.destroy_in_redis()
+    assert redis_client.exists(container.logs_tail_id) == 0
+
+
+def test_archived_logs_fall_back_to_the_instance_without_the_chunks_table():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    db.metadata.create_all(engine, tables=[t for t in db.metadata.sorted_tables if t.name != "job_log_chunks"])
+    job_instance = JobInstance()
+    job_instance.logs = json.dumps(["[INFO]archived on the instance"])
+
+    with Session(engine) as session:
+        assert not JobLogChunk.table_exists(session)
+        assert JobLogChunk.get_logs_for_instance(session, job_instance) == ["[INFO]archived on the instance"]
+
+    upgraded = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    db.metadata.create_all(upgraded)
+    archive = LogArchiveBuffer(chunk_lines=2)
+    for i in range(3):
+        archive.append(f"[INFO]{i}")
+
+    with Session(upgraded) as session:
+        session.add(job_instance)
+        session.flush()
+        for chunk_index, chunk in enumerate(archive.get_chunks()):
+            session.add(JobLogChunk(job_instance_id=job_instance.id, chunk_index=chunk_index, data=chunk))
+
+        assert JobLogChunk.table_exists(session)
+        assert JobLogChunk.get_logs_for_instance(session, job_instance) == ["[INFO]0", "[INFO]1", "[INFO]2"]
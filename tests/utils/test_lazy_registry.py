@@ -0,0 +1,25 @@
+from base_dash_app.utils.lazy_registry import LazyRegistry
+
+
+def test_factory_only_called_on_first_lookup():
+    calls = []
+    registry = LazyRegistry()
+    registry.register_factory("a", lambda: calls.append("a") or "built")
+
+    assert "a" in registry
+    assert registry.is_pending("a")
+    assert calls == []
+
+    assert registry["a"] == "built"
+    assert registry.get("a") == "built"
+    assert calls == ["a"]
+    assert not registry.is_pending("a")
+
+
+def test_iteration_builds_pending_values():
+    registry = LazyRegistry({"a": 1})
+    registry.register_factory("b", lambda: 2)
+
+    assert len(registry) == 2
+    assert dict(registry.items()) == {"a": 1, "b": 2}
+    assert registry.get("missing") is None
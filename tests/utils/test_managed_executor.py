@@ -0,0 +1,101 @@
+import operator
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import pytest
+
+from base_dash_app.enums.executor_types import ExecutorTypesEnum
+from base_dash_app.enums.rejection_policies import RejectionPoliciesEnum
+from base_dash_app.utils.managed_executor import ManagedExecutor, ExecutorSaturatedError
+
+
+def make_blocked_executor(**kwargs):
+    """
+    Executor whose single worker is busy until the returned event is set.
+    """
+    executor = ManagedExecutor(name="test", max_workers=1, **kwargs)
+    release = threading.Event()
+    started = threading.Event()
+
+    def block():
+        started.set()
+        release.wait(5)
+
+    executor.submit(block)
+    started.wait(5)
+    return executor, release
+
+
+def test_runs_work_and_tracks_stats():
+    executor = ManagedExecutor(name="test", max_workers=2)
+    assert executor.submit(operator.add, 1, 2).result(5) == 3
+
+    with pytest.raises(ValueError):
+        executor.submit(int, "x").result(5)
+
+    stats = executor.get_stats()
+    assert (stats["submitted"], stats["success"], stats["failure"]) == (2, 1, 1)
+    assert stats["in_flight"] == 0
+    assert stats["avg_run_seconds"] is not None
+
+
+def test_dedupes_in_flight_work_by_key():
+    executor, release = make_blocked_executor()
+    first = executor.submit(operator.add, 1, 2, dedupe_key="k")
+    assert executor.submit(operator.add, 5, 5, dedupe_key="k") is first
+    assert executor.get_stats()["deduped"] == 1
+
+    release.set()
+    assert first.result(5) == 3
+    # once done, the key can be submitted again
+    assert executor.submit(operator.add, 5, 5, dedupe_key="k").result(5) == 10
+
+
+@pytest.mark.parametrize("policy", list(RejectionPoliciesEnum))
+def test_rejection_policies(policy):
+    executor, release = make_blocked_executor(max_queue_size=1, rejection_policy=policy)
+    queued = executor.submit(operator.add, 1, 1)
+    assert executor.get_queue_depth() == 1
+
+    if policy == RejectionPoliciesEnum.ABORT:
+        with pytest.raises(ExecutorSaturatedError):
+            executor.submit(operator.add, 2, 2)
+    elif policy == RejectionPoliciesEnum.DISCARD:
+        assert executor.submit(operator.add, 2, 2).cancelled()
+    else:
+        caller_thread = threading.current_thread()
+        assert executor.submit(lambda: threading.current_thread() is caller_thread).result(0) is True
+
+    assert executor.get_stats()["rejected"] == 1
+    release.set()
+    assert queued.result(5) == 2
+
+
+def test_cancelled_work_never_runs():
+    executor, release = make_blocked_executor()
+    ran = []
+    future = executor.submit(ran.append, 1)
+    assert future.cancel()
+
+    release.set()
+    executor.submit(int).result(5)
+    assert ran == []
+    assert executor.get_stats()["cancelled"] == 1
+
+
+def test_times_out():
+    executor, release = make_blocked_executor()
+    future = executor.submit(int, timeout_seconds=0.05)
+    with pytest.raises(FutureTimeoutError):
+        future.result(5)
+
+    release.set()
+    assert executor.get_stats()["timed_out"] == 1
+
+
+def test_process_pool():
+    executor = ManagedExecutor(name="test_processes", max_workers=1, executor_type=ExecutorTypesEnum.PROCESS)
+    try:
+        assert executor.submit(pow, 2, 10).result(60) == 1024
+    finally:
+        executor.shutdown()
@@ -0,0 +1,62 @@
+import datetime
+import os
+import time
+import tracemalloc
+
+from base_dash_app.utils import memory_utils
+from base_dash_app.utils.memory_utils import MemoryHistory, MemorySample
+
+
+def make_sample(pid: int, rss_mb: float) -> MemorySample:
+    return MemorySample(pid=pid, sampled_at=datetime.datetime.now(), rss_mb=rss_mb, uss_mb=None, cpu_percent=0)
+
+
+def test_sample_process_reads_rss():
+    sample = memory_utils.sample_process()
+    assert sample.pid == os.getpid()
+    assert sample.rss_mb > 0
+
+
+def test_history_is_a_ring_buffer_per_pid(redis_client):
+    history = MemoryHistory(redis_client=redis_client, max_samples=3)
+    for i in range(5):
+        history.add(make_sample(1, i))
+    history.add(make_sample(2, 100))
+
+    samples_by_pid = history.get_samples_by_pid()
+    assert [s.rss_mb for s in samples_by_pid[1]] == [2, 3, 4]
+    assert [s.rss_mb for s in samples_by_pid[2]] == [100]
+
+    # visible from another worker's history
+    latest = MemoryHistory(redis_client=redis_client).get_samples_by_pid(latest_only=True)
+    assert {pid: [s.rss_mb for s in samples] for pid, samples in latest.items()} == {1: [4], 2: [100]}
+
+
+def test_expired_pids_are_dropped(redis_client):
+    history = MemoryHistory(redis_client=redis_client)
+    history.add(make_sample(1, 10))
+    redis_client.delete(MemoryHistory.get_pid_key(1))
+
+    assert history.get_samples_by_pid() == {}
+    assert history.get_pids() == []
+
+
+def test_top_allocations():
+    try:
+        memory_utils.get_top_allocations()
+        data = [bytearray(1024) for _ in range(100)]
+        allocations = memory_utils.get_top_allocations(limit=5)
+        assert 0 < len(allocations) <= 5
+        assert all(a["size_mb"] > 0 for a in allocations)
+    finally:
+        memory_utils.stop_tracing_allocations()
+
+
+def test_tracing_stops_on_its_own():
+    try:
+        memory_utils.get_top_allocations(tracing_seconds=0.1)
+        assert tracemalloc.is_tracing()
+        time.sleep(0.5)
+        assert not tracemalloc.is_tracing()
+    finally:
+        memory_utils.stop_tracing_allocations()
@@ -0,0 +1,80 @@
+import pytest
+
+from base_dash_app.utils import fork_utils, metrics_utils, redis_utils
+from base_dash_app.utils.metrics_utils import MetricsRegistry
+
+
+def test_counter_and_histogram_values():
+    registry = MetricsRegistry()
+    runs = registry.counter("runs_total", "Runs.", ["status"])
+    latency = registry.histogram("latency_seconds", "Latency.", ["view"], buckets=[0.1, 1])
+
+    runs.inc(status="SUCCESS")
+    runs.inc(2, status="SUCCESS")
+    latency.observe(0.05, view="Home")
+    latency.observe(0.5, view="Home")
+
+    assert runs.get(status="SUCCESS") == 3
+    assert latency.get_count(view="Home") == 2
+    assert latency.get_sum(view="Home") == pytest.approx(0.55)
+    assert registry.counter("runs_total", "Runs.", ["status"]) is runs
+
+    with pytest.raises(ValueError):
+        runs.inc(job="x")
+
+    text = registry.render()
+    assert 'runs_total{status="SUCCESS"} 3' in text
+    assert 'latency_seconds_bucket{view="Home",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{view="Home",le="1"} 2' in text
+    assert 'latency_seconds_bucket{view="Home",le="+Inf"} 2' in text
+    assert 'latency_seconds_count{view="Home"} 2' in text
+    assert "# TYPE latency_seconds histogram" in text
+
+
+def test_processes_are_aggregated_through_redis(redis_client):
+    # two registries stand in for two gunicorn workers
+    workers = [MetricsRegistry(), MetricsRegistry()]
+    for i, registry in enumerate(workers):
+        registry.set_redis_client(redis_client)
+        registry.counter("requests_total", "Requests.").inc(i + 1)
+        registry.histogram("latency_seconds", "Latency.", buckets=[1]).observe(0.5)
+        registry.flush()
+
+    workers[0].counter("requests_total", "Requests.").inc()
+
+    text = workers[1].render()
+    assert "requests_total 3" in text
+
+    text = workers[0].render()
+    assert "requests_total 4" in text
+    assert 'latency_seconds_bucket{le="1"} 2' in text
+    assert "latency_seconds_count 2" in text
+
+
+def test_forked_children_do_not_flush_the_parents_samples(redis_client):
+    registry = MetricsRegistry()
+    registry.set_redis_client(redis_client)
+    registry.counter("queries_total", "Queries.").inc(5)
+
+    # what fork_utils runs in every child
+    registry.reset_after_fork()
+    registry.flush()
+
+    assert registry.counter("queries_total", "Queries.").get() == 0
+    assert registry.collect()["queries_total"] == {}
+    assert metrics_utils.metrics_registry.reset_after_fork in fork_utils._after_fork_callbacks
+
+
+def test_callback_scope_counts_redis_round_trips(redis_client):
+    client = redis_utils.InstrumentedRedis(connection_pool=redis_client.connection_pool)
+    before = metrics_utils.CALLBACK_REDIS_ROUND_TRIPS.get_sum(callback="TestView")
+
+    with metrics_utils.callback_scope("TestView"):
+        client.set("a", "1")
+        pipeline = client.pipeline()
+        pipeline.get("a")
+        pipeline.get("b")
+        pipeline.execute()
+
+    assert metrics_utils.CALLBACK_REDIS_ROUND_TRIPS.get_sum(callback="TestView") - before == 2
+    assert metrics_utils.CALLBACK_DURATION.get_count(callback="TestView") >= 1
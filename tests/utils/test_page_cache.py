@@ -0,0 +1,148 @@
+import re
+import time
+
+import flask
+
+from base_dash_app.services.async_handler_service import AsyncHandlerService
+from base_dash_app.services.global_state_service import GlobalStateService
+from base_dash_app.utils.page_cache import PageCache
+from base_dash_app.views.base_view import BaseView, set_current_path_params, reset_current_path_params
+
+
+class CountingView(BaseView):
+    def __init__(self, **kwargs):
+        super().__init__(title="Counting", url_regex=re.compile(r"^/count/(?P<item>\w+)$"), **kwargs)
+        self.num_renders = 0
+
+    def render(self, query_params, *args):
+        self.num_renders += 1
+        return f"{self.path_params.get('item')}:{query_params}:{self.num_renders}"
+
+    @staticmethod
+    def raw_render(*args, **kwargs):
+        pass
+
+    @staticmethod
+    def get_input_to_states_map():
+        return []
+
+
+def make_view(ttl_seconds: float = 60, state_keys=None) -> CountingView:
+    services = {GlobalStateService: GlobalStateService(), AsyncHandlerService: AsyncHandlerService()}
+    services[GlobalStateService].state = {"season": 1}
+    return CountingView(
+        service_provider=lambda service_class: services[service_class],
+        page_cache_ttl_seconds=ttl_seconds,
+        page_cache_state_keys=state_keys,
+    )
+
+
+def render(view: BaseView, url: str, query_params: str = "", item: str = "a"):
+    token = set_current_path_params({"item": item})
+    try:
+        return view.render_page(url, query_params, {})
+    finally:
+        reset_current_path_params(token)
+
+
+def test_put_is_dropped_after_invalidation():
+    cache = PageCache(ttl_seconds=60)
+    generation = cache.generation
+    cache.invalidate()
+    assert not cache.put("key", "content", generation)
+    assert cache.get("key") is None
+
+    assert cache.put("key", "content", cache.generation)
+    assert cache.get("key").content == "content"
+
+
+def test_evicts_least_recently_used():
+    cache = PageCache(ttl_seconds=60, max_entries=2)
+    cache.put("a", 1, cache.generation)
+    cache.put("b", 2, cache.generation)
+    cache.get("a")
+    cache.put("c", 3, cache.generation)
+
+    assert cache.get("b") is None
+    assert cache.get("a").content == 1
+    assert len(cache) == 2
+
+
+def test_refresh_is_started_once_per_key():
+    cache = PageCache(ttl_seconds=60)
+    assert cache.start_refresh("a")
+    assert not cache.start_refresh("a")
+    cache.finish_refresh("a")
+    assert cache.start_refresh("a")
+
+
+def test_view_without_ttl_renders_every_time():
+    view = make_view(ttl_seconds=None)
+    assert view.page_cache is None
+    assert render(view, "/count/a") == "a::1"
+    assert render(view, "/count/a") == "a::2"
+
+
+def test_fresh_pages_are_served_from_cache_by_url_and_params():
+    view = make_view()
+    assert render(view, "/count/a") == "a::1"
+    assert render(view, "/count/a") == "a::1"
+    assert render(view, "/count/a", query_params="?x=1") == "a:?x=1:2"
+    assert render(view, "/count/b", item="b") == "b::3"
+
+
+def test_selected_global_state_is_part_of_the_key():
+    view = make_view(state_keys=["season"])
+    assert render(view, "/count/a") == "a::1"
+
+    view.get_service(GlobalStateService).state["season"] = 2
+    assert render(view, "/count/a") == "a::2"
+
+
+def test_stale_pages_are_served_while_revalidating():
+    view = make_view(ttl_seconds=0)
+    assert render(view, "/count/a") == "a::1"
+    assert render(view, "/count/a") == "a::1"
+
+    deadline = time.monotonic() + 5
+    while view.num_renders < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    # the background render sees the request's path params
+    key = view.get_page_cache_key("/count/a", "", {})
+    while view.page_cache.get(key).content != "a::2" and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert view.page_cache.get(key).content == "a::2"
+
+
+def test_global_state_change_invalidates():
+    view = make_view()
+    assert render(view, "/count/a") == "a::1"
+
+    view.handle_global_state_change({"season": 3})
+    assert render(view, "/count/a") == "a::2"
+
+
+def test_callbacks_get_path_params_of_the_referring_page():
+    view = make_view()
+    app = flask.Flask(__name__)
+    with app.test_request_context("/_dash-update-component", headers={"Referer": "http://host/count/b?x=1"}):
+        assert view.path_params == {"item": "b"}
+
+    with app.test_request_context("/_dash-update-component", headers={"Referer": "http://host/other/b"}):
+        assert view.path_params == {}
+
+    assert view.path_params == {}
+
+
+def test_matching_a_url_does_not_leak_its_path_params():
+    view = make_view()
+    app = flask.Flask(__name__)
+    assert view.matches("/count/c")
+    assert not view.matches("/other/c")
+
+    with app.test_request_context("/_dash-update-component", headers={"Referer": "http://host/count/b"}):
+        assert view.path_params == {"item": "b"}
+
+    assert view.path_params == {}
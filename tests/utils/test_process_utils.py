@@ -0,0 +1,32 @@
+from base_dash_app.enums.process_types import ProcessTypesEnum
+from base_dash_app.utils.process_utils import detect_process_info, get_cli_option
+
+
+def test_get_cli_option_forms():
+    assert get_cli_option(["prog", "--threads", "4"], ["--threads"]) == "4"
+    assert get_cli_option(["prog", "--threads=8"], ["--threads"]) == "8"
+    assert get_cli_option(["prog", "-P", "threads"], ["--pool", "-P"]) == "threads"
+    assert get_cli_option(["prog"], ["--threads"], default="1") == "1"
+
+
+def test_detect_celery_pools():
+    prefork = detect_process_info(["/usr/bin/celery", "-A", "app", "worker"], environ={})
+    assert prefork.process_type == ProcessTypesEnum.CELERY_PREFORK
+    assert prefork.num_threads == 1
+
+    threads = detect_process_info(["celery", "-A", "app", "worker", "--pool", "threads", "-c", "6"], environ={})
+    assert threads.process_type == ProcessTypesEnum.CELERY_THREADS
+    assert threads.num_threads == 6
+
+    solo = detect_process_info(["celery", "worker", "--pool=solo"], environ={})
+    assert solo.process_type == ProcessTypesEnum.CELERY_SOLO
+
+
+def test_detect_gunicorn_threads():
+    info = detect_process_info(["/venv/bin/gunicorn", "app:server"], environ={"GUNICORN_CMD_ARGS": "--threads 3"})
+    assert info.process_type == ProcessTypesEnum.GUNICORN
+    assert info.num_threads == 3
+
+
+def test_detect_other():
+    assert detect_process_info(["python", "app.py"], environ={}).process_type == ProcessTypesEnum.OTHER
@@ -0,0 +1,50 @@
+import time
+
+from base_dash_app.utils.redis_semaphore import RedisSemaphore
+
+
+def test_semaphore_limits_holders(redis_client):
+    semaphore = RedisSemaphore(redis_client, "test", limit=2)
+
+    first = semaphore.acquire()
+    second = semaphore.acquire()
+
+    assert first is not None and second is not None
+    assert semaphore.acquire() is None
+    assert semaphore.get_num_holders() == 2
+
+    semaphore.release(first)
+    assert semaphore.acquire() is not None
+
+
+def test_semaphore_is_reentrant_for_same_token(redis_client):
+    semaphore = RedisSemaphore(redis_client, "test", limit=1)
+    assert semaphore.acquire(token="job-1") == "job-1"
+    assert semaphore.acquire(token="job-1") == "job-1"
+    assert semaphore.acquire(token="job-2") is None
+
+
+def test_semaphore_reclaims_expired_leases(redis_client):
+    semaphore = RedisSemaphore(redis_client, "test", limit=1, lease_seconds=-1)
+    assert semaphore.acquire() is not None
+    assert semaphore.acquire() is not None
+
+
+def test_renewed_lease_outlives_lease_seconds(redis_client):
+    semaphore = RedisSemaphore(redis_client, "test", limit=1, lease_seconds=1)
+    token = semaphore.acquire()
+    renewer = semaphore.keep_alive(token, interval_seconds=0.2)
+    try:
+        time.sleep(1.5)
+        assert semaphore.acquire() is None
+        assert not renewer.lost
+    finally:
+        renewer.stop()
+
+    assert semaphore.renew("not-a-holder") is False
+
+
+def test_lost_lease_cannot_be_renewed(redis_client):
+    semaphore = RedisSemaphore(redis_client, "test", limit=1, lease_seconds=-1)
+    token = semaphore.acquire()
+    assert semaphore.renew(token) is False
@@ -0,0 +1,34 @@
+from base_dash_app.utils import redis_utils
+from tests.benchmarks import redis_fan_in
+
+
+def test_flatten_redist_list(redis_client):
+    redis_client.set("a", "1")
+    redis_client.set("b", "2")
+
+    redis_utils.flatten_redist_list("target", ["a", "missing", "b"], redis_client)
+
+    assert redis_client.lrange("target", 0, -1) == ["1", "2"]
+
+
+def test_rpush_batched_keeps_order_across_batches(redis_client):
+    values = [str(i) for i in range(25)]
+    redis_utils.rpush_batched(redis_client, "target", values, batch_size=10)
+    assert redis_client.lrange("target", 0, -1) == values
+
+
+def test_rpush_batched_with_no_values(redis_client):
+    redis_utils.rpush_batched(redis_client, "target", [])
+    assert redis_client.exists("target") == 0
+
+
+def test_lrange_all(redis_client):
+    redis_client.rpush("a", "1", "2")
+    redis_client.rpush("b", "3")
+    assert redis_utils.lrange_all(redis_client, ["a", "b", "missing"], batch_size=2) == [["1", "2"], ["3"], []]
+
+
+def test_fan_in_benchmark_runs(redis_client):
+    throughput = redis_fan_in.run_fan_in(redis_client, num_tasks=redis_fan_in.DEFAULT_NUM_TASKS)
+    assert set(throughput.keys()) == {"flatten_redist_list", "store_uuids", "serialize_flattened_result_lists"}
+    assert redis_client.dbsize() == 0
@@ -0,0 +1,23 @@
+from base_dash_app.utils.startup_profiler import StartupProfiler
+
+
+def test_phases_are_recorded_in_order():
+    profiler = StartupProfiler()
+    profiler.mark("first")
+    with profiler.phase("second"):
+        pass
+    profiler.mark("third")
+    profiler.finish()
+
+    assert [name for name, _ in profiler.phases] == ["first", "second", "third"]
+    assert all(seconds >= 0 for _, seconds in profiler.phases)
+    assert "second" in profiler.get_report()
+
+
+def test_over_budget_warns_with_slowest_phase(caplog):
+    profiler = StartupProfiler(budget_seconds=0)
+    profiler.phases = [("fast", 0.1), ("slow", 2.0)]
+    profiler.finish()
+
+    assert profiler.is_over_budget()
+    assert "Slowest phase: slow" in caplog.text
@@ -0,0 +1,63 @@
+import re
+
+from base_dash_app.utils.url_router import UrlRouter
+
+
+def make_router(cache_size: int = 1024) -> UrlRouter:
+    return UrlRouter([
+        (re.compile("^/demo$|^/$"), "demo"),
+        (re.compile(r"^/games/(?P<game_id>\d+)$"), "game"),
+        (re.compile(r"^/games/(?P<game_id>\d+)/(?P<tab>\w+)?"), "game tab"),
+        (re.compile("^/ADMIN$", re.IGNORECASE), "admin"),
+        (re.compile("$a"), "never"),
+    ], cache_size=cache_size)
+
+
+def test_resolves_first_matching_route_with_its_params():
+    router = make_router()
+    assert router.combined_pattern is not None
+
+    assert router.resolve("/").target == "demo"
+    assert router.resolve("/demo").path_params == {}
+
+    match = router.resolve("/games/12")
+    assert (match.target, match.path_params) == ("game", {"game_id": "12"})
+
+    match = router.resolve("/games/12/stats")
+    assert (match.target, match.path_params) == ("game tab", {"game_id": "12", "tab": "stats"})
+
+    assert router.resolve("/admin").target == "admin"
+    assert router.resolve("/missing") is None
+
+
+def test_matches_sequential_semantics():
+    router = make_router()
+    urls = ["/", "/demo", "/demo/x", "/games/1", "/games/1/", "/games/x", "/Admin", "/admin/x", "", "a"]
+    for url in urls:
+        expected = next(
+            ((target, pattern.match(url).groupdict()) for pattern, target in router.routes if pattern.match(url)),
+            None
+        )
+        match = router.resolve(url)
+        assert (None if match is None else (match.target, match.path_params)) == expected, url
+
+
+def test_falls_back_to_sequential_matching():
+    router = UrlRouter([(re.compile(r"^/(a)\1$"), "double"), (re.compile("^/b$"), "b")])
+    assert router.combined_pattern is None
+    assert router.resolve("/aa").target == "double"
+    assert router.resolve("/b").target == "b"
+
+
+def test_resolution_cache_is_bounded_and_tracks_recent_urls():
+    router = make_router(cache_size=2)
+    router.resolve("/games/1")
+    router.resolve("/missing")
+    router.resolve("/games/2")
+    router.resolve("/games/3")
+
+    assert router.get_recent_urls() == ["/games/3", "/games/2"]
+
+    # cached results are copies, callers can't corrupt them
+    router.resolve("/games/3").path_params["game_id"] = "4"
+    assert router.resolve("/games/3").path_params == {"game_id": "3"}
@@ -0,0 +1,50 @@
+import json
+
+import pytest
+
+from base_dash_app.virtual_objects.async_vos import celery_helpers
+from base_dash_app.virtual_objects.async_vos.celery_task import CeleryUnorderedTaskGroup, CeleryTask
+
+
+def sum_reducer(accumulated, result):
+    return accumulated + result
+
+
+def store_result(redis_client, uuid, result):
+    redis_client.hset(uuid, mapping={"result": json.dumps(result), "result_handle": ""})
+
+
+def test_fold_result_into_stream(redis_client):
+    for i in range(3):
+        store_result(redis_client, f"task-{i}", [i])
+        celery_helpers.fold_result(redis_client, "group", f"task-{i}")
+
+    assert celery_helpers.read_folded_results(redis_client, "group") == [[0], [1], [2]]
+    assert redis_client.hget("group", "num_folded") == "3"
+
+
+def test_fold_result_with_reducer(redis_client):
+    reducer_path = celery_helpers.get_func_path(sum_reducer)
+    for i in range(1, 5):
+        store_result(redis_client, f"task-{i}", i)
+        celery_helpers.fold_result(redis_client, "group", f"task-{i}", reducer_path)
+        # partial results are readable after every fold
+        assert celery_helpers.read_folded_results(redis_client, "group", reducer_path) == sum(range(1, i + 1))
+
+
+def test_get_func_path_rejects_lambdas():
+    with pytest.raises(ValueError):
+        celery_helpers.get_func_path(lambda a, b: a + b)
+
+    assert celery_helpers.resolve_func_path(celery_helpers.get_func_path(sum_reducer)) is sum_reducer
+
+
+def test_incremental_group_round_trips_through_redis(redis_client):
+    group = CeleryUnorderedTaskGroup(
+        name="group", tasks=[CeleryTask(name="task")], incremental_reducer=sum_reducer
+    ).use_redis(redis_client, "group-uuid")
+    group.push_to_redis()
+
+    hydrated = CeleryUnorderedTaskGroup().use_redis(redis_client, "group-uuid").hydrate_from_redis()
+    assert hydrated.reduce_incrementally
+    assert hydrated.incremental_reducer_path == celery_helpers.get_func_path(sum_reducer)
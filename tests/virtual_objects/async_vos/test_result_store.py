@@ -0,0 +1,137 @@
+import os
+import time
+
+import pytest
+
+from base_dash_app.virtual_objects.async_vos import result_store, celery_helpers
+from base_dash_app.virtual_objects.async_vos.celery_task import CeleryTask
+from base_dash_app.virtual_objects.async_vos.result_store import RedisResultStore, LocalFileResultStore, \
+    ResultNotAvailableError, TieredResultStore, LazyResult, ResultHandle
+
+
+def test_redis_store_round_trip_with_chunks(redis_client):
+    store = RedisResultStore(redis_client, chunk_size=16, compression="none", codec="json")
+    value = [{"date": f"2023-01-{i:02d}", "value": i} for i in range(1, 20)]
+
+    handle = store.put(value, ttl=60)
+
+    assert handle.num_chunks > 1
+    assert store.get(handle) == value
+    assert 0 < redis_client.ttl(f"{handle.key}:0") <= 60
+
+
+def test_redis_store_delete(redis_client):
+    store = RedisResultStore(redis_client)
+    handle = store.put({"a": 1})
+    store.delete(handle)
+
+    with pytest.raises(ResultNotAvailableError):
+        store.get(handle)
+
+
+def test_handle_serialization():
+    handle = ResultHandle(key="k", tier="redis", codec="json", compression="zlib", num_chunks=3, size=10)
+    copied = ResultHandle.from_json(handle.to_json())
+    assert copied.to_dict() == handle.to_dict()
+
+
+def test_missing_codec_packages_fail_loudly(redis_client, monkeypatch):
+    handle = RedisResultStore(redis_client, codec="msgpack", compression="zstd").put({"a": 1})
+    monkeypatch.setattr(result_store, "msgpack", None)
+    monkeypatch.setattr(result_store, "zstandard", None)
+
+    with pytest.raises(ImportError):
+        RedisResultStore(redis_client, codec="msgpack")
+    with pytest.raises(ImportError):
+        RedisResultStore(redis_client).get(handle)
+    assert RedisResultStore(redis_client).codec == "json"
+
+
+def test_local_store_rejects_other_hosts(tmp_path):
+    store = LocalFileResultStore(directory=str(tmp_path))
+    handle = store.put([1, 2, 3])
+    assert store.get(handle) == [1, 2, 3]
+
+    handle.host = "some-other-host"
+    assert not store.can_read(handle)
+    with pytest.raises(ResultNotAvailableError):
+        store.get(handle)
+
+
+def test_local_store_expires_and_purges_files(tmp_path):
+    store = LocalFileResultStore(directory=str(tmp_path))
+    expired = store.put("old", ttl=1)
+    kept = store.put("new", ttl=60)
+    os.utime(store.get_path(expired), (0, time.time() - 1))
+
+    with pytest.raises(ResultNotAvailableError):
+        store.get(expired)
+
+    store.last_purged_at = 0.0
+    store.purge_interval_seconds = 0
+    store.put("newer")
+
+    assert not os.path.exists(store.get_path(expired))
+    assert store.get(kept) == "new"
+    assert not any(name.endswith(".tmp") for name in os.listdir(tmp_path))
+
+
+def test_tiered_store_routes_by_handle(redis_client, tmp_path):
+    store = TieredResultStore(
+        redis_store=RedisResultStore(redis_client),
+        local_store=LocalFileResultStore(directory=str(tmp_path)),
+    )
+
+    local_handle = store.put("local", local=True)
+    remote_handle = store.put("remote")
+
+    assert local_handle.tier == "file"
+    assert remote_handle.tier == "redis"
+    assert store.get(local_handle) == "local"
+    assert store.get(remote_handle) == "remote"
+
+
+def test_lazy_result_only_reads_once(redis_client):
+    store = RedisResultStore(redis_client)
+    handle = store.put({"a": 1})
+    lazy = LazyResult(handle, store)
+
+    assert not lazy.is_hydrated()
+    assert lazy.value == {"a": 1}
+    store.delete(handle)
+    assert lazy.value == {"a": 1}
+
+
+def test_work_container_stores_result_by_reference(redis_client):
+    task = CeleryTask(name="task", store_result_by_reference=True).use_redis(redis_client, "task-uuid")
+    task.push_to_redis()
+    task.set_result([{"value": 1}])
+
+    assert redis_client.hget("task-uuid", "result") == ""
+    assert redis_client.hget("task-uuid", "result_handle") != ""
+
+    hydrated = CeleryTask().use_redis(redis_client, "task-uuid").hydrate_from_redis()
+    assert hydrated.result is None
+    assert hydrated.get_result() == [{"value": 1}]
+
+    assert list(celery_helpers.iter_prev_results(redis_client, ["task-uuid"])) == [[{"value": 1}]]
+    assert result_store.get_default_store(redis_client) is result_store.get_default_store(redis_client)
+
+
+def test_task_hands_off_a_local_result(redis_client):
+    task = CeleryTask(name="task", store_result_by_reference=True, local_result=True)
+    task.use_redis(redis_client, "local-task-uuid")
+    task.push_to_redis()
+    task.set_result({"rows": [1, 2, 3]})
+
+    handle = task.get_result_handle()
+    assert handle.tier == "file"
+    assert redis_client.keys(f"{handle.key}*") == []
+
+    hydrated = CeleryTask().use_redis(redis_client, "local-task-uuid").hydrate_from_redis()
+    assert hydrated.local_result
+    assert hydrated.get_result() == {"rows": [1, 2, 3]}
+    assert list(celery_helpers.iter_prev_results(redis_client, ["local-task-uuid"])) == [{"rows": [1, 2, 3]}]
+
+    task.destroy_in_redis()
+    assert not os.path.exists(result_store.get_default_store(redis_client).local_store.get_path(handle))
@@ -0,0 +1,92 @@
+import time
+
+import pytest
+
+from base_dash_app.enums.status_colors import StatusesEnum
+from base_dash_app.virtual_objects.async_vos.work_containers import WorkContainer
+from base_dash_app.virtual_objects.job_progress_container import VirtualJobProgressContainer
+
+
+@pytest.fixture
+def hset_calls(redis_client, monkeypatch):
+    calls = []
+    hset = redis_client.hset
+
+    def recording_hset(name, key=None, value=None, mapping=None, **kwargs):
+        calls.append(dict(mapping) if mapping else {key: value})
+        return hset(name, key, value, mapping=mapping, **kwargs)
+
+    monkeypatch.setattr(redis_client, "hset", recording_hset)
+    return calls
+
+
+def test_push_writes_only_changed_fields_at_once(redis_client, hset_calls):
+    container = VirtualJobProgressContainer(job_instance_id=1, job_definition_id=2)
+    container.use_redis(redis_client, container.uuid)
+    container.push_to_redis()
+    assert len(hset_calls) == 1
+
+    container.push_to_redis()
+    assert len(hset_calls) == 1
+
+    container.set_in_progress()
+    container.push_to_redis()
+    assert hset_calls[-1] == {
+        "execution_status": StatusesEnum.IN_PROGRESS.value.name,
+        "prerequisites_status": StatusesEnum.IN_PROGRESS.value.name,
+        "completion_status": StatusesEnum.IN_PROGRESS.value.name,
+    }
+
+    container.push_to_redis(force=True)
+    assert "job_instance_id" in hset_calls[-1]
+
+
+def test_hydrated_fields_are_not_rewritten(redis_client, hset_calls):
+    container = VirtualJobProgressContainer(job_instance_id=1, job_definition_id=2)
+    container.use_redis(redis_client, container.uuid)
+    container.push_to_redis()
+
+    hydrated = VirtualJobProgressContainer.get_from_redis_by_instance_id(redis_client, 1)
+    hydrated.completed = True
+    hydrated.push_to_redis()
+
+    assert hset_calls[-1] == {"completed": "True"}
+
+
+def test_push_keeps_fields_written_elsewhere(redis_client):
+    container = WorkContainer(name="task").use_redis(redis_client, "task-uuid")
+    container.push_to_redis()
+
+    WorkContainer().use_redis(redis_client, "task-uuid").interrupt()
+    container.status_message = "still going"
+    container.push_to_redis()
+
+    assert redis_client.hget("task-uuid", "interrupted_by_user") == "True"
+    assert redis_client.hget("task-uuid", "status_message") == "still going"
+
+
+def test_throttled_progress_is_coalesced(redis_client, hset_calls):
+    container = VirtualJobProgressContainer(job_instance_id=1, max_writes_per_second=10)
+    container.use_redis(redis_client, container.uuid)
+    container.push_to_redis()
+
+    for progress in range(1, 50):
+        container.set_progress(progress)
+
+    assert redis_client.hget(container.uuid, "progress") == "0.0"
+
+    time.sleep(0.3)
+    assert redis_client.hget(container.uuid, "progress") == "49"
+    assert len(hset_calls) == 2
+
+
+def test_push_flushes_throttled_values(redis_client):
+    container = VirtualJobProgressContainer(job_instance_id=1, max_writes_per_second=0.01)
+    container.use_redis(redis_client, container.uuid)
+    container.push_to_redis()
+
+    container.set_progress(42)
+    container.push_to_redis()
+
+    assert redis_client.hget(container.uuid, "progress") == "42"
+    assert len(container.pending_values) == 0
@@ -0,0 +1,122 @@
+import random
+
+import pytest
+
+from base_dash_app.services.async_handler_service import AsyncHandlerService
+from base_dash_app.virtual_objects.rating_engine import WinnableRatingEngine, RatingSlice, compute_slices, \
+    rate_games, RatingEngineRegistry
+from tests.virtual_objects.winnables import make_game, Player, Army
+
+PLAYERS = ["alice", "bob", "carol", "dave"]
+ARMIES = ["orks", "elves"]
+
+
+def make_season(num_games: int, seed: int = 7):
+    rng = random.Random(seed)
+    games = []
+    for day in range(num_games):
+        winner, loser = rng.sample(PLAYERS, 2)
+        games.append(make_game(
+            day,
+            [[Player(winner), Army(rng.choice(ARMIES))]],
+            [[Player(loser), Army(rng.choice(ARMIES))]],
+            map_name=rng.choice(["m1", "m2"]),
+        ))
+    return games
+
+
+def assert_same_ratings(actual, expected):
+    assert actual.keys() == expected.keys()
+    for key in expected:
+        assert actual[key].mu == pytest.approx(expected[key].mu)
+        assert actual[key].sigma == pytest.approx(expected[key].sigma)
+
+
+def test_incremental_ratings_match_a_full_recompute():
+    season = make_season(50)
+    engine = WinnableRatingEngine([Player], checkpoint_interval=10)
+    for game in season:
+        assert engine.add(game)
+
+    assert not engine.add(season[3])
+    assert len(engine) == 50
+    assert_same_ratings(engine.get_ratings(), rate_games(RatingSlice([Player]).extract_games(season)))
+
+    assert engine.get_leaderboard()[0][1].mu > engine.get_leaderboard()[-1][1].mu
+    last_game = season[-1]
+    winner_key = last_game.get_winners()[0].get_repr_for_dims([Player])
+    assert last_game.rating_cache[(("Player",), winner_key)] == engine.get_rating_for_repr(winner_key)
+
+
+def test_out_of_order_games_are_replayed_from_a_checkpoint():
+    season = make_season(60)
+    engine = WinnableRatingEngine([Player, Army], checkpoint_interval=10)
+    late_games = [season[15], season[42]]
+    assert engine.add_all([g for g in season if g not in late_games]) == 58
+    assert engine.add_all(late_games + [season[0]]) == 2
+
+    in_order = WinnableRatingEngine([Player, Army], checkpoint_interval=10)
+    in_order.add_all(season)
+
+    assert_same_ratings(engine.get_ratings(), in_order.get_ratings())
+    assert [c.num_games for c in engine.checkpoints] == [0, 10, 20, 30, 40, 50, 60]
+
+
+def test_rematches_are_rated_separately():
+    first = make_game(0, [[Player("alice")]], [[Player("bob")]], game_id=1)
+    rematch = make_game(0, [[Player("alice")]], [[Player("bob")]], game_id=2)
+
+    engine = WinnableRatingEngine([Player])
+    assert engine.add_all([first, rematch, first]) == 2
+    assert_same_ratings(engine.get_ratings(), rate_games(RatingSlice([Player]).extract_games([first, rematch])))
+
+    by_row_id = WinnableRatingEngine([Player], id_func=lambda game: game.id)
+    by_row_id.add_all([first, rematch])
+    assert not by_row_id.add(make_game(0, [[Player("alice")]], [[Player("bob")]], game_id=2))
+    assert len(by_row_id) == 2
+
+
+def test_ratings_at_a_date():
+    season = make_season(30)
+    engine = WinnableRatingEngine([Player], checkpoint_interval=10)
+    engine.add_all(season)
+
+    partial = WinnableRatingEngine([Player])
+    partial.add_all(season[:25])
+
+    assert_same_ratings(engine.get_ratings_at(season[24].date), partial.get_ratings())
+
+
+def test_repeated_keys_in_a_game_get_the_sum_of_their_changes():
+    game = make_game(0, [[Player("alice"), Army("orks")]], [[Player("bob"), Army("orks")]])
+    engine = WinnableRatingEngine([Army])
+    engine.add(game)
+
+    # orks won and lost, so they end up about where they started
+    assert engine.get_rating_for_repr(("orks",)).mu == pytest.approx(25, abs=0.01)
+
+
+def test_slices_in_processes_match_slices_in_process():
+    season = make_season(40)
+    slices = [
+        RatingSlice([Player]),
+        RatingSlice([Army]),
+        RatingSlice([Player], winnable_filter=lambda g: g.extra_data[0].name == "m1", name="players on m1"),
+    ]
+
+    serial = compute_slices(season, slices)
+    parallel = compute_slices(season, slices, async_service=AsyncHandlerService())
+
+    assert serial.keys() == {"Player", "Army", "players on m1"}
+    for name in serial:
+        assert_same_ratings(parallel[name], serial[name])
+
+
+def test_registry_shares_engines():
+    registry = RatingEngineRegistry()
+    engine = registry.get_engine("season", [Player, Army])
+    assert registry.get_engine("season", [Army, Player]) is engine
+    assert registry.get_engine("other", [Player, Army]) is not engine
+
+    registry.invalidate("season")
+    assert registry.get_engine("season", [Player, Army]) is not engine
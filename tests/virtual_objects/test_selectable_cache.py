@@ -0,0 +1,128 @@
+from typing import List, Optional, Type
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from base_dash_app.application.db_declaration import db
+from base_dash_app.models.job_definition import JobDefinition
+from base_dash_app.models.job_definition_parameter import JobDefinitionParameter
+from base_dash_app.virtual_objects.interfaces.selectable import Selectable, CachedSelectable
+from base_dash_app.virtual_objects.selectable_cache import SelectableCache, SelectableCacheEntry, selectable_cache
+
+
+class CountingSelectablesJob(JobDefinition):
+    __mapper_args__ = {
+        "polymorphic_identity": "CountingSelectablesJob"
+    }
+
+    num_loads = 0
+    ttl = 60
+
+    @classmethod
+    def get_selectable_type(cls) -> Optional[Type[Selectable]]:
+        return CachedSelectable
+
+    @classmethod
+    def single_selectable_param_name(cls) -> Optional[str]:
+        return "region"
+
+    @classmethod
+    def selectables_cache_ttl(cls):
+        return cls.ttl
+
+    @classmethod
+    def get_selectables_by_param_name(cls, param_name, session) -> List[Selectable]:
+        CountingSelectablesJob.num_loads += 1
+        return [CachedSelectable(label=f"Region {i}", value=i) for i in range(100)]
+
+    @classmethod
+    def construct_instance(cls, **kwargs):
+        return None
+
+
+class ModelSelectablesJob(JobDefinition):
+    __mapper_args__ = {
+        "polymorphic_identity": "ModelSelectablesJob"
+    }
+
+    @classmethod
+    def get_selectable_type(cls) -> Optional[Type[Selectable]]:
+        return JobDefinitionParameter
+
+    @classmethod
+    def single_selectable_param_name(cls) -> Optional[str]:
+        return "parameter"
+
+    @classmethod
+    def get_selectables_by_param_name(cls, param_name, session) -> List[Selectable]:
+        return session.query(JobDefinitionParameter).order_by(JobDefinitionParameter.id.desc()).all()
+
+    @classmethod
+    def construct_instance(cls, **kwargs):
+        return None
+
+
+def setup_function():
+    selectable_cache.invalidate()
+    CountingSelectablesJob.num_loads = 0
+    CountingSelectablesJob.ttl = 60
+
+
+def test_entry_indexes_by_value():
+    entry = SelectableCacheEntry([CachedSelectable(label="a", value=1), CachedSelectable(label="b", value=2)])
+    assert entry.get_by_value(2).get_label() == "b"
+    assert entry.get_by_value(3) is None
+
+
+def test_cache_expires_and_invalidates_by_key():
+    cache = SelectableCache()
+    cache.put(int, "x", [CachedSelectable(label="a", value=1)])
+    cache.put(str, "x", [])
+
+    assert cache.get(int, "x", ttl=60) is not None
+    assert cache.get(int, "x", ttl=0) is None
+
+    cache.invalidate(job_class=int)
+    assert cache.get(int, "x", ttl=60) is None
+    assert cache.get(str, "x", ttl=60) is not None
+
+
+def test_selectables_are_loaded_once_per_ttl():
+    CountingSelectablesJob.warm_selectables_cache(session=None)
+    assert CountingSelectablesJob.num_loads == 1
+
+    for value in range(100):
+        assert CountingSelectablesJob.get_selectable_by_value(value, session=None).get_value() == value
+    assert len(CountingSelectablesJob.get_cached_selectables("region", session=None)) == 100
+    assert CountingSelectablesJob.get_selectable_by_value(1000, session=None) is None
+    assert CountingSelectablesJob.num_loads == 1
+
+    CountingSelectablesJob.invalidate_selectables_cache()
+    CountingSelectablesJob.get_cached_selectables("region", session=None)
+    assert CountingSelectablesJob.num_loads == 2
+
+    CountingSelectablesJob.ttl = 0
+    CountingSelectablesJob.get_cached_selectables("region", session=None)
+    assert CountingSelectablesJob.num_loads == 3
+
+
+def test_model_selectables_are_rows_of_the_callers_session():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    db.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add_all([JobDefinitionParameter() for _ in range(3)])
+        session.commit()
+        ModelSelectablesJob.warm_selectables_cache(session)
+
+    with Session(engine) as session:
+        selectables = ModelSelectablesJob.get_cached_selectables("parameter", session)
+        assert [s.get_value() for s in selectables] == [3, 2, 1]
+        assert all(isinstance(s, JobDefinitionParameter) and s in session for s in selectables)
+
+        by_value = ModelSelectablesJob.get_selectable_by_value(2, session)
+        assert by_value is selectables[1]
+
+        session.delete(by_value)
+        session.flush()
+        assert [s.get_value() for s in ModelSelectablesJob.get_cached_selectables("parameter", session)] == [3, 1]
@@ -0,0 +1,87 @@
+import random
+
+import pytest
+
+from base_dash_app.virtual_objects.winnable_index import WinnableIndex
+from tests.virtual_objects.winnables import make_game, Player, Army, Map
+
+PLAYERS = ["alice", "bob", "carol", "dave", "erin", "frank"]
+ARMIES = ["orks", "elves", "dwarves"]
+
+
+@pytest.fixture(scope="module")
+def season():
+    rng = random.Random(3)
+    games = []
+    for day in range(200):
+        players = rng.sample(PLAYERS, 4)
+        games.append(make_game(
+            day,
+            [[Player(p), Army(rng.choice(ARMIES))] for p in players[:2]],
+            [[Player(p), Army(rng.choice(ARMIES))] for p in players[2:]],
+            map_name=rng.choice(["m1", "m2"]),
+        ))
+    return games
+
+
+@pytest.fixture(scope="module")
+def index(season):
+    index = WinnableIndex()
+    index.add_all(season[:100])
+    index.add_all(season[50:])
+    return index
+
+
+def test_games_are_indexed_once(index, season):
+    assert len(index) == len(season)
+    assert index.get_game_id(season[120]) == 120
+
+
+def test_rematches_are_separate_games():
+    first = make_game(0, [[Player("alice")]], [[Player("bob")]], game_id=1)
+    rematch = make_game(0, [[Player("alice")]], [[Player("bob")]], game_id=2)
+
+    index = WinnableIndex([first, rematch, first])
+    assert len(index) == 2
+    assert index.filter(competitor_values=[Player("alice")]) == [first, rematch]
+
+    by_row_id = WinnableIndex([first, rematch], id_func=lambda game: game.id)
+    reloaded = make_game(0, [[Player("alice")]], [[Player("bob")]], game_id=2)
+    assert by_row_id.add(reloaded) == 1
+    assert by_row_id.get_game_id(reloaded) == 1
+
+
+@pytest.mark.parametrize("values", [
+    [Player("alice")],
+    [Player("alice"), Army("orks")],
+    [Player("bob"), Army("elves"), Army("orks")],
+    [Player("nobody")],
+])
+def test_competitor_filters_match_scans(index, season, values):
+    assert index.filter(competitor_values=values) == [
+        g for g in season if g.has_team_with_all_competitor_values(values)
+    ]
+    assert index.filter(any_competitor_values=values) == [
+        g for g in season if g.has_team_with_any_competitor_value(values)
+    ]
+
+
+def test_team_filter_matches_scan(index, season):
+    values_for_each_competitor = [[Player("alice")], [Army("dwarves")]]
+    expected = [
+        g for g in season if g.has_team_with_multiple_competitors_with_all_specific_values(values_for_each_competitor)
+    ]
+
+    assert len(expected) > 0
+    assert index.filter(team_competitor_values=values_for_each_competitor) == expected
+
+
+def test_filters_combine(index, season):
+    expected = [
+        g for g in season
+        if g.has_team_with_all_competitor_values([Player("carol"), Army("elves")]) and g.extra_data[0].name == "m2"
+    ]
+
+    assert index.filter(competitor_values=[Player("carol"), Army("elves")], winnable_values=[Map("m2")]) == expected
+    assert index.filter() == season
+    assert index.get_values(Army) == [("dwarves",), ("elves",), ("orks",)]
@@ -0,0 +1,145 @@
+import datetime
+from typing import List, Type
+
+from base_dash_app.virtual_objects.interfaces.winnable import CompetitorDimension, Competitor, CompetingTeam, \
+    Winnable, WinnableDimension
+
+
+class NamedDimension(CompetitorDimension):
+    def __init__(self, name: str):
+        super().__init__(base_item=None)
+        self.name = name
+
+    @staticmethod
+    def elements_are_unique():
+        return True
+
+    @staticmethod
+    def get_dimension_name() -> str:
+        return "named"
+
+    @staticmethod
+    def get_base_class():
+        return None
+
+    def get_name(self):
+        return self.name
+
+    def get_repr(self):
+        return tuple([self.name])
+
+    def get_link(self) -> str:
+        return f"/{self.name}"
+
+    def get_header(self):
+        return self.name, {}
+
+    def get_text(self):
+        return self.name, {}
+
+    def get_extras(self):
+        return None
+
+    def __lt__(self, other):
+        return (type(self).__name__, self.name) < (type(other).__name__, other.name)
+
+    def __eq__(self, other):
+        return type(self) == type(other) and self.name == other.name
+
+    def __hash__(self):
+        return hash((type(self).__name__, self.name))
+
+
+class Player(NamedDimension):
+    pass
+
+
+class Army(NamedDimension):
+    pass
+
+
+class Map(WinnableDimension):
+    def __init__(self, name: str):
+        super().__init__(base_item=None)
+        self.name = name
+
+    @staticmethod
+    def elements_are_unique():
+        return True
+
+    @staticmethod
+    def get_dimension_name() -> str:
+        return "map"
+
+    @staticmethod
+    def get_base_class():
+        return None
+
+    def get_name(self):
+        return self.name
+
+    def get_repr(self):
+        return tuple([self.name])
+
+    def get_link(self) -> str:
+        return f"/{self.name}"
+
+    def __lt__(self, other):
+        return self.name < other.name
+
+    def __eq__(self, other):
+        return type(self) == type(other) and self.name == other.name
+
+    def __hash__(self):
+        return hash(("map", self.name))
+
+
+class Game(Winnable):
+    def get_link(self) -> str:
+        return ""
+
+    def get_name(self):
+        return str(self.date)
+
+    def get_header(self):
+        return self.get_name(), {}
+
+    def get_text(self):
+        return "", {}
+
+    def get_extras(self):
+        return None
+
+    def get_status_color(self, *, perspective=None):
+        return None
+
+    def __hash__(self):
+        return hash(self.date)
+
+    def __eq__(self, other):
+        return self is other
+
+
+def make_game(
+        day: int, winners: List[List[NamedDimension]], losers: List[List[NamedDimension]], map_name: str = "m1",
+        game_id: int = None
+) -> Game:
+    game = Game(
+        winning_team=None, losing_teams=[], date=datetime.datetime(2023, 1, 1) + datetime.timedelta(days=day),
+        extra_data=[Map(map_name)]
+    )
+
+    def make_team(result: int, competitors: List[List[NamedDimension]]) -> CompetingTeam:
+        team = CompetingTeam(result, [], game)
+        team.competitors = sorted(Competitor(data, team) for data in competitors)
+        return team
+
+    game.winning_team = make_team(1, winners)
+    game.losing_teams = [make_team(0, losers)]
+    game.all_teams = [game.winning_team] + game.losing_teams
+    game.id = game_id if game_id is not None else day
+    return game
+
+
+def dims(*dim_types: Type[CompetitorDimension]) -> List[Type[CompetitorDimension]]:
+    return list(dim_types)